@@ -0,0 +1,78 @@
+"""Measure response compression: bytes saved against CPU time per coding and level.
+
+Encodes real list and export payloads from an in-memory copy of the schema, then runs
+them through main.ResponseCompressor at each level, once as a single body and once as a
+stream of sync-flushed chunks (the path CompressionMiddleware takes for streamed bodies).
+
+    poetry run python benchmarks/bench_compression.py --rows 10000 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+import main
+from bench_serialization import LISTS, seed
+
+LEVELS = {
+    "gzip": ("COMPRESSION_GZIP_LEVEL", (1, 6, 9)),
+    "br": ("COMPRESSION_BROTLI_QUALITY", (1, 4, 6, 9)),
+    "zstd": ("COMPRESSION_ZSTD_LEVEL", (1, 3, 6, 12)),
+}
+
+def build_payloads(engine):
+    payloads = {}
+    with engine.connect() as conn:
+        for path in ("/users", "/matches"):
+            _, encoder, sql = LISTS[path]
+            payloads[path] = encoder.encode(conn.execute(text(sql)).fetchall())
+        rows = conn.execute(text(main.EVENT_EXPORT_SQL), {"event_id": 1}).fetchall()
+    payloads["export.csv"] = main.encode_export_rows(rows, "csv")
+    payloads["export.ndjson"] = main.encode_export_rows(rows, "ndjson")
+    return payloads
+
+def time_compression(coding: str, payload: bytes, chunk_size: int, repeat: int):
+    chunks = [payload[i:i + chunk_size] for i in range(0, len(payload), chunk_size)] if chunk_size else [payload]
+    timings = []
+    for _ in range(repeat):
+        compressor = main.ResponseCompressor(coding)
+        start = time.perf_counter()
+        size = sum(len(compressor.compress(chunk, finish=index == len(chunks) - 1)) for index, chunk in enumerate(chunks))
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), size
+
+def main_benchmark(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=64 * 1024, help="Chunk size for the streamed runs")
+    args = parser.parse_args(argv)
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    seed(engine, args.rows)
+    payloads = build_payloads(engine)
+
+    print(f"{'payload':<14} {'coding':<6} {'level':>5} {'bytes':>10} {'ratio':>6} {'ms':>8} {'MB/s':>7} {'streamed bytes':>15} {'streamed ms':>12}")
+    for name, payload in payloads.items():
+        print(f"{name:<14} {'-':<6} {'-':>5} {len(payload):>10} {1:>6.2f}")
+        for coding, (setting, levels) in LEVELS.items():
+            if not main.compression_available(coding):
+                print(f"{name:<14} {coding:<6} not installed (poetry install -E compression)")
+                continue
+            default_level = getattr(main, setting)
+            for level in levels:
+                setattr(main, setting, level)
+                single_ms, single_size = time_compression(coding, payload, 0, args.repeat)
+                streamed_ms, streamed_size = time_compression(coding, payload, args.chunk_size, args.repeat)
+                print(f"{name:<14} {coding:<6} {level:>5} {single_size:>10} {len(payload) / single_size:>6.2f} {single_ms:>8.2f} "
+                      f"{len(payload) / 1e3 / single_ms:>7.1f} {streamed_size:>15} {streamed_ms:>12.2f}")
+            setattr(main, setting, default_level)
+
+if __name__ == "__main__":
+    main_benchmark()
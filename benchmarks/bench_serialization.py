@@ -0,0 +1,86 @@
+"""Compare response_model validation with the precompiled orjson list encoders.
+
+Builds a throwaway FastAPI app over an in-memory copy of the schema with two routes
+per list (one returning rows through response_model, one returning encoder bytes)
+and times both through the ASGI stack.
+
+    poetry run python benchmarks/bench_serialization.py --rows 10000 --repeat 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+import main
+
+LISTS = {
+    "/users": (main.UserResponse, main.user_list_encoder, "SELECT id, username, email, registration_date, role FROM users"),
+    "/matches": (main.MatchResponse, main.match_list_encoder, "SELECT id, event_id, stage, match_date, match_time, user1_id, user2_id, venue, user1_screenshot_url, user1_tactics_url, user2_screenshot_url, user2_tactics_url FROM matches"),
+    "/events": (main.EventResponse, main.event_list_encoder, "SELECT id, name, description, start_date, end_date, mode FROM events"),
+}
+
+def seed(engine, rows: int):
+    with open(os.path.join(os.path.dirname(os.path.abspath(main.__file__)), "schema.sql")) as f:
+        schema = f.read()
+    with engine.begin() as conn:
+        conn.connection.driver_connection.executescript(schema)
+        conn.execute(text("INSERT INTO users (username, password_hash, email) VALUES (:username, 'x', :email)"),
+                     [{"username": f"user{i}", "email": f"user{i}@example.com"} for i in range(rows)])
+        conn.execute(text("INSERT INTO events (name, description, start_date, end_date, mode) VALUES (:name, 'Benchmark event', '2024-01-01', '2024-12-31', 'league')"),
+                     [{"name": f"Event {i}"} for i in range(rows)])
+        conn.execute(text("INSERT INTO matches (event_id, stage, match_date, match_time, user1_id, user2_id, venue) VALUES (1, 'group', '2024-03-01', '18:30', :user1_id, :user2_id, 'Main pitch')"),
+                     [{"user1_id": i + 1, "user2_id": (i + 1) % rows + 1} for i in range(rows)])
+
+def build_app(engine):
+    app = FastAPI()
+    for path, (model, encoder, sql) in LISTS.items():
+        def validated(sql=sql):
+            with engine.connect() as conn:
+                return conn.execute(text(sql)).fetchall()
+
+        def encoded(sql=sql, encoder=encoder):
+            with engine.connect() as conn:
+                return encoder.response(conn.execute(text(sql)).fetchall())
+
+        app.get(f"/validated{path}", response_model=list[model])(validated)
+        app.get(f"/encoded{path}", response_model=list[model])(encoded)
+    return app
+
+def time_requests(client, url: str, repeat: int):
+    client.get(url) # warm up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+    return statistics.median(timings), response.json()
+
+def main_benchmark(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    seed(engine, args.rows)
+    client = TestClient(build_app(engine))
+
+    print(f"{'endpoint':<10} {'rows':>7} {'response_model ms':>18} {'orjson ms':>10} {'speedup':>8}")
+    for path in LISTS:
+        validated_ms, validated_body = time_requests(client, f"/validated{path}", args.repeat)
+        encoded_ms, encoded_body = time_requests(client, f"/encoded{path}", args.repeat)
+        if validated_body != encoded_body:
+            raise SystemExit(f"{path}: encoded body differs from the response_model output")
+        print(f"{path:<10} {len(encoded_body):>7} {validated_ms:>18.1f} {encoded_ms:>10.1f} {validated_ms / encoded_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main_benchmark()
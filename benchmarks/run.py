@@ -0,0 +1,444 @@
+"""Drive every route of main.py against a seeded database and report latency per endpoint.
+
+Each mode runs against its own copy of the seeded cup.db (see seed.py), so the seeded
+file is never changed and runs are repeatable. `asgi` drives main.app inside this
+process through httpx's ASGI transport. `uvicorn` starts `uvicorn main:app --workers N`
+and drives it over loopback. Every endpoint gets --requests requests from --concurrency
+concurrent clients. The report gives p50/p95/p99 latency, throughput and the peak
+resident memory of the server processes while that endpoint ran. It is written to JSON
+so that runs on different commits can be compared with --baseline.
+
+    poetry run python benchmarks/seed.py --users 100000 --events 2000 --matches 500000
+    poetry run python benchmarks/run.py --mode asgi --mode uvicorn --workers 4 --requests 200 --concurrency 16
+    poetry run python benchmarks/run.py --baseline benchmarks/results/<earlier run>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import socket
+import sqlite3
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from collections import Counter, namedtuple
+from datetime import datetime, timezone
+
+import httpx
+
+from seed import REPO_ROOT, SEED_PASSWORD, prepare_directory
+
+os.environ.setdefault("ACCESS_LOG_ENABLED", "0") # One log line per request would dominate the numbers
+
+# `build(i)` returns the keyword arguments for httpx's request(); `limit` caps the
+# request count of endpoints too slow to call --requests times
+Scenario = namedtuple("Scenario", "method route build limit", defaults=(None,))
+BCRYPT_REQUESTS = 20 # Each request hashes or verifies a password on purpose
+
+SKIPPED = {
+    "GET /events/{event_id}/live": "long-lived SSE stream",
+    "WEBSOCKET /events/{event_id}/live/ws": "long-lived WebSocket",
+}
+RSS_SAMPLE_SECONDS = 0.01
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+def tiny_png() -> bytes:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 0)) + chunk(b"IDAT", zlib.compress(b"\x00\x00")) + chunk(b"IEND", b"")
+
+def copy_database(source: str, directory: str):
+    # The backup API copies a consistent snapshot, WAL included
+    target = sqlite3.connect(os.path.join(directory, "cup.db"))
+    with sqlite3.connect(f"file:{source}?mode=ro", uri=True) as connection:
+        connection.backup(target)
+    target.close()
+
+def prepare_fixtures(directory: str, pool_size: int, bulk_rows: int, rng: random.Random) -> dict:
+    # Rows that write endpoints consume, one per request (users to delete, matches
+    # without a result, ...), inserted into the mode's own copy before the server starts
+    connection = sqlite3.connect(os.path.join(directory, "cup.db"))
+    fx = {}
+    query = lambda sql, *params: [row[0] for row in connection.execute(sql, params)]
+    fx["users"] = query("SELECT id FROM users WHERE role = 'player'")
+    fx["league_events"] = query("SELECT id FROM events WHERE mode = 'league'")
+    fx["knockout_events"] = query("SELECT id FROM events WHERE mode = 'knockout'")
+    fx["matches"] = query("SELECT id FROM matches")
+    fx["results"] = query("SELECT id FROM results")
+    fx["knockout_players"] = connection.execute("SELECT r.event_id, r.user_id FROM event_registrations r JOIN events e ON e.id = r.event_id WHERE e.mode = 'knockout'").fetchall()
+    fx["max_seq"] = query("SELECT IFNULL(MAX(seq), 0) FROM change_log")[0]
+    if not fx["users"] or not fx["league_events"] or not fx["results"]:
+        raise SystemExit("The database has no players, league events or results; run benchmarks/seed.py first")
+    password_hash = query("SELECT password_hash FROM users WHERE role = 'player' LIMIT 1")[0]
+
+    with connection:
+        def insert(sql, *params):
+            return connection.execute(sql, params).lastrowid
+        def new_events(prefix, count):
+            return [insert("INSERT INTO events (name, start_date, end_date, mode) VALUES (?, '2025-06-01', '2025-08-01', 'league')", f"{prefix} {i}") for i in range(count)]
+        def new_matches(count):
+            return [insert("INSERT INTO matches (event_id, stage, match_date, user1_id, user2_id) VALUES (?, 'group', '2025-06-01', ?, ?)", fx["spare_event"], *rng.sample(fx["users"], 2)) for _ in range(count)]
+
+        fx["player_username"] = "bench_player"
+        fx["player"] = insert("INSERT INTO users (username, password_hash, email) VALUES (?, ?, 'bench_player@example.com')", fx["player_username"], password_hash)
+        fx["spare_event"] = new_events("Benchmark spare", 1)[0]
+        fx["player_matches"] = [insert("INSERT INTO matches (event_id, stage, match_date, user1_id, user2_id) VALUES (?, 'group', '2025-06-01', ?, ?)", fx["spare_event"], fx["player"], user_id)
+                                for user_id in rng.sample(fx["users"], min(20, len(fx["users"])))]
+        fx["delete_users"] = [insert("INSERT INTO users (username, password_hash) VALUES (?, ?)", f"bench_delete_{i}", password_hash) for i in range(pool_size)]
+        fx["delete_events"] = new_events("Benchmark delete", pool_size)
+        fx["delete_matches"] = new_matches(pool_size)
+        fx["result_matches"] = new_matches(pool_size)
+        fx["delete_results"] = [insert("INSERT INTO results (match_id, user1_score, user2_score) VALUES (?, 1, 1)", match_id) for match_id in new_matches(pool_size)]
+        fx["bulk_matches"] = new_matches(pool_size * bulk_rows)
+        registered = rng.sample(fx["users"], min(pool_size, len(fx["users"])))
+        connection.executemany("INSERT INTO event_registrations (user_id, event_id) VALUES (?, ?)", [(user_id, fx["spare_event"]) for user_id in registered])
+        fx["delete_registrations"] = [(user_id, fx["spare_event"]) for user_id in registered]
+        fx["registration_event"] = new_events("Benchmark registrations", 1)[0]
+        fx["registration_users"] = rng.sample(fx["users"], min(pool_size, len(fx["users"])))
+        fx["register_events"] = new_events("Benchmark register", pool_size)
+        fx["join_events"] = new_events("Benchmark join", pool_size)
+        fx["leave_events"] = new_events("Benchmark leave", pool_size)
+        connection.executemany("INSERT INTO event_registrations (user_id, event_id) VALUES (?, ?)", [(fx["player"], event_id) for event_id in fx["leave_events"]])
+        fx["fixture_events"] = new_events("Benchmark fixtures", pool_size)
+        connection.executemany("INSERT INTO event_registrations (user_id, event_id) VALUES (?, ?)",
+                               [(user_id, event_id) for event_id in fx["fixture_events"] for user_id in rng.sample(fx["users"], min(8, len(fx["users"])))])
+    connection.close()
+    return fx
+
+def build_scenarios(fx: dict, rng: random.Random, bulk_rows: int) -> list[Scenario]:
+    organizer = {"Authorization": f"Bearer {fx['organizer_token']}"}
+    player = {"Authorization": f"Bearer {fx['player_token']}"}
+    pick = lambda name: rng.choice(fx[name])
+    png = tiny_png()
+
+    def two_players():
+        user1_id, user2_id = rng.sample(fx["users"], 2)
+        return {"user1_id": user1_id, "user2_id": user2_id}
+
+    def bulk_body(i):
+        rows = "".join(f"{match_id},{rng.randrange(5)},{rng.randrange(5)},\n" for match_id in fx["bulk_matches"][i * bulk_rows:(i + 1) * bulk_rows])
+        return "match_id,user1_score,user2_score,winner_user_id\n" + rows
+
+    def knockout_progress(i):
+        event_id, user_id = rng.choice(fx["knockout_players"])
+        return {"url": f"/events/{event_id}/users/{user_id}/knockout-progress"}
+
+    scenarios = [
+        Scenario("GET", "/", lambda i: {"url": "/"}),
+        Scenario("POST", "/register", lambda i: {"url": "/register", "json": {"username": f"bench_register_{i}", "password": SEED_PASSWORD}}, limit=BCRYPT_REQUESTS),
+        Scenario("POST", "/login", lambda i: {"url": "/login", "data": {"username": fx["player_username"], "password": SEED_PASSWORD}}, limit=BCRYPT_REQUESTS),
+        Scenario("POST", "/events", lambda i: {"url": "/events", "json": {"name": f"Benchmark event {i}", "mode": "league"}, "headers": organizer}),
+        Scenario("GET", "/events", lambda i: {"url": "/events"}),
+        Scenario("GET", "/events/{event_id}", lambda i: {"url": f"/events/{pick('league_events')}", "headers": player}),
+        Scenario("PUT", "/events/{event_id}", lambda i: {"url": f"/events/{pick('league_events')}", "json": {"description": f"Updated {i}"}, "headers": organizer}),
+        Scenario("DELETE", "/events/{event_id}", lambda i: {"url": f"/events/{fx['delete_events'][i]}", "headers": organizer}),
+        Scenario("GET", "/events/{event_id}/matches", lambda i: {"url": f"/events/{pick('league_events')}/matches"}),
+        Scenario("GET", "/events/{event_id}/full", lambda i: {"url": f"/events/{pick('league_events')}/full"}),
+        Scenario("GET", "/matches/{match_id}/results", lambda i: {"url": f"/matches/{pick('matches')}/results"}),
+        Scenario("POST", "/events/{event_id}/register", lambda i: {"url": f"/events/{fx['register_events'][i]}/register", "headers": player}),
+        Scenario("POST", "/events/{event_id}/join", lambda i: {"url": f"/events/{fx['join_events'][i]}/join", "headers": player}),
+        Scenario("DELETE", "/events/{event_id}/leave", lambda i: {"url": f"/events/{fx['leave_events'][i]}/leave", "headers": player}),
+        Scenario("GET", "/users/me", lambda i: {"url": "/users/me", "headers": player}),
+        Scenario("PUT", "/users/me", lambda i: {"url": "/users/me", "json": {"email": f"bench_player_{i}@example.com"}, "headers": player}),
+        Scenario("GET", "/admin/cache-stats", lambda i: {"url": "/admin/cache-stats", "headers": organizer}),
+        Scenario("GET", "/admin/profiles/{profile_id}", lambda i: {"url": fx["profile_url"], "headers": organizer}),
+        Scenario("GET", "/metrics", lambda i: {"url": "/metrics"}),
+        Scenario("POST", "/users", lambda i: {"url": "/users", "json": {"username": f"bench_user_{i}", "password": SEED_PASSWORD}, "headers": organizer}, limit=BCRYPT_REQUESTS),
+        Scenario("GET", "/users", lambda i: {"url": "/users", "headers": organizer}),
+        Scenario("GET", "/users/{user_id}", lambda i: {"url": f"/users/{pick('users')}", "headers": organizer}),
+        Scenario("PUT", "/users/{user_id}", lambda i: {"url": f"/users/{pick('users')}", "json": {"email": f"bench_updated_{i}@example.com"}, "headers": organizer}),
+        Scenario("DELETE", "/users/{user_id}", lambda i: {"url": f"/users/{fx['delete_users'][i]}", "headers": organizer}),
+        Scenario("POST", "/matches", lambda i: {"url": "/matches", "json": {"event_id": fx["spare_event"], "stage": "group", "match_date": "2025-06-02", "venue": "Pitch 1", **two_players()}, "headers": organizer}),
+        Scenario("POST", "/events/{event_id}/fixtures", lambda i: {"url": f"/events/{fx['fixture_events'][i]}/fixtures", "json": {}, "headers": organizer}),
+        Scenario("GET", "/matches", lambda i: {"url": "/matches", "headers": organizer}),
+        Scenario("GET", "/matches/{match_id}", lambda i: {"url": f"/matches/{pick('matches')}", "headers": organizer}),
+        Scenario("PUT", "/matches/{match_id}", lambda i: {"url": f"/matches/{pick('matches')}", "json": {"venue": f"Pitch {i % 8 + 1}"}, "headers": organizer}),
+        Scenario("DELETE", "/matches/{match_id}", lambda i: {"url": f"/matches/{fx['delete_matches'][i]}", "headers": organizer}),
+        Scenario("POST", "/results", lambda i: {"url": "/results", "json": {"match_id": fx["result_matches"][i], "user1_score": 2, "user2_score": 1}, "headers": organizer}),
+        Scenario("GET", "/results", lambda i: {"url": "/results", "headers": organizer}),
+        Scenario("GET", "/results/{result_id}", lambda i: {"url": f"/results/{pick('results')}", "headers": organizer}),
+        Scenario("PUT", "/results/{result_id}", lambda i: {"url": f"/results/{pick('results')}", "json": {"user1_score": rng.randrange(5), "user2_score": rng.randrange(5)}, "headers": organizer}),
+        Scenario("DELETE", "/results/{result_id}", lambda i: {"url": f"/results/{fx['delete_results'][i]}", "headers": organizer}),
+        Scenario("POST", "/results/bulk", lambda i: {"url": "/results/bulk", "content": bulk_body(i), "headers": {**organizer, "Content-Type": "text/csv"}}),
+        Scenario("POST", "/event-registrations", lambda i: {"url": "/event-registrations", "json": {"user_id": fx["registration_users"][i], "event_id": fx["registration_event"]}, "headers": organizer}),
+        Scenario("GET", "/event-registrations", lambda i: {"url": "/event-registrations", "headers": organizer}),
+        Scenario("GET", "/users/{user_id}/registrations", lambda i: {"url": f"/users/{pick('users')}/registrations", "headers": organizer}),
+        Scenario("GET", "/events/{event_id}/registrations", lambda i: {"url": f"/events/{pick('league_events')}/registrations", "headers": organizer}),
+        Scenario("DELETE", "/event-registrations/{user_id}/{event_id}", lambda i: {"url": "/event-registrations/{}/{}".format(*fx["delete_registrations"][i]), "headers": organizer}),
+        Scenario("GET", "/events/{event_id}/standings", lambda i: {"url": f"/events/{pick('league_events')}/standings"}),
+        Scenario("POST", "/events/{event_id}/standings/rebuild", lambda i: {"url": f"/events/{pick('league_events')}/standings/rebuild", "headers": organizer}),
+        Scenario("POST", "/standings/rebuild", lambda i: {"url": "/standings/rebuild", "headers": organizer}, limit=3),
+        Scenario("GET", "/events/{event_id}/users/{user_id}/knockout-progress", knockout_progress),
+        Scenario("GET", "/events/{event_id}/export", lambda i: {"url": f"/events/{pick('league_events')}/export", "params": {"format": ("ndjson", "csv")[i % 2]}}),
+        Scenario("GET", "/changes", lambda i: {"url": "/changes", "params": {"since": rng.randrange(fx["max_seq"] + 1)}}),
+        Scenario("GET", "/events/{event_id}/bracket", lambda i: {"url": f"/events/{pick('knockout_events')}/bracket"}),
+        Scenario("GET", "/users/me/matches", lambda i: {"url": "/users/me/matches", "headers": player}),
+        Scenario("POST", "/matches/{match_id}/upload/{user_id}", lambda i: {"url": f"/matches/{fx['player_matches'][i % len(fx['player_matches'])]}/upload/{fx['player']}",
+                                                                           "params": {"file_type": ("screenshot", "tactics")[i % 2]}, "files": {"file": ("shot.png", png, "image/png")}, "headers": player}),
+        Scenario("GET", "/events/{event_id}/participants", lambda i: {"url": f"/events/{pick('league_events')}/participants"}),
+    ]
+    if not fx["knockout_events"]:
+        SKIPPED["GET /events/{event_id}/bracket"] = SKIPPED["GET /events/{event_id}/users/{user_id}/knockout-progress"] = "no knockout events seeded"
+    if not fx.get("profile_url"):
+        SKIPPED["GET /admin/profiles/{profile_id}"] = "profiling is disabled"
+    return [scenario for scenario in scenarios if f"{scenario.method} {scenario.route}" not in SKIPPED]
+
+def app_endpoints(app) -> set[str]:
+    endpoints = set()
+    for route in app.routes:
+        if type(route).__name__ == "APIRoute":
+            endpoints.update(f"{method} {route.path}" for method in route.methods)
+        elif type(route).__name__ == "APIWebSocketRoute":
+            endpoints.add(f"WEBSOCKET {route.path}")
+    return endpoints
+
+def child_pids(pid: int) -> list[int]:
+    children = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # Field 4 is the parent pid; the command name before it may contain spaces
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        children.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    return children
+
+def rss_bytes(pids) -> int:
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * PAGE_SIZE
+        except OSError:
+            pass # Gone between samples
+    return total
+
+async def sample_peak_rss(pids, stop: asyncio.Event) -> int:
+    peak = rss_bytes(pids)
+    while not stop.is_set():
+        await asyncio.sleep(RSS_SAMPLE_SECONDS)
+        peak = max(peak, rss_bytes(pids))
+    return peak
+
+def percentile(sorted_values, fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, round(fraction * (len(sorted_values) - 1)))]
+
+async def run_scenario(client, scenario: Scenario, args, pids) -> dict:
+    count = min(args.requests, scenario.limit or args.requests)
+    warmup = min(args.warmup, count)
+    for i in range(warmup):
+        await client.request(scenario.method, **scenario.build(i))
+
+    latencies, statuses = [], Counter()
+    indices = iter(range(warmup, warmup + count))
+
+    async def worker():
+        for i in indices:
+            request = scenario.build(i)
+            started_at = time.perf_counter()
+            try:
+                response = await client.request(scenario.method, **request)
+                statuses[str(response.status_code)] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - started_at) * 1000)
+
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_peak_rss(pids, stop))
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started_at
+    stop.set()
+    peak_rss = await sampler
+
+    latencies.sort()
+    return {
+        "endpoint": f"{scenario.method} {scenario.route}",
+        "requests": count,
+        "errors": sum(n for status, n in statuses.items() if not status.isdigit() or int(status) >= 400),
+        "statuses": dict(statuses),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "mean_ms": round(sum(latencies) / count, 3),
+        "max_ms": round(latencies[-1], 3),
+        "throughput_rps": round(count / elapsed, 1),
+        "peak_rss_mb": round(peak_rss / 2**20, 1),
+    }
+
+async def log_in(client, fx: dict):
+    for key, username, password in (("organizer_token", "admin", "changeme"), ("player_token", fx["player_username"], SEED_PASSWORD)):
+        response = await client.post("/login", data={"username": username, "password": password})
+        response.raise_for_status()
+        fx[key] = response.json()["access_token"]
+    # A profiled request leaves an artifact for GET /admin/profiles/{profile_id} to serve
+    response = await client.get("/events", params={"profile": "1"}, headers={"Authorization": f"Bearer {fx['organizer_token']}"})
+    fx["profile_url"] = response.headers.get("X-Profile-Artifact")
+
+async def drive(client, fx: dict, args, pids) -> list[dict]:
+    await log_in(client, fx)
+    results = []
+    for scenario in build_scenarios(fx, random.Random(args.seed), args.bulk_rows):
+        if args.only and not re.search(args.only, f"{scenario.method} {scenario.route}"):
+            continue
+        result = await run_scenario(client, scenario, args, pids)
+        print(f"  {result['endpoint']:<58} p50 {result['p50_ms']:>8.1f} ms  p99 {result['p99_ms']:>8.1f} ms  {result['throughput_rps']:>7.1f} req/s"
+              + (f"  {result['errors']} errors {result['statuses']}" if result["errors"] else ""), flush=True)
+        results.append(result)
+    return results
+
+async def run_asgi(main, fx: dict, args) -> list[dict]:
+    await main.app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False) # Count a 500 like uvicorn would
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout) as client:
+            # The client shares the process, so its memory is counted too
+            return await drive(client, fx, args, [os.getpid()])
+    finally:
+        await main.app.router.shutdown()
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def run_uvicorn(directory: str, fx: dict, args) -> list[dict]:
+    port = free_port()
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", REPO_ROOT, "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(args.workers), "--no-access-log", "--log-level", "warning"]
+    log_path = os.path.join(directory, "server.log")
+    with open(log_path, "w") as log:
+        server = subprocess.Popen(command, cwd=directory, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise SystemExit(f"uvicorn did not start; see {log_path}")
+                try:
+                    # With several workers, wait until the supervisor has started all of them
+                    if (await client.get("/")).status_code == 200 and (args.workers == 1 or len(child_pids(server.pid)) >= args.workers):
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.2)
+            return await drive(client, fx, args, [server.pid, *child_pids(server.pid)])
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def table_counts(path: str) -> dict:
+    with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as connection:
+        return {table: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("users", "events", "event_registrations", "matches", "results", "league_standings", "change_log")}
+
+def print_report(report: dict, baseline: dict | None):
+    for mode, results in report["modes"].items():
+        previous = {result["endpoint"]: result for result in (baseline or {}).get("modes", {}).get(mode, [])}
+        print(f"\n{mode}")
+        print(f"{'endpoint':<58} {'n':>5} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'RSS MB':>7}" + (f" {'p95 vs base':>11} {'req/s vs base':>13}" if baseline else ""))
+        for result in results:
+            line = (f"{result['endpoint']:<58} {result['requests']:>5} {result['errors']:>4} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+                    f"{result['p99_ms']:>8.1f} {result['throughput_rps']:>8.1f} {result['peak_rss_mb']:>7.1f}")
+            if result["endpoint"] in previous:
+                before = previous[result["endpoint"]]
+                line += f" {result['p95_ms'] / before['p95_ms'] - 1:>+11.0%} {result['throughput_rps'] / before['throughput_rps'] - 1:>+13.0%}"
+            print(line)
+
+def main_benchmark(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", default=os.path.join(REPO_ROOT, "benchmarks", "data", "cup.db"), help="Seeded database (left untouched)")
+    parser.add_argument("--mode", action="append", choices=("asgi", "uvicorn"), help="Repeat to run both (default: both)")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="uvicorn worker processes")
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed requests per endpoint before the timed ones")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--bulk-rows", type=int, default=100, help="Rows per POST /results/bulk request")
+    parser.add_argument("--only", help="Regex; only endpoints like 'GET /events/{event_id}/matches' that match it run")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--keep", action="store_true", help="Keep the working copies of the database")
+    args = parser.parse_args(argv)
+    args.mode = args.mode or ["asgi", "uvicorn"]
+
+    if not os.path.exists(args.database):
+        raise SystemExit(f"{args.database} not found; run benchmarks/seed.py first")
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    commit = git_commit()
+    started_at = datetime.now(timezone.utc)
+    report = {
+        "commit": commit,
+        "started_at": started_at.isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+        "database": table_counts(args.database),
+        "modes": {},
+    }
+
+    workdir = tempfile.mkdtemp(prefix="cup-bench-")
+    try:
+        pool_size = args.warmup + args.requests
+        directories = {}
+        for mode in ("asgi", *args.mode):
+            if mode not in directories:
+                directories[mode] = prepare_directory(os.path.join(workdir, mode))
+                copy_database(args.database, directories[mode])
+        # main.py resolves ./cup.db, uploads/ and profiles/ against the working directory
+        os.chdir(directories["asgi"])
+        import main
+
+        endpoints = app_endpoints(main.app)
+        for mode in args.mode:
+            print(f"{mode}:", flush=True)
+            fx = prepare_fixtures(directories[mode], pool_size, args.bulk_rows, random.Random(args.seed))
+            if mode == "asgi":
+                report["modes"][mode] = asyncio.run(run_asgi(main, fx, args))
+            else:
+                report["modes"][mode] = asyncio.run(run_uvicorn(directories[mode], fx, args))
+        covered = {result["endpoint"] for results in report["modes"].values() for result in results}
+        report["skipped"] = {endpoint: reason for endpoint, reason in SKIPPED.items() if endpoint in endpoints}
+        report["uncovered"] = sorted(endpoints - covered - set(SKIPPED)) if not args.only else []
+    finally:
+        os.chdir(REPO_ROOT)
+        if args.keep:
+            print(f"Working copies kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(REPO_ROOT, "benchmarks", "results", f"{started_at:%Y%m%dT%H%M%S}-{(commit or 'nocommit')[:10]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print_report(report, baseline)
+    for endpoint in report["uncovered"]:
+        print(f"Not benchmarked: {endpoint} (add a Scenario to benchmarks/run.py)")
+    print(f"\nReport written to {output}")
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,165 @@
+"""Seed a cup.db with synthetic users, events, registrations, matches and results.
+
+The schema comes from schema.sql and the migrations (through main.init_db), so the file
+is exactly what the app would create; the rows are then written with batched
+executemany calls, one transaction per table. Every seeded player's password is
+SEED_PASSWORD. The same --seed gives the same database.
+
+    poetry run python benchmarks/seed.py --directory benchmarks/data --users 100000 --events 2000 --matches 500000
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+SEED_PASSWORD = "password"
+SEED_START_DATE = date(2025, 1, 1)
+
+def prepare_directory(directory: str) -> str:
+    # main.py works relative to its working directory (./cup.db, schema.sql, ./migrations,
+    # uploads/), so a data directory gets links to the repo's schema files
+    directory = os.path.abspath(directory)
+    os.makedirs(directory, exist_ok=True)
+    for name in ("schema.sql", "migrations"):
+        link = os.path.join(directory, name)
+        if not os.path.lexists(link):
+            os.symlink(os.path.join(REPO_ROOT, name), link)
+    return directory
+
+def insert_batches(connection, sql: str, rows, batch_size: int) -> int:
+    rows = iter(rows)
+    count = 0
+    with connection:
+        while batch := list(itertools.islice(rows, batch_size)):
+            connection.executemany(sql, batch)
+            count += len(batch)
+    return count
+
+def seed_database(args):
+    directory = prepare_directory(args.directory)
+    path = os.path.join(directory, "cup.db")
+    if os.path.exists(path):
+        if not args.force:
+            raise SystemExit(f"{path} already exists; pass --force to replace it")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    os.chdir(directory)
+    os.environ.setdefault("ACCESS_LOG_ENABLED", "0")
+    import main # Imported here: its paths resolve against the working directory
+    main.init_db()
+
+    rng = random.Random(args.seed)
+    started_at = time.perf_counter()
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = OFF") # A failed seed is simply rerun
+    connection.execute(f"PRAGMA cache_size = -{main.SQLITE_CACHE_SIZE_KB}")
+
+    password_hash = main.get_password_hash(SEED_PASSWORD) # bcrypt once, shared by every player
+    first_user_id = connection.execute("SELECT IFNULL(MAX(id), 0) + 1 FROM users").fetchone()[0]
+    registered_at = datetime(2024, 6, 1)
+    counts = {}
+    counts["users"] = insert_batches(
+        connection,
+        "INSERT INTO users (id, username, password_hash, email, registration_date, role) VALUES (?, ?, ?, ?, ?, 'player')",
+        ((first_user_id + i, f"player{i}", password_hash, f"player{i}@example.com", (registered_at + timedelta(minutes=i)).isoformat(sep=" "))
+         for i in range(args.users)),
+        args.batch_size,
+    )
+    user_ids = range(first_user_id, first_user_id + args.users)
+
+    knockout_events = min(args.knockout_events, args.events)
+    league_events = args.events - knockout_events
+    events = []
+    for i in range(args.events):
+        start = SEED_START_DATE + timedelta(days=rng.randrange(365))
+        mode = "league" if i < league_events else "knockout"
+        events.append((i + 1, f"{mode.title()} {i + 1}", f"Synthetic {mode} event", start.isoformat(), (start + timedelta(days=60)).isoformat(), mode))
+    counts["events"] = insert_batches(connection, "INSERT INTO events (id, name, description, start_date, end_date, mode) VALUES (?, ?, ?, ?, ?, ?)", events, args.batch_size)
+
+    per_event = min(args.registrations_per_event, args.users)
+    players = {event_id: rng.sample(user_ids, per_event) for event_id, *_ in events}
+    counts["event_registrations"] = insert_batches(
+        connection,
+        "INSERT INTO event_registrations (user_id, event_id, registration_date) VALUES (?, ?, ?)",
+        ((user_id, event_id, (registered_at + timedelta(seconds=position)).isoformat(sep=" "))
+         for event_id, event_players in players.items() for position, user_id in enumerate(event_players)),
+        args.batch_size,
+    )
+
+    def league_matches():
+        for index, (event_id, _, _, start, _, _) in enumerate(events[:league_events]):
+            start = date.fromisoformat(start)
+            for _ in range(args.matches // league_events + (index < args.matches % league_events)):
+                user1_id, user2_id = rng.sample(players[event_id], 2)
+                yield (event_id, "group", (start + timedelta(days=rng.randrange(60))).isoformat(),
+                       f"{rng.randrange(12, 22):02d}:{rng.choice(('00', '30'))}", user1_id, user2_id, f"Pitch {rng.randrange(1, 9)}")
+    if league_events and per_event >= 2:
+        counts["matches"] = insert_batches(
+            connection,
+            "INSERT INTO matches (event_id, stage, match_date, match_time, user1_id, user2_id, venue) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            league_matches(),
+            args.batch_size,
+        )
+
+    def league_results():
+        for match_id, user1_id, user2_id in connection.execute("SELECT id, user1_id, user2_id FROM matches ORDER BY id").fetchall():
+            if rng.random() >= args.results_ratio:
+                continue
+            user1_score, user2_score = rng.randrange(5), rng.randrange(5)
+            winner = user1_id if user1_score > user2_score else user2_id if user2_score > user1_score else None
+            yield (match_id, user1_score, user2_score, winner)
+    counts["results"] = insert_batches(
+        connection,
+        "INSERT INTO results (match_id, user1_score, user2_score, winner_user_id) VALUES (?, ?, ?, ?)",
+        league_results(),
+        args.batch_size,
+    )
+    connection.close()
+
+    # Brackets and standings come from the app's own code, so they match what it expects
+    db = main.SessionLocal()
+    try:
+        organizer = {"id": 1, "username": "admin", "role": "organizer"}
+        for event_id, *_ in events[league_events:]:
+            if per_event >= 2:
+                main.generate_fixtures(event_id, main.FixtureGenerate(), current_user=organizer, db=db)
+        main.rebuild_league_standings(db)
+        db.commit()
+        for table in ("matches", "league_standings", "change_log"):
+            counts[table] = db.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+        db.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    finally:
+        db.close()
+
+    for table, count in counts.items():
+        print(f"{table:<20} {count:>10}")
+    print(f"Seeded {path} in {time.perf_counter() - started_at:.1f}s")
+
+def main_seed(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--directory", default=os.path.join(REPO_ROOT, "benchmarks", "data"), help="Where cup.db is created")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--knockout-events", type=int, default=20, help="How many of the events are knockouts (their brackets are generated, unplayed)")
+    parser.add_argument("--registrations-per-event", type=int, default=50)
+    parser.add_argument("--matches", type=int, default=500000, help="League matches, spread evenly over the league events")
+    parser.add_argument("--results-ratio", type=float, default=1.0, help="Fraction of league matches that get a result")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="Replace an existing cup.db")
+    seed_database(parser.parse_args(argv))
+
+if __name__ == "__main__":
+    main_seed()
@@ -1,46 +1,456 @@
 import os
-from fastapi import FastAPI, Depends, HTTPException, status, APIRouter, File, UploadFile, Request, Response
+import sqlite3
+import sys
+import argparse
+import asyncio
+import base64
+import atexit
+import bisect
+import csv
+import email.utils
+import io
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import secrets
+import shutil
+import zlib
+from urllib.parse import parse_qsl, urlencode
+from fastapi import FastAPI, Depends, HTTPException, status, APIRouter, File, UploadFile, Request, Response, Query, WebSocket
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy import create_engine, text
+from sqlalchemy import event as sa_event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlalchemy.exc import OperationalError
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone, date, time
+import orjson
 import aiofiles
-import uuid
+import hashlib
+import tempfile
+import threading
+import time as time_module
+from collections import Counter, OrderedDict, deque
+from operator import itemgetter
+from concurrent.futures import Future, ThreadPoolExecutor
+import anyio.to_thread
 from fastapi.staticfiles import StaticFiles
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.routing import APIRoute
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.datastructures import MutableHeaders
+
+try:
+    import brotli # Optional: poetry install -E compression
+except ImportError:
+    brotli = None
+try:
+    import zstandard # Optional: poetry install -E compression
+except ImportError:
+    zstandard = None
+
+# Metrics: a small in-process registry, rendered in the Prometheus text format at /metrics.
+# Updates take one short per-metric lock. With several uvicorn workers, point METRICS_DIR
+# at a directory shared by the workers and emptied before they start: each worker writes
+# a snapshot there every METRICS_FLUSH_SECONDS and /metrics merges them, summing counters
+# and histograms over all workers and gauges over the live ones.
+METRICS_DIR = os.environ.get("METRICS_DIR")
+METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", "5"))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {} # label values -> value
+        self._lock = threading.Lock()
+        if not self.labelnames and self.kind in ("counter", "gauge"):
+            self._values[()] = 0 # Export unlabelled series from the start
+
+    def samples(self):
+        with self._lock:
+            return {labels: value for labels, value in self._values.items()}
+
+class CounterMetric(Metric):
+    kind = "counter"
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+class GaugeMetric(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues, amount: float = 1):
+        self.inc(*labelvalues, amount=-amount)
+
+class HistogramMetric(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labelvalues)
+            if counts is None:
+                # One count per bucket plus +Inf (not cumulative), then the sum
+                counts = self._values[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def samples(self):
+        with self._lock:
+            return {labels: list(counts) for labels, counts in self._values.items()}
+
+class CallbackMetric(Metric):
+    # Values owned elsewhere (cache counters, pool sizes), read when metrics are collected
+    def __init__(self, name: str, documentation: str, labelnames, kind: str, collect):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self._collect = collect
+
+    def samples(self):
+        return self._collect()
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: Metric):
+        self.metrics.append(metric)
+        return metric
+
+    def snapshot(self, include_gauges: bool = True):
+        metrics = {}
+        for metric in self.metrics:
+            if metric.kind == "gauge" and not include_gauges:
+                continue
+            metrics[metric.name] = {
+                "kind": metric.kind,
+                "documentation": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "samples": [[list(labels), value] for labels, value in metric.samples().items()],
+            }
+        return {"pid": os.getpid(), "metrics": metrics}
+
+metrics_registry = MetricsRegistry()
+
+http_requests_total = metrics_registry.register(CounterMetric("cup_http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")))
+http_request_duration_seconds = metrics_registry.register(HistogramMetric("cup_http_request_duration_seconds", "HTTP request latency by route template", ("method", "route")))
+http_requests_in_flight = metrics_registry.register(GaugeMetric("cup_http_requests_in_flight", "HTTP requests being handled"))
+threadpool_wait_seconds = metrics_registry.register(HistogramMetric("cup_threadpool_wait_seconds", "Time sync dependencies waited for a threadpool thread", buckets=WAIT_BUCKETS))
+threadpool_threads_busy = metrics_registry.register(GaugeMetric("cup_threadpool_threads_busy", "Threadpool threads in use, sampled at request start"))
+threadpool_tasks_waiting = metrics_registry.register(GaugeMetric("cup_threadpool_tasks_waiting", "Tasks waiting for a threadpool thread, sampled at request start"))
+db_pool_checkout_wait_seconds = metrics_registry.register(HistogramMetric("cup_db_pool_checkout_wait_seconds", "Time spent waiting for a pooled DB connection", ("pool",), buckets=WAIT_BUCKETS))
+password_hash_jobs = metrics_registry.register(GaugeMetric("cup_password_hash_jobs", "Password hash jobs queued or running on the bcrypt executor"))
+password_hash_rejected_total = metrics_registry.register(CounterMetric("cup_password_hash_rejected_total", "Password operations refused with 503 because the bcrypt executor was saturated"))
+upload_bytes_total = metrics_registry.register(CounterMetric("cup_upload_bytes_total", "Bytes of accepted match image uploads"))
+live_subscribers = metrics_registry.register(GaugeMetric("cup_live_subscribers", "Open live feed connections (SSE and WebSocket)"))
+live_resyncs_total = metrics_registry.register(CounterMetric("cup_live_resyncs_total", "Live feed subscribers told to reload because they fell too far behind"))
+compression_input_bytes_total = metrics_registry.register(CounterMetric("cup_compression_input_bytes_total", "Response bytes handed to the compressor by content coding", ("encoding",)))
+compression_output_bytes_total = metrics_registry.register(CounterMetric("cup_compression_output_bytes_total", "Compressed response bytes sent by content coding", ("encoding",)))
+jobs_completed_total = metrics_registry.register(CounterMetric("cup_jobs_completed_total", "Background jobs finished by kind", ("kind",)))
+jobs_retried_total = metrics_registry.register(CounterMetric("cup_jobs_retried_total", "Background job attempts that failed and were rescheduled, by kind", ("kind",)))
+jobs_failed_total = metrics_registry.register(CounterMetric("cup_jobs_failed_total", "Background jobs given up on after JOB_MAX_ATTEMPTS, by kind", ("kind",)))
+compression_seconds_total = metrics_registry.register(CounterMetric("cup_compression_seconds_total", "CPU time spent compressing responses by content coding", ("encoding",)))
+
+def format_metric_labels(pairs) -> str:
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def merge_metric_snapshots(snapshots):
+    # Returns {name: (description, {label values: value})}
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot["metrics"].items():
+            samples = merged.setdefault(name, (metric, {}))[1]
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                existing = samples.get(key)
+                if existing is None:
+                    samples[key] = value
+                elif metric["kind"] == "histogram":
+                    samples[key] = [a + b for a, b in zip(existing, value)]
+                else:
+                    samples[key] = existing + value
+    return merged
+
+def render_metrics(merged) -> str:
+    lines = []
+    for name, (metric, samples) in merged.items():
+        lines.append(f"# HELP {name} {metric['documentation']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        for labels, value in sorted(samples.items()):
+            pairs = list(zip(metric["labelnames"], labels))
+            if metric["kind"] == "histogram":
+                cumulative = 0
+                for bound, count in zip([*metric["buckets"], "+Inf"], value[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_metric_labels(pairs + [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{format_metric_labels(pairs)} {value[-1]}")
+                lines.append(f"{name}_count{format_metric_labels(pairs)} {cumulative}")
+            else:
+                lines.append(f"{name}{format_metric_labels(pairs)} {value}")
+    return "\n".join(lines) + "\n"
+
+def metrics_snapshot_path(pid: int):
+    return os.path.join(METRICS_DIR, f"metrics-{pid}.json")
 
-# Database configuration
-DATABASE_URL = "sqlite:///./cup.db"
+def write_metrics_snapshot(include_gauges: bool = True):
+    path = metrics_snapshot_path(os.getpid())
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(metrics_registry.snapshot(include_gauges), f)
+    os.replace(f"{path}.tmp", path) # Readers never see a half-written file
+
+def process_is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def collect_metrics() -> str:
+    if not METRICS_DIR:
+        return render_metrics(merge_metric_snapshots([metrics_registry.snapshot()]))
+
+    write_metrics_snapshot()
+    snapshots = []
+    for filename in os.listdir(METRICS_DIR):
+        if not (filename.startswith("metrics-") and filename.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, filename)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not process_is_alive(snapshot["pid"]):
+            # Counters of exited workers still count; their gauges no longer describe anything
+            snapshot["metrics"] = {name: metric for name, metric in snapshot["metrics"].items() if metric["kind"] != "gauge"}
+        snapshots.append(snapshot)
+    return render_metrics(merge_metric_snapshots(snapshots))
+
+metrics_flush_stop = threading.Event()
+
+def run_metrics_flusher():
+    while not metrics_flush_stop.wait(METRICS_FLUSH_SECONDS):
+        try:
+            write_metrics_snapshot()
+        except OSError as e:
+            logger.warning("metrics snapshot failed", extra={"fields": {"error": str(e)}})
+
+# Marks when FastAPI starts resolving a request's dependencies; the first sync
+# dependency to run on a worker thread (get_db) observes how long it waited for one.
+# A mutable holder, because context changes made in the worker thread don't flow back.
+threadpool_dispatch = contextvars.ContextVar("threadpool_dispatch", default=None)
+
+async def mark_threadpool_dispatch():
+    threadpool_dispatch.set([time_module.perf_counter()])
+
+def observe_threadpool_wait():
+    dispatch = threadpool_dispatch.get()
+    if dispatch is not None and dispatch[0] is not None:
+        threadpool_wait_seconds.observe(time_module.perf_counter() - dispatch[0])
+        dispatch[0] = None
+
+# Connection pools that record how long checkouts wait for a free connection
+class TimedPoolMixin:
+    metrics_label = "sync"
+
+    def _do_get(self):
+        started_at = time_module.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait_seconds.observe(time_module.perf_counter() - started_at, self.metrics_label)
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    metrics_label = "sync"
+
+class TimedAsyncQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+# Database configuration. SQLite keeps the -wal and -shm files next to the database, so
+# in a container mount the directory holding it, not just the file
+DATABASE_PATH = os.environ.get("DATABASE_PATH", "./cup.db")
+if os.path.dirname(DATABASE_PATH):
+    os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
+DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}" # Same file, used by the public read endpoints
+
+# SQLite runtime profile, applied to every new connection (override via environment)
+SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL") # WAL lets readers run alongside a writer
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL") # NORMAL is durable enough under WAL
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")) # Wait for locks instead of failing with "database is locked"
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", "65536")) # Page cache per connection, in KiB
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))) # Bytes of the DB file to memory-map
+SQLITE_TEMP_STORE = os.environ.get("SQLITE_TEMP_STORE", "MEMORY")
+SQLITE_FOREIGN_KEYS = os.environ.get("SQLITE_FOREIGN_KEYS", "ON") # Needed for the ON DELETE clauses in schema.sql
+
+# Sync handlers run on the AnyIO threadpool; size the connection pool to match it
+THREADPOOL_SIZE = int(os.environ.get("THREADPOOL_SIZE", "40"))
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", str(THREADPOOL_SIZE)))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+
+# Async handlers run on the event loop, not the threadpool; each aiosqlite connection
+# owns one background thread, so this pool bounds concurrent public reads instead
+ASYNC_DB_POOL_SIZE = int(os.environ.get("ASYNC_DB_POOL_SIZE", "20"))
+ASYNC_DB_MAX_OVERFLOW = int(os.environ.get("ASYNC_DB_MAX_OVERFLOW", "10"))
 
 # Create a SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+    poolclass=TimedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+)
+
+def apply_sqlite_pragmas(dbapi_connection):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        # A negative cache_size is interpreted by SQLite as KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA temp_store = {SQLITE_TEMP_STORE}")
+        cursor.execute(f"PRAGMA foreign_keys = {SQLITE_FOREIGN_KEYS}")
+    finally:
+        cursor.close()
+
+# Apply the runtime profile whenever the pool opens a new connection
+@sa_event.listens_for(engine, "connect")
+def on_engine_connect(dbapi_connection, connection_record):
+    apply_sqlite_pragmas(dbapi_connection)
 
 # Create a SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the public read endpoints, with the same runtime profile
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+    poolclass=TimedAsyncQueuePool,
+    pool_size=ASYNC_DB_POOL_SIZE,
+    max_overflow=ASYNC_DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+)
+
+@sa_event.listens_for(async_engine.sync_engine, "connect")
+def on_async_engine_connect(dbapi_connection, connection_record):
+    apply_sqlite_pragmas(dbapi_connection)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Versioned schema migrations, applied in order on top of schema.sql
+MIGRATIONS_DIRECTORY = "./migrations"
+
+def get_pending_migrations(current_version: int):
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIRECTORY)):
+        # Files are named NNNN_description.sql; NNNN becomes the schema version
+        if not filename.endswith(".sql"):
+            continue
+        version = int(filename.split("_", 1)[0])
+        if version > current_version:
+            migrations.append((version, os.path.join(MIGRATIONS_DIRECTORY, filename)))
+    return migrations
+
+def split_sql_script(script: str) -> list[str]:
+    # One statement at a time, so they run inside a transaction this code controls
+    # (executescript would commit it first); trigger bodies stay whole
+    statements = []
+    current = ""
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ""
+    if current.strip():
+        statements.append(current.strip())
+    return statements
+
+def run_migrations():
+    # Creates the schema from schema.sql on a new database, then applies pending
+    # migrations; the schema version is tracked in SQLite's PRAGMA user_version. Every
+    # worker process runs this at startup, so each step takes the write lock first
+    # (BEGIN IMMEDIATE) and re-reads the version inside that transaction: a worker that
+    # waited on another one finds the step applied and skips it
+    raw_connection = engine.raw_connection()
+    try:
+        sqlite_connection = raw_connection.driver_connection
+        isolation_level = sqlite_connection.isolation_level
+        sqlite_connection.isolation_level = None # The transactions below are explicit
+        try:
+            while True:
+                sqlite_connection.execute("BEGIN IMMEDIATE")
+                try:
+                    has_schema = sqlite_connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'").fetchone()
+                    current_version = sqlite_connection.execute("PRAGMA user_version").fetchone()[0]
+                    pending = get_pending_migrations(current_version)
+                    if has_schema and not pending:
+                        sqlite_connection.execute("COMMIT")
+                        return current_version
+                    path = "schema.sql" if not has_schema else pending[0][1]
+                    with open(path) as f:
+                        statements = split_sql_script(f.read())
+                    # The whole step and its version bump either apply together or not at all
+                    for statement in statements:
+                        sqlite_connection.execute(statement)
+                    if has_schema:
+                        sqlite_connection.execute(f"PRAGMA user_version = {pending[0][0]}")
+                    sqlite_connection.execute("COMMIT")
+                except Exception:
+                    if sqlite_connection.in_transaction:
+                        sqlite_connection.execute("ROLLBACK")
+                    raise
+                print("Database initialized successfully." if not has_schema else f"Applied migration {os.path.basename(path)}")
+        finally:
+            sqlite_connection.isolation_level = isolation_level
+    finally:
+        raw_connection.close()
+
 # Initialize the database
 def init_db():
-    # Check if database file exists, if not, create tables
-    if not os.path.exists("./cup.db"):
-        try:
-            with engine.connect() as connection:
-                with open("schema.sql") as f:
-                    # Read the SQL commands from the schema file
-                    schema_sql = f.read()
-                    # Execute each command to create tables
-                    for statement in schema_sql.split(';'):
-                        statement = statement.strip()
-                        if statement:
-                            # Wrap the statement with text()
-                            connection.execute(text(statement))
-            print("Database initialized successfully.")
-        except OperationalError as e:
-            print(f"Error initializing database: {e}")
+    # Create or bring both new and existing databases up to the latest schema version.
+    # The code depends on the migrated tables, columns and indexes, so a failed migration
+    # stops startup (and `python main.py migrate` exits non-zero) instead of serving errors
+    run_migrations()
 
     # Add a default admin user if the database is empty (or admin doesn't exist)
     try:
@@ -54,21 +464,208 @@ def init_db():
                 admin_password = "changeme" # !!! SECURITY RISK - CHANGE THIS !!!
                 hashed_admin_password = get_password_hash(admin_password)
 
-                # Insert the default admin user
-                connection.execute(
-                    text("INSERT INTO users (username, password_hash, role) VALUES (:username, :password_hash, :role)"),
+                # Insert the default admin user; another worker starting at the same time may win
+                created = connection.execute(
+                    text("INSERT INTO users (username, password_hash, role) VALUES (:username, :password_hash, :role) ON CONFLICT (username) DO NOTHING"),
                     {"username": admin_username, "password_hash": hashed_admin_password, "role": "organizer"}
-                )
+                ).rowcount
                 connection.commit()
-                print(f"Default admin user '{admin_username}' created. PLEASE CHANGE THE PASSWORD IMMEDIATELY!")
+                if created:
+                    print(f"Default admin user '{admin_username}' created. PLEASE CHANGE THE PASSWORD IMMEDIATELY!")
             else:
                 print(f"Admin user '{admin_username}' already exists.")
 
     except OperationalError as e:
         print(f"Error creating default admin user: {e}")
 
+# On-demand profiling: an organizer request carrying `X-Profile: 1` or `?profile=1` runs
+# its endpoint under a tracer that records every Python and C call. The call tree is
+# saved as a speedscope (https://www.speedscope.app) evented profile and its download
+# URL returned in X-Profile-Artifact. Requests without the flag only pay for the check.
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "1") == "1"
+PROFILE_DIRECTORY = os.environ.get("PROFILE_DIRECTORY", "./profiles")
+PROFILE_MAX_EVENTS = int(os.environ.get("PROFILE_MAX_EVENTS", "500000")) # Stop recording past this, to bound memory
+PROFILE_KEEP_FILES = int(os.environ.get("PROFILE_KEEP_FILES", "50")) # Older artifacts are deleted
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+
+class RequestProfile:
+    def __init__(self, name: str):
+        self.name = name
+        self.frames = [] # speedscope frame descriptions
+        self.frame_indexes = {}
+        self.events = [] # (type, frame index, perf_counter time)
+        self.stack = []
+        self.truncated = False
+        self.started_at = time_module.perf_counter()
+
+    def _frame_index(self, key):
+        index = self.frame_indexes.get(key)
+        if index is None:
+            name, file, line = key
+            index = self.frame_indexes[key] = len(self.frames)
+            self.frames.append({"name": name, "file": file, "line": line})
+        return index
+
+    def _trace(self, frame, event, arg):
+        now = time_module.perf_counter()
+        if event == "call":
+            code = frame.f_code
+            index = self._frame_index((getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno))
+        elif event == "c_call":
+            index = self._frame_index((f"{getattr(arg, '__module__', None) or 'builtins'}.{getattr(arg, '__qualname__', repr(arg))}", "<built-in>", 0))
+        elif self.stack:
+            # return, c_return, c_exception; returns of frames entered before tracing began are ignored
+            self.events.append(("C", self.stack.pop(), now))
+            return
+        else:
+            return
+        self.stack.append(index)
+        self.events.append(("O", index, now))
+        if len(self.events) >= PROFILE_MAX_EVENTS:
+            self.truncated = True
+            sys.setprofile(None)
+
+    def run(self, func, *args, **kwargs):
+        previous = sys.getprofile()
+        sys.setprofile(self._trace)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sys.setprofile(previous)
+
+    async def run_async(self, func, *args, **kwargs):
+        # Traces the event loop thread, so work of other requests interleaved at awaits shows up too
+        previous = sys.getprofile()
+        sys.setprofile(self._trace)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            sys.setprofile(previous)
+
+    def to_speedscope(self):
+        ended_at = self.events[-1][2] if self.events else self.started_at
+        events = [{"type": kind, "frame": index, "at": (at - self.started_at) * 1000} for kind, index, at in self.events]
+        # Close whatever was still open when tracing stopped
+        events.extend({"type": "C", "frame": index, "at": (ended_at - self.started_at) * 1000} for index in reversed(self.stack))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "cup",
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "evented",
+                "name": f"{self.name}{' (truncated)' if self.truncated else ''}",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": (ended_at - self.started_at) * 1000,
+                "events": events,
+            }],
+        }
+
+    def save(self) -> str:
+        os.makedirs(PROFILE_DIRECTORY, exist_ok=True)
+        profile_id = f"{int(time_module.time())}-{secrets.token_hex(4)}"
+        with open(os.path.join(PROFILE_DIRECTORY, f"{profile_id}.speedscope.json"), "wb") as f:
+            f.write(orjson.dumps(self.to_speedscope()))
+        artifacts = sorted(os.listdir(PROFILE_DIRECTORY)) # Ids start with a timestamp
+        for filename in artifacts[:-PROFILE_KEEP_FILES]:
+            os.remove(os.path.join(PROFILE_DIRECTORY, filename))
+        return profile_id
+
+active_profile = contextvars.ContextVar("active_profile", default=None)
+
+def wrap_endpoint_for_profiling(endpoint):
+    # functools.wraps keeps the signature FastAPI reads dependencies and annotations from
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def profiled_endpoint(*args, **kwargs):
+            profile = active_profile.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            return await profile.run_async(endpoint, *args, **kwargs)
+    else:
+        @functools.wraps(endpoint)
+        def profiled_endpoint(*args, **kwargs):
+            profile = active_profile.get()
+            if profile is None:
+                return endpoint(*args, **kwargs)
+            return profile.run(endpoint, *args, **kwargs)
+    return profiled_endpoint
+
+async def authorize_profiling(request: Request):
+    # Same checks as Depends(is_organizer), with a session of its own
+    token = await oauth2_scheme(request)
+
+    def check_organizer():
+        with SessionLocal() as db:
+            return is_organizer(get_current_user(token, db))
+
+    await run_in_threadpool(check_organizer)
+
+class ProfiledRoute(APIRoute):
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, wrap_endpoint_for_profiling(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def profiled_route_handler(request: Request):
+            if request.headers.get("x-profile") != "1" and request.query_params.get("profile") != "1":
+                return await handler(request)
+
+            await authorize_profiling(request)
+            profile = RequestProfile(f"{request.method} {self.path}")
+            token = active_profile.set(profile)
+            try:
+                response = await handler(request)
+            finally:
+                active_profile.reset(token)
+            profile_id = await run_in_threadpool(profile.save)
+            response.headers["X-Profile-Artifact"] = f"/admin/profiles/{profile_id}"
+            return response
+
+        return profiled_route_handler
+
 # Create FastAPI app
-app = FastAPI()
+app = FastAPI(dependencies=[Depends(mark_threadpool_dispatch)])
+if PROFILING_ENABLED:
+    app.router.route_class = ProfiledRoute
+
+# Reject oversized multipart bodies while they stream in, before the form parser spools them.
+# Added before the other middleware so they wrap it: its 413s still get CORS headers and
+# show up in the access log and metrics
+MAX_FILE_SIZE = 5 * 1024 * 1024 # 5 MB in bytes
+MAX_UPLOAD_REQUEST_SIZE = MAX_FILE_SIZE + 64 * 1024 # File plus multipart framing and form fields
+class UploadSizeLimitMiddleware:
+    def __init__(self, app, max_body_size: int):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not get_header(scope, b"content-type").startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = get_header(scope, b"content-length")
+        if content_length.isdigit() and int(content_length) > self.max_body_size:
+            response = Response(content=json.dumps({"detail": f"File size exceeds the maximum limit of {MAX_FILE_SIZE // 1024 // 1024}MB"}), status_code=413, media_type="application/json")
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def receive_with_limit():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise HTTPException(status_code=413, detail=f"File size exceeds the maximum limit of {MAX_FILE_SIZE // 1024 // 1024}MB")
+            return message
+
+        await self.app(scope, receive_with_limit, send)
+
+app.add_middleware(UploadSizeLimitMiddleware, max_body_size=MAX_UPLOAD_REQUEST_SIZE)
 
 # Configure CORS
 origins = [
@@ -85,77 +682,770 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], # Allow all methods (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"], # Allow all headers (including Authorization)
+    expose_headers=["X-Next-Cursor", "X-SQL-Stats", "X-Profile-Artifact"], # Let the admin pages read the pagination cursor
 )
 
-# Custom middleware for logging requests and responses
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    print(f"\n>>> Request: {request.method} {request.url}")
-
-    # Log request body for relevant methods
-    try:
-        body = await request.body()
-        if body:
-            print(f"Request body: {body.decode()}")
-    except Exception as e:
-        print(f"Could not read request body: {e}")
-
-    response = await call_next(request)
-
-    print(f"<<< Response: {response.status_code}")
+# Structured logging: handlers enqueue records and a background listener thread
+# formats and writes them, so request handling never blocks on stdout/stderr
+ACCESS_LOG_ENABLED = os.environ.get("ACCESS_LOG_ENABLED", "1") == "1"
+ACCESS_LOG_CAPTURE_BODIES = os.environ.get("ACCESS_LOG_CAPTURE_BODIES", "0") == "1" # Off by default
+ACCESS_LOG_BODY_SAMPLE_RATE = float(os.environ.get("ACCESS_LOG_BODY_SAMPLE_RATE", "0.01")) # Fraction of requests whose bodies are captured
+ACCESS_LOG_BODY_MAX_BYTES = int(os.environ.get("ACCESS_LOG_BODY_MAX_BYTES", "2048")) # Cap per captured body
+
+logger = logging.getLogger("cup")
+access_logger = logging.getLogger("cup.access")
+
+class StructuredFormatter(logging.Formatter):
+    # One JSON object per line; structured fields are passed through `extra={"fields": {...}}`
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str)
+
+class InProcessQueueHandler(logging.handlers.QueueHandler):
+    # The stock QueueHandler formats in the caller's thread; leave that to the listener
+    def prepare(self, record):
+        return record
+
+def configure_logging():
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(StructuredFormatter())
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    logger.addHandler(InProcessQueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+log_listener = configure_logging()
+
+# Keys whose values never reach the logs
+SENSITIVE_FIELDS = {"password", "password_hash", "access_token", "refresh_token", "token", "secret", "authorization"}
+
+def redact(value):
+    if isinstance(value, dict):
+        return {key: "[REDACTED]" if key.lower() in SENSITIVE_FIELDS else redact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+def redact_body(body: bytes, content_type: str, truncated: bool):
+    if not body:
+        return None
+    if content_type.startswith("multipart/"):
+        return "[multipart body omitted]"
+    text_body = body.decode("utf-8", errors="replace")
+    if content_type.startswith("application/json") and not truncated:
+        try:
+            return json.dumps(redact(json.loads(text_body)))
+        except ValueError:
+            pass
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        fields = [(key, "[REDACTED]" if key.lower() in SENSITIVE_FIELDS else item) for key, item in parse_qsl(text_body, keep_blank_values=True)]
+        return urlencode(fields)
+    if any(field in text_body.lower() for field in SENSITIVE_FIELDS):
+        # Can't parse it reliably (e.g. truncated JSON), so don't risk leaking anything
+        return "[body omitted: may contain credentials]"
+    return text_body + ("...[truncated]" if truncated else "")
+
+def get_route_template(scope):
+    # The router stores the matched route in the scope, e.g. /events/{event_id}/matches
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+def get_header(scope, name: bytes):
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+def parse_accept_encoding(header: str):
+    # {"gzip": 1.0, "br": 0.5, ...}; codings refused with q=0 are left out
+    codings = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            codings[coding.lower()] = quality
+    return codings
+
+# Response compression: negotiates zstd, br or gzip from Accept-Encoding (highest q wins,
+# ties go to the first coding in COMPRESSION_PREFERENCE that is installed). Only allowlisted
+# content types are compressed, single-message bodies under COMPRESSION_MIN_SIZE are sent
+# as they are, and streamed bodies are flushed chunk by chunk so clients see rows as soon as
+# they are produced. Added right after CORS so it sits inside the access log and metrics
+# middlewares, which therefore count the bytes actually sent.
+COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "1") == "1"
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024")) # Bytes
+COMPRESSION_GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", "6")) # 1-9
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "4")) # 0-11
+COMPRESSION_ZSTD_LEVEL = int(os.environ.get("COMPRESSION_ZSTD_LEVEL", "3")) # 1-22
+COMPRESSION_PREFERENCE = tuple(os.environ.get("COMPRESSION_PREFERENCE", "zstd,br,gzip").split(","))
+COMPRESSION_CONTENT_TYPES = set(os.environ.get("COMPRESSION_CONTENT_TYPES", "application/json,application/x-ndjson,text/csv,text/plain,text/html").split(","))
+COMPRESSION_THREADPOOL_MIN_BYTES = int(os.environ.get("COMPRESSION_THREADPOOL_MIN_BYTES", str(256 * 1024))) # Larger chunks are compressed off the event loop
+
+def compression_available(coding: str) -> bool:
+    return coding == "gzip" or (coding == "br" and brotli is not None) or (coding == "zstd" and zstandard is not None)
+
+def negotiate_encoding(header: str):
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for coding in COMPRESSION_PREFERENCE:
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if quality > best_quality and compression_available(coding):
+            best, best_quality = coding, quality
+    return best
+
+class ResponseCompressor:
+    # One streaming compressor per response. compress() returns everything produced so far
+    # (sync-flushed, so the client can decode it without waiting for the rest); finish()
+    # additionally ends the stream.
+    def __init__(self, coding: str):
+        self.coding = coding
+        if coding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+        elif coding == "br":
+            self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, finish: bool = False) -> bytes:
+        started_at = time_module.perf_counter()
+        if self.coding == "zstd":
+            output = self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH if finish else zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        elif self.coding == "br":
+            output = self._compressor.process(data) + (self._compressor.finish() if finish else self._compressor.flush())
+        else:
+            output = self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if finish else zlib.Z_SYNC_FLUSH)
+        compression_seconds_total.inc(self.coding, amount=time_module.perf_counter() - started_at)
+        compression_input_bytes_total.inc(self.coding, amount=len(data))
+        compression_output_bytes_total.inc(self.coding, amount=len(output))
+        return output
+
+def should_compress(status_code: int, headers: MutableHeaders) -> bool:
+    if status_code < 200 or status_code in (204, 304) or "content-encoding" in headers:
+        return False
+    if "no-transform" in headers.get("cache-control", ""):
+        return False
+    content_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+    return content_type in COMPRESSION_CONTENT_TYPES
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED or scope["path"].startswith(STATIC_URL_PATH + "/"):
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate_encoding(get_header(scope, b"accept-encoding"))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+
+        async def compress(data: bytes, finish: bool) -> bytes:
+            if len(data) >= COMPRESSION_THREADPOOL_MIN_BYTES:
+                return await run_in_threadpool(compressor.compress, data, finish)
+            return compressor.compress(data, finish)
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether it is worth compressing
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                start, start_message = start_message, None
+                headers = MutableHeaders(raw=start["headers"])
+                if (not more_body and len(body) < COMPRESSION_MIN_SIZE) or not should_compress(start["status"], headers):
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = ResponseCompressor(coding)
+                headers["Content-Encoding"] = coding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = "W/" + etag # No longer byte-for-byte the representation it was computed from
+                if more_body:
+                    if "content-length" in headers:
+                        del headers["content-length"]
+                    await send(start)
+                else:
+                    body = await compress(body, True)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+            if compressor is None:
+                await send(message)
+                return
+            await send({"type": "http.response.body", "body": await compress(body, not more_body), "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+app.add_middleware(CompressionMiddleware)
+
+# Access log middleware: passes request and response streams through untouched and
+# emits one structured record per request after the response has been sent
+class AccessLogMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ACCESS_LOG_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time_module.perf_counter()
+        response_status = 500
+        response_bytes = 0
+        response_content_type = ""
+        capture_bodies = ACCESS_LOG_CAPTURE_BODIES and random.random() < ACCESS_LOG_BODY_SAMPLE_RATE
+        request_body = bytearray()
+        response_body = bytearray()
+        request_truncated = False
+        response_truncated = False
+
+        async def receive_and_capture():
+            nonlocal request_truncated
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                room = ACCESS_LOG_BODY_MAX_BYTES - len(request_body)
+                if len(chunk) > room:
+                    request_truncated = True
+                request_body.extend(chunk[:max(room, 0)])
+            return message
+
+        async def send_and_record(message):
+            nonlocal response_status, response_bytes, response_content_type, response_truncated
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+                for key, value in message.get("headers", ()):
+                    if key == b"content-type":
+                        response_content_type = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                response_bytes += len(chunk)
+                if capture_bodies:
+                    room = ACCESS_LOG_BODY_MAX_BYTES - len(response_body)
+                    if len(chunk) > room:
+                        response_truncated = True
+                    response_body.extend(chunk[:max(room, 0)])
+            await send(message)
 
-    # Log response body - need to read and then stream it back
-    try:
-        # Read the response body
-        response_body = b""
-        async for chunk in response.body_iterator:
-            response_body += chunk
+        try:
+            await self.app(scope, receive_and_capture if capture_bodies else receive, send_and_record)
+        finally:
+            fields = {
+                "method": scope["method"],
+                "route": get_route_template(scope),
+                "path": scope["path"],
+                "status": response_status,
+                "duration_ms": round((time_module.perf_counter() - started_at) * 1000, 3),
+                "response_bytes": response_bytes,
+                "client": scope["client"][0] if scope.get("client") else None,
+            }
+            sql_stats = request_sql_stats.get()
+            if sql_stats is not None:
+                fields["sql_count"] = sql_stats.count
+                fields["sql_ms"] = round(sql_stats.total_ms, 3)
+            if capture_bodies:
+                fields["request_body"] = redact_body(bytes(request_body), get_header(scope, b"content-type"), request_truncated)
+                fields["response_body"] = redact_body(bytes(response_body), response_content_type, response_truncated)
+            access_logger.info("request", extra={"fields": fields})
+
+app.add_middleware(AccessLogMiddleware)
+
+# SQL instrumentation: engine hooks attribute every statement to the current request
+# through a context variable (copied into threadpool threads and async DB greenlets),
+# log slow statements, and flag requests that repeat one statement too often (N+1)
+DEBUG = os.environ.get("DEBUG", "0") == "1" # Adds the X-SQL-Stats response header
+SQL_SLOW_QUERY_MS = float(os.environ.get("SQL_SLOW_QUERY_MS", "100"))
+SQL_REPEAT_THRESHOLD = int(os.environ.get("SQL_REPEAT_THRESHOLD", "10")) # Same statement more often than this in one request
+
+sql_logger = logging.getLogger("cup.sql")
+
+class RequestSQLStats:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.statements = Counter() # normalized SQL -> executions
+
+    def record(self, statement: str, duration_ms: float):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.statements[statement] += 1
+
+    def repeated_statements(self):
+        return [(statement, count) for statement, count in self.statements.most_common() if count > SQL_REPEAT_THRESHOLD]
+
+    def header_value(self):
+        return f"count={self.count};total_ms={self.total_ms:.2f};max_ms={self.max_ms:.2f};repeated={len(self.repeated_statements())}"
+
+request_sql_stats = contextvars.ContextVar("request_sql_stats", default=None)
+
+SQL_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+SQL_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+SQL_PLACEHOLDER_LIST = re.compile(r"\(\?(?:\s*,\s*\?)+\)")
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(statement: str) -> str:
+    # Literals become ?, so the same query with different constants counts as one statement
+    statement = SQL_STRING_LITERAL.sub("?", statement)
+    statement = SQL_NUMBER_LITERAL.sub("?", statement)
+    statement = SQL_PLACEHOLDER_LIST.sub("(?, ...)", statement)
+    return " ".join(statement.split())
+
+def describe_parameters(parameters, executemany: bool) -> str:
+    # Types only; values may be password hashes or tokens
+    if executemany:
+        return f"{len(parameters)} x {describe_parameters(parameters[0], False)}" if parameters else "0 x ()"
+    if isinstance(parameters, dict):
+        return "(" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + ")"
+    return "(" + ", ".join(type(value).__name__ for value in parameters or ()) + ")"
+
+def before_sql_execute(conn, cursor, statement, parameters, context, executemany):
+    context._sql_started_at = time_module.perf_counter()
+
+def after_sql_execute(conn, cursor, statement, parameters, context, executemany):
+    duration_ms = (time_module.perf_counter() - context._sql_started_at) * 1000
+    normalized = normalize_sql(statement)
+    stats = request_sql_stats.get()
+    if stats is not None:
+        stats.record(normalized, duration_ms)
+    if duration_ms >= SQL_SLOW_QUERY_MS:
+        sql_logger.warning("slow query", extra={"fields": {
+            "statement": normalized,
+            "parameters": describe_parameters(parameters, executemany),
+            "duration_ms": round(duration_ms, 3),
+        }})
+
+for instrumented_engine in (engine, async_engine.sync_engine):
+    sa_event.listen(instrumented_engine, "before_cursor_execute", before_sql_execute)
+    sa_event.listen(instrumented_engine, "after_cursor_execute", after_sql_execute)
+
+class SQLStatsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSQLStats()
+        token = request_sql_stats.set(stats)
+
+        async def send_with_stats(message):
+            if DEBUG and message["type"] == "http.response.start":
+                # Statements run while the body streams are not included
+                message["headers"] = [*message.get("headers", []), (b"x-sql-stats", stats.header_value().encode())]
+            await send(message)
 
-        # Print the response body
-        print(f"Response body: {response_body.decode()}")
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            request_sql_stats.reset(token)
+            for statement, count in stats.repeated_statements():
+                sql_logger.warning("repeated statement", extra={"fields": {
+                    "method": scope["method"],
+                    "route": get_route_template(scope),
+                    "statement": statement,
+                    "executions": count,
+                }})
+
+# Added after AccessLogMiddleware so it wraps it and the access log can read the stats
+app.add_middleware(SQLStatsMiddleware)
+
+# Request count, latency and in-flight requests per route template (never the raw path,
+# which would give every event and match its own series)
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        threadpool_threads_busy.set(limiter.borrowed_tokens)
+        threadpool_tasks_waiting.set(limiter.statistics().tasks_waiting)
+
+        started_at = time_module.perf_counter()
+        response_status = 500
+        http_requests_in_flight.inc()
+
+        async def send_and_record(message):
+            nonlocal response_status
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+            await send(message)
 
-        # Create a new response with the same body, status, and headers
-        return Response(content=response_body, status_code=response.status_code, headers=dict(response.headers), media_type=response.media_type)
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            http_requests_in_flight.dec()
+            route = get_route_template(scope)
+            http_requests_total.inc(scope["method"], route, str(response_status))
+            http_request_duration_seconds.observe(time_module.perf_counter() - started_at, scope["method"], route)
 
-    except Exception as e:
-        print(f"Could not read or process response body for logging: {e}")
-        # If reading response body fails, just return the original response
-        return response
+app.add_middleware(MetricsMiddleware)
 
 # Mount static files directory
-UPLOAD_DIRECTORY = "./uploads"
+UPLOAD_DIRECTORY = os.environ.get("UPLOAD_DIRECTORY", "./uploads")
+# Unfinished uploads are written next to UPLOAD_DIRECTORY, not inside it where they would
+# be served. It must be on the same filesystem (and mount), so finished uploads can be
+# renamed into place.
+UPLOAD_TEMP_DIRECTORY = os.environ.get("UPLOAD_TEMP_DIRECTORY", UPLOAD_DIRECTORY.rstrip("/") + "-incoming")
 STATIC_URL_PATH = "/static/uploads"
-MAX_FILE_SIZE = 5 * 1024 * 1024 # 5 MB in bytes
-ALLOWED_FILE_TYPES = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"} # Allowed image extensions
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Allowed image types, identified by their leading magic bytes rather than the filename
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+    (b"BM", ".bmp"),
+]
+
+def sniff_image_extension(header: bytes):
+    for signature, extension in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return extension
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return ".webp"
+    return None
 
-# Create upload directory if it doesn't exist
-if not os.path.exists(UPLOAD_DIRECTORY):
-    os.makedirs(UPLOAD_DIRECTORY)
+# Create upload directories if they don't exist
+os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
+os.makedirs(UPLOAD_TEMP_DIRECTORY, exist_ok=True)
+# Earlier versions kept unfinished uploads in uploads/.incoming, where they were served
+shutil.rmtree(os.path.join(UPLOAD_DIRECTORY, ".incoming"), ignore_errors=True)
 
 app.mount(STATIC_URL_PATH, StaticFiles(directory=UPLOAD_DIRECTORY), name="static_uploads")
 
+def upload_path_from_url(file_url: str):
+    # Map a stored URL back to a path inside UPLOAD_DIRECTORY (None if it points elsewhere)
+    prefix = STATIC_URL_PATH + "/"
+    if not file_url or not file_url.startswith(prefix):
+        return None
+    relative_path = os.path.normpath(file_url[len(prefix):])
+    if relative_path.startswith("..") or os.path.isabs(relative_path):
+        return None
+    return os.path.join(UPLOAD_DIRECTORY, relative_path)
+
+# Any match slot may point at a given (content-addressed) file
+UPLOAD_REFERENCE_SQL = """
+    SELECT 1 FROM matches
+    WHERE user1_screenshot_url = :file_url
+        OR user1_tactics_url = :file_url
+        OR user2_screenshot_url = :file_url
+        OR user2_tactics_url = :file_url
+    LIMIT 1
+"""
+
+def delete_unreferenced_uploads(db: Session, file_urls):
+    # Runs as a background job once the DB change has been committed. Identical uploads
+    # share one file, so only files no match refers to any more are removed; a file
+    # that is already gone counts as deleted, so running the job twice is harmless.
+    # Each file is checked and removed while holding SQLite's write lock. An upload holds
+    # it too, from pointing a match at its file until it commits, so a re-upload of the
+    # same content either sees the file gone and puts it back, or is seen here and kept.
+    for file_url in set(url for url in file_urls if url):
+        file_local_path = upload_path_from_url(file_url)
+        if file_local_path is None:
+            continue
+        db.execute(text("BEGIN IMMEDIATE"))
+        try:
+            if db.execute(text(UPLOAD_REFERENCE_SQL), {"file_url": file_url}).fetchone():
+                continue
+            try:
+                os.remove(file_local_path)
+                logger.info("deleted upload", extra={"fields": {"path": file_local_path}})
+            except FileNotFoundError:
+                logger.info("upload already gone", extra={"fields": {"path": file_local_path}})
+            # Any other OSError propagates, and the job is retried later
+        finally:
+            db.rollback() # Nothing was written; this only releases the lock
+
+# Background jobs: work that can wait until after the response (deleting upload files)
+# is written to the jobs table inside the request's own transaction, so it is queued
+# exactly when the change commits and survives a restart. Each process runs
+# JOB_WORKER_THREADS threads that claim due jobs in batches of JOB_BATCH_SIZE. A claim is
+# a lease: jobs held by a process that died are taken over once it runs out. A failing
+# job is retried with exponential backoff and marked failed after JOB_MAX_ATTEMPTS.
+JOB_WORKER_THREADS = int(os.environ.get("JOB_WORKER_THREADS", "1")) # 0: only `python main.py jobs --run` processes them
+JOB_BATCH_SIZE = int(os.environ.get("JOB_BATCH_SIZE", "50"))
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "2")) # Jobs queued by other processes are noticed this often
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "8"))
+JOB_RETRY_BASE_SECONDS = float(os.environ.get("JOB_RETRY_BASE_SECONDS", "2")) # Doubles with every failed attempt
+JOB_RETRY_MAX_SECONDS = float(os.environ.get("JOB_RETRY_MAX_SECONDS", "3600"))
+JOB_RETENTION_SECONDS = float(os.environ.get("JOB_RETENTION_SECONDS", str(7 * 24 * 3600))) # Finished jobs are pruned after this
+JOB_PRUNE_INTERVAL_SECONDS = 3600
+# change_log entries older than this are pruned along with finished jobs; 0 keeps them all
+CHANGE_LOG_RETENTION_SECONDS = float(os.environ.get("CHANGE_LOG_RETENTION_SECONDS", str(30 * 24 * 3600)))
+CHANGE_LOG_PRUNE_BATCH_SIZE = 5000 # Entries deleted per transaction, so writers are not held up
+
+# kind -> handler(db, payload); handlers must be idempotent, a job can run more than once
+JOB_HANDLERS = {
+    "delete_uploads": lambda db, payload: delete_unreferenced_uploads(db, payload["file_urls"]),
+}
+
+# Claiming moves run_after to the end of the lease, so one condition covers both due
+# pending jobs and running jobs whose worker has gone away
+JOB_CLAIM_SQL = """
+    UPDATE jobs SET status = 'running', attempts = attempts + 1, run_after = :lease_until
+    WHERE id IN (
+        SELECT id FROM jobs
+        WHERE status IN ('pending', 'running') AND run_after <= :now
+        ORDER BY run_after
+        LIMIT :batch_size
+    )
+    RETURNING id, kind, payload, attempts
+"""
+
+def enqueue_job(db: Session, kind: str, payload: dict):
+    # Part of the caller's transaction; the workers are woken once it commits
+    db.execute(text("INSERT INTO jobs (kind, payload, run_after) VALUES (:kind, :payload, :now)"),
+               {"kind": kind, "payload": json.dumps(payload), "now": time_module.time()})
+    db.info["jobs_enqueued"] = True
+
+def enqueue_upload_cleanup(db: Session, file_urls):
+    file_urls = sorted(set(url for url in file_urls if url))
+    if file_urls:
+        enqueue_job(db, "delete_uploads", {"file_urls": file_urls})
+
+@sa_event.listens_for(SessionLocal, "after_commit")
+def wake_job_workers(session):
+    if session.info.pop("jobs_enqueued", False):
+        job_runner.wake()
+
+@sa_event.listens_for(SessionLocal, "after_rollback")
+def forget_enqueued_jobs(session):
+    session.info.pop("jobs_enqueued", None)
+
+def job_retry_delay(attempts: int) -> float:
+    return min(JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), JOB_RETRY_MAX_SECONDS)
+
+def run_due_jobs(batch_size: int = JOB_BATCH_SIZE) -> int:
+    # Claims and runs one batch; returns how many jobs were claimed
+    db = SessionLocal()
+    try:
+        now = time_module.time()
+        jobs = db.execute(text(JOB_CLAIM_SQL), {"now": now, "lease_until": now + JOB_LEASE_SECONDS, "batch_size": batch_size}).fetchall()
+        db.commit()
+        done = []
+        for job in jobs:
+            try:
+                JOB_HANDLERS[job.kind](db, json.loads(job.payload))
+            except Exception as e:
+                db.rollback()
+                error = f"{type(e).__name__}: {e}"
+                fields = {"job_id": job.id, "kind": job.kind, "attempts": job.attempts, "error": error}
+                if job.attempts >= JOB_MAX_ATTEMPTS:
+                    db.execute(text("UPDATE jobs SET status = 'failed', last_error = :error, finished_at = :now WHERE id = :id"),
+                               {"id": job.id, "error": error, "now": time_module.time()})
+                    jobs_failed_total.inc(job.kind)
+                    logger.error("job failed", extra={"fields": fields})
+                else:
+                    db.execute(text("UPDATE jobs SET status = 'pending', last_error = :error, run_after = :run_after WHERE id = :id"),
+                               {"id": job.id, "error": error, "run_after": time_module.time() + job_retry_delay(job.attempts)})
+                    jobs_retried_total.inc(job.kind)
+                    logger.warning("job will be retried", extra={"fields": fields})
+                db.commit()
+            else:
+                done.append(job.id)
+                jobs_completed_total.inc(job.kind)
+        if done:
+            db.execute(text("UPDATE jobs SET status = 'done', last_error = NULL, finished_at = :now WHERE id IN (SELECT value FROM json_each(:ids))"),
+                       {"ids": json.dumps(done), "now": time_module.time()})
+            db.commit()
+        return len(jobs)
+    finally:
+        db.close()
+
+def prune_finished_jobs() -> int:
+    db = SessionLocal()
+    try:
+        deleted = db.execute(text("DELETE FROM jobs WHERE status = 'done' AND finished_at < :cutoff"), {"cutoff": time_module.time() - JOB_RETENTION_SECONDS}).rowcount
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+# The newest entry of each table and of each event is kept whatever its age: they are the
+# validators behind the ETags and the user cache (TABLE_VERSION_SQL, EVENT_VERSION_SQL)
+CHANGE_LOG_PRUNE_SQL = """
+    DELETE FROM change_log WHERE seq IN (
+        SELECT seq FROM change_log
+        WHERE seq <= :horizon
+            AND seq NOT IN (SELECT MAX(seq) FROM change_log GROUP BY table_name)
+            AND seq NOT IN (SELECT MAX(seq) FROM change_log WHERE event_id IS NOT NULL GROUP BY event_id)
+        ORDER BY seq
+        LIMIT :batch_size
+    )
+"""
+
+CHANGE_LOG_HORIZON_SQL = """
+    SELECT COALESCE(
+        (SELECT seq FROM change_log WHERE changed_at >= :cutoff ORDER BY seq LIMIT 1) - 1,
+        (SELECT MAX(seq) FROM change_log),
+        0
+    )
+"""
+
+def prune_change_log() -> int:
+    if CHANGE_LOG_RETENTION_SECONDS <= 0:
+        return 0
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=CHANGE_LOG_RETENTION_SECONDS)).strftime("%Y-%m-%d %H:%M:%S")
+    db = SessionLocal()
+    try:
+        # seq and changed_at grow together, so everything before the first recent entry is old
+        horizon = db.execute(text(CHANGE_LOG_HORIZON_SQL), {"cutoff": cutoff}).scalar()
+        # Raised before anything is deleted, so no client is sent an incomplete history
+        db.execute(text("UPDATE change_log_retention SET pruned_through = MAX(pruned_through, :horizon) WHERE id = 1"), {"horizon": horizon})
+        db.commit()
+        deleted = 0
+        while batch := db.execute(text(CHANGE_LOG_PRUNE_SQL), {"horizon": horizon, "batch_size": CHANGE_LOG_PRUNE_BATCH_SIZE}).rowcount:
+            db.commit()
+            deleted += batch
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+class JobRunner:
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self, thread_count: int):
+        self._stop.clear()
+        for index in range(thread_count):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        next_prune = 0.0
+        while not self._stop.is_set():
+            claimed = 0
+            try:
+                claimed = run_due_jobs()
+                if time_module.monotonic() >= next_prune:
+                    prune_finished_jobs()
+                    prune_change_log()
+                    next_prune = time_module.monotonic() + JOB_PRUNE_INTERVAL_SECONDS
+            except Exception:
+                # e.g. the database stayed locked past the busy timeout; try again next poll
+                logger.exception("job runner error")
+            if claimed < JOB_BATCH_SIZE:
+                # A full batch means more may be due, so only sleep after a partial one
+                self._wake.wait(JOB_POLL_SECONDS)
+                self._wake.clear()
+
+job_runner = JobRunner()
+
 # Password hashing setup
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12")) # Work factor; existing hashes are upgraded on login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt runs on its own executor (bcrypt releases the GIL while hashing) so a burst of
+# logins cannot occupy every threadpool slot; work beyond the queue is rejected with 503.
+# Keep PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE well below THREADPOOL_SIZE.
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get("PASSWORD_HASH_QUEUE_SIZE", "8"))
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+password_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE)
+
+def run_password_job(func, *args):
+    if not password_slots.acquire(blocking=False):
+        password_hash_rejected_total.inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many password operations in progress, please retry",
+            headers={"Retry-After": "1"},
+        )
+    password_hash_jobs.inc()
+    try:
+        future = password_executor.submit(func, *args)
+    except Exception:
+        password_hash_jobs.dec()
+        password_slots.release()
+        raise
+    future.add_done_callback(finish_password_job)
+    return future.result()
+
+def finish_password_job(future):
+    password_hash_jobs.dec()
+    password_slots.release()
 
 # JWT configuration (replace with a strong, unique secret in production)
 SECRET_KEY = "YOUR_SUPER_SECRET_KEY" # CHANGE THIS IN PRODUCTION
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def verify_and_update_password(plain_password, hashed_password):
+    # Returns (valid, new_hash); new_hash is set when the stored hash uses an outdated work factor
+    return run_password_job(pwd_context.verify_and_update, plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return run_password_job(pwd_context.hash, password)
 
 # Dependency to get DB Session
 def get_db():
+    observe_threadpool_wait()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+# Dependency to get an async DB Session (for async def routes)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # Pydantic model for user registration
 class UserCreate(BaseModel):
     username: str
@@ -307,6 +1597,35 @@ class ParticipantResponse(BaseModel):
     class Config:
         orm_mode = True
 
+# Pydantic model for a match with its result, as shown on the event page
+class EventMatchDetail(BaseModel):
+    id: int
+    event_id: int
+    stage: str | None = None
+    match_date: date | None = None
+    match_time: time | None = None
+    user1_id: int | None = None
+    user1_username: str | None = None
+    user2_id: int | None = None
+    user2_username: str | None = None
+    venue: str | None = None
+    user1_screenshot_url: str | None = None
+    user1_tactics_url: str | None = None
+    user2_screenshot_url: str | None = None
+    user2_tactics_url: str | None = None
+    result_id: int | None = None
+    user1_score: int | None = None
+    user2_score: int | None = None
+    winner_user_id: int | None = None
+
+# Pydantic model for the aggregate event page response
+class EventFullResponse(BaseModel):
+    event: EventResponse
+    participants: list[ParticipantResponse]
+    matches: list[EventMatchDetail]
+    standings: list[dict] | None = None # Only for league events
+    is_registered: bool # Whether the caller (if authenticated) is registered
+
 # Pydantic model for user update (Organizer)
 class UserUpdate(BaseModel):
     username: str | None = None
@@ -325,6 +1644,83 @@ class Token(BaseModel):
     token_type: str
     role: str
 
+# Fast serialization for list endpoints: rows are mapped straight to JSON bytes with
+# orjson by an encoder compiled once per response model, instead of FastAPI validating
+# every row against response_model. Routes keep response_model for OpenAPI and return
+# the encoded body. The output matches Pydantic's for the values SQLite stores.
+def datetime_to_json(value):
+    # SQLite's CURRENT_TIMESTAMP uses a space separator; Pydantic emits ISO 8601 with 'T'
+    if isinstance(value, str):
+        if len(value) == 19 and value[10] == " ":
+            return f"{value[:10]}T{value[11:]}"
+        return datetime.fromisoformat(value).isoformat()
+    return value
+
+def time_to_json(value):
+    # Pydantic always includes seconds
+    if isinstance(value, str):
+        if len(value) == 5:
+            return f"{value}:00"
+        if len(value) != 8:
+            return time.fromisoformat(value).isoformat()
+    return value
+
+JSON_CONVERTERS = {datetime: datetime_to_json, time: time_to_json}
+
+class ListEncoder:
+    def __init__(self, model: type[BaseModel]):
+        # (field name, converter or None, default) in model order
+        self.fields = []
+        for name, field in model.model_fields.items():
+            types = [field.annotation, *getattr(field.annotation, "__args__", ())]
+            converter = next((JSON_CONVERTERS[t] for t in types if t in JSON_CONVERTERS), None)
+            self.fields.append((name, converter, None if field.is_required() else field.default))
+        self._layouts = {} # column names of a query -> how to build items from its rows
+
+    def _layout(self, columns: tuple):
+        layout = self._layouts.get(columns)
+        if layout is None:
+            present = [(name, converter) for name, converter, default in self.fields if name in columns]
+            names = [name for name, converter in present]
+            getter = itemgetter(*[columns.index(name) for name in names]) if len(names) > 1 else None
+            converters = [(name, converter) for name, converter in present if converter is not None]
+            # Fields the query doesn't select are sent with their model default, as Pydantic would
+            defaults = {name: default for name, converter, default in self.fields if name not in columns}
+            layout = (names, getter, converters, defaults)
+            self._layouts[columns] = layout
+        return layout
+
+    def items(self, rows) -> list[dict]:
+        if not rows:
+            return []
+        names, getter, converters, defaults = self._layout(tuple(rows[0]._fields))
+        if getter is None:
+            index = rows[0]._fields.index(names[0])
+            items = [{names[0]: row[index]} for row in rows]
+        else:
+            items = [dict(zip(names, getter(row))) for row in rows]
+        for item in items:
+            for name, converter in converters:
+                value = item[name]
+                if value is not None:
+                    item[name] = converter(value)
+            if defaults:
+                item.update(defaults)
+        return items
+
+    def encode(self, rows) -> bytes:
+        return orjson.dumps(self.items(rows))
+
+    def response(self, rows, headers=None) -> Response:
+        return Response(content=self.encode(rows), media_type="application/json", headers=headers)
+
+event_list_encoder = ListEncoder(EventResponse)
+match_list_encoder = ListEncoder(MatchResponse)
+result_list_encoder = ListEncoder(ResultResponse)
+user_list_encoder = ListEncoder(UserResponse)
+participant_list_encoder = ListEncoder(ParticipantResponse)
+match_history_encoder = ListEncoder(UserMatchHistory)
+
 # User registration endpoint
 @app.post("/register")
 def register_user(user: UserCreate, db: Session = Depends(get_db)):
@@ -348,25 +1744,27 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
 # User login endpoint
 @app.post("/login", response_model=Token)
 def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    # Print received username
-    print(f"\nAttempting login for username: {form_data.username}")
+    logger.info("login attempt", extra={"fields": {"username": form_data.username}})
 
     # Authenticate user
     # Fetch role along with id and password_hash
     user_row = db.execute(text("SELECT id, password_hash, role FROM users WHERE username = :username"), {"username": form_data.username}).fetchone()
 
-    # Print user data fetched from DB
-    print(f"Fetched user data from DB: {user_row}")
-
-    if not user_row or not verify_password(form_data.password, user_row[1]):
-        print("Authentication failed.")
+    password_valid, upgraded_hash = verify_and_update_password(form_data.password, user_row[1]) if user_row else (False, None)
+    if not password_valid:
+        logger.info("login failed", extra={"fields": {"username": form_data.username}})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    print("Authentication successful.")
+    logger.info("login succeeded", extra={"fields": {"username": form_data.username}})
+
+    # Re-hash with the current work factor if BCRYPT_ROUNDS has changed
+    if upgraded_hash:
+        db.execute(text("UPDATE users SET password_hash = :password_hash WHERE id = :id"), {"password_hash": upgraded_hash, "id": user_row[0]})
+        db.commit()
 
     # Convert user_row to dictionary for easier access
     user = dict(user_row._mapping)
@@ -375,7 +1773,6 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     # Include user role in the token data
     access_token_data = {"sub": form_data.username, "role": user['role']}
-    print(f"Data included in access token: {access_token_data}")
 
     access_token = create_access_token(
         data=access_token_data, expires_delta=access_token_expires
@@ -383,10 +1780,67 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
 
     # Prepare response data using the Pydantic model
     response_data = Token(access_token=access_token, token_type="bearer", role=user['role'])
-    print(f"Returning login response: {response_data.model_dump_json()}") # Print JSON representation
 
     return response_data
 
+# Bounded, thread-safe LRU cache whose entries also expire after a TTL
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time_module.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time_module.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize, "ttl_seconds": self.ttl}
+
+# Authenticated-user caches: decoded token -> username, and username -> user row.
+# The caches live in each worker process, so a cached row is only used while the newest
+# users entry in change_log (migration 0005) is the one it was read under: a role change
+# or deletion made through any worker applies on the next request everywhere. Checking
+# costs one index lookup instead of the user query.
+AUTH_CACHE_TTL_SECONDS = float(os.environ.get("AUTH_CACHE_TTL_SECONDS", "30"))
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get("AUTH_CACHE_MAX_ENTRIES", "10000"))
+token_cache = TTLCache(maxsize=AUTH_CACHE_MAX_ENTRIES, ttl=AUTH_CACHE_TTL_SECONDS)
+user_cache = TTLCache(maxsize=AUTH_CACHE_MAX_ENTRIES, ttl=AUTH_CACHE_TTL_SECONDS)
+
+def invalidate_cached_user(username: str):
+    user_cache.invalidate(username)
+
 # Dependency to get current user (requires authentication)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
@@ -396,14 +1850,41 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    username = verify_token(token, credentials_exception)
-    # Fetch user with role to determine permissions
-    user = db.execute(text("SELECT id, username, role FROM users WHERE username = :username"), {"username": username}).fetchone()
-    if user is None:
-        raise credentials_exception
-    # Convert SQLAlchemy Row to dictionary for consistent access
-    # Use ._mapping for reliable conversion
-    return dict(user._mapping)
+    username = token_cache.get(token)
+    if username is None:
+        payload = decode_access_token(token, credentials_exception)
+        username = payload["sub"]
+        # Never keep a token cached past its own expiry
+        token_cache.set(token, username, ttl=payload["exp"] - time_module.time())
+
+    # Read the version before the row, so a write in between only makes the row newer
+    users_version = db.execute(text(TABLE_VERSION_SQL), {"table_name": "users"}).fetchone()
+    users_version = users_version.seq if users_version else None
+    cached = user_cache.get(username)
+    if cached is not None and cached[0] == users_version:
+        user = cached[1]
+    else:
+        # Fetch user with role to determine permissions
+        user_row = db.execute(text("SELECT id, username, role FROM users WHERE username = :username"), {"username": username}).fetchone()
+        if user_row is None:
+            raise credentials_exception
+        # Convert SQLAlchemy Row to dictionary for consistent access
+        # Use ._mapping for reliable conversion
+        user = dict(user_row._mapping)
+        user_cache.set(username, (users_version, user))
+    # Hand out a copy so callers cannot modify the cached entry
+    return dict(user)
+
+# Dependency to get the current user if a valid token was sent, or None for anonymous callers
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
+
+def get_optional_current_user(token: str | None = Depends(oauth2_scheme_optional), db: Session = Depends(get_db)):
+    if token is None:
+        return None
+    try:
+        return get_current_user(token=token, db=db)
+    except HTTPException:
+        return None
 
 # Dependency to check if user is an organizer
 def is_organizer(current_user: dict = Depends(get_current_user)):
@@ -423,11 +1904,55 @@ def create_event(event: EventCreate, current_user: dict = Depends(is_organizer),
 
     return {"message": "Event created successfully"}
 
+# Conditional GET for the public read endpoints. Their validators are the newest change_log
+# entries (migration 0005) covering the response: an index lookup each, so a client or
+# proxy holding the current copy gets 304 before any of the real queries run. Validators
+# are read before the data, so a write in between only makes the body newer than its ETag.
+PUBLIC_CACHE_MAX_AGE = int(os.environ.get("PUBLIC_CACHE_MAX_AGE", "5")) # Seconds a reverse proxy may serve a copy without revalidating
+EVENT_VERSION_SQL = "SELECT seq, changed_at FROM change_log WHERE event_id = :event_id ORDER BY seq DESC LIMIT 1"
+TABLE_VERSION_SQL = "SELECT seq, changed_at FROM change_log WHERE table_name = :table_name ORDER BY seq DESC LIMIT 1"
+
+def client_has_current_copy(request: Request, etag: str, last_modified: datetime):
+    # If-None-Match wins when both are sent (RFC 9110): Last-Modified has one-second
+    # resolution, so a write in the same second as the client's copy would go unnoticed
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison: bodies may be re-encoded (gzip) on the way out
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified <= since.replace(tzinfo=since.tzinfo or timezone.utc)
+    return False
+
+async def get_conditional_headers(request: Request, db: AsyncSession, event_id: int | None = None, tables=()):
+    # Returns (validator and caching headers, 304 response if the client's copy is current)
+    versions = []
+    if event_id is not None:
+        versions.append((await db.execute(text(EVENT_VERSION_SQL), {"event_id": event_id})).fetchone())
+    for table_name in tables:
+        versions.append((await db.execute(text(TABLE_VERSION_SQL), {"table_name": table_name})).fetchone())
+    if not versions or None in versions:
+        return {}, None # Nothing logged (e.g. unknown event): answer normally
+    etag = 'W/"' + "-".join(str(version.seq) for version in versions) + '"'
+    last_modified = max(datetime.fromisoformat(version.changed_at).replace(tzinfo=timezone.utc) for version in versions)
+    headers = {"ETag": etag, "Last-Modified": email.utils.format_datetime(last_modified, usegmt=True), "Cache-Control": f"public, max-age={PUBLIC_CACHE_MAX_AGE}"}
+    if client_has_current_copy(request, etag, last_modified):
+        return headers, Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return headers, None
+
 # Get all events (Currently public, could add is_organizer if needed)
 @app.get("/events", response_model=list[EventResponse])
-def get_events(db: Session = Depends(get_db)):
-    events = db.execute(text("SELECT id, name, description, start_date, end_date, mode FROM events")).fetchall()
-    return events
+async def get_events(request: Request, db: AsyncSession = Depends(get_async_db)):
+    headers, not_modified = await get_conditional_headers(request, db, tables=("events",))
+    if not_modified:
+        return not_modified
+    events = (await db.execute(text("SELECT id, name, description, start_date, end_date, mode FROM events"))).fetchall()
+    return event_list_encoder.response(events, headers=headers)
 
 # Get a specific event by ID (Organizer only)
 @app.get("/events/{event_id}", response_model=EventResponse)
@@ -456,12 +1981,21 @@ def update_event(event_id: int, event_update: EventUpdate, current_user: dict =
 
     db.execute(query, update_fields)
     db.commit()
+    standings_cache.invalidate(event_id)
 
     # Fetch the updated event to return in the response
     updated_event = db.execute(text("SELECT id, name, description, start_date, end_date, mode FROM events WHERE id = :id"), {"id": event_id}).fetchone()
     return updated_event
 
 # Delete an event by ID (Organizer only)
+# Only matches with at least one upload; the upload URL indexes find them
+EVENT_MATCH_FILES_SQL = """
+    SELECT user1_screenshot_url, user1_tactics_url, user2_screenshot_url, user2_tactics_url
+    FROM matches
+    WHERE event_id = :event_id
+        AND (user1_screenshot_url IS NOT NULL OR user1_tactics_url IS NOT NULL OR user2_screenshot_url IS NOT NULL OR user2_tactics_url IS NOT NULL)
+"""
+
 @app.delete("/events/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_event(event_id: int, current_user: dict = Depends(is_organizer), db: Session = Depends(get_db)):
     # Check if event exists
@@ -469,30 +2003,102 @@ def delete_event(event_id: int, current_user: dict = Depends(is_organizer), db:
     if not existing_event:
         raise HTTPException(status_code=404, detail="Event not found")
 
+    # The event's matches go with it (ON DELETE CASCADE), and so do their uploads
+    file_urls = []
+    for row in db.execute(text(EVENT_MATCH_FILES_SQL), {"event_id": event_id}):
+        file_urls += [row.user1_screenshot_url, row.user1_tactics_url, row.user2_screenshot_url, row.user2_tactics_url]
     db.execute(text("DELETE FROM events WHERE id = :id"), {"id": event_id})
+    enqueue_upload_cleanup(db, file_urls)
     db.commit()
+    standings_cache.invalidate(event_id)
     return # No content to return for 204
 
 # Get matches for a specific event
+EVENT_MATCHES_SQL = "SELECT id, event_id, stage, match_date, match_time, user1_id, user2_id, venue, user1_screenshot_url, user1_tactics_url, user2_screenshot_url, user2_tactics_url FROM matches WHERE event_id = :event_id"
+
 @app.get("/events/{event_id}/matches", response_model=list[MatchResponse])
-def get_event_matches(event_id: int, db: Session = Depends(get_db)):
+async def get_event_matches(event_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    headers, not_modified = await get_conditional_headers(request, db, event_id=event_id)
+    if not_modified:
+        return not_modified
+
     # Check if event exists (optional, but good practice)
-    event = db.execute(text("SELECT id FROM events WHERE id = :event_id"), {"event_id": event_id}).fetchone()
+    event = (await db.execute(text("SELECT id FROM events WHERE id = :event_id"), {"event_id": event_id})).fetchone()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    matches = (await db.execute(text(EVENT_MATCHES_SQL), {"event_id": event_id})).fetchall()
+    return match_list_encoder.response(matches, headers=headers)
+
+# Get everything the event page needs in one request (Public, registration status if authenticated)
+EVENT_MATCH_DETAILS_SQL = """
+    SELECT
+        m.id,
+        m.event_id,
+        m.stage,
+        m.match_date,
+        m.match_time,
+        m.user1_id,
+        u1.username AS user1_username,
+        m.user2_id,
+        u2.username AS user2_username,
+        m.venue,
+        m.user1_screenshot_url,
+        m.user1_tactics_url,
+        m.user2_screenshot_url,
+        m.user2_tactics_url,
+        r.id AS result_id,
+        r.user1_score,
+        r.user2_score,
+        r.winner_user_id
+    FROM matches m
+    LEFT JOIN users u1 ON m.user1_id = u1.id
+    LEFT JOIN users u2 ON m.user2_id = u2.id
+    LEFT JOIN results r ON m.id = r.match_id
+    WHERE m.event_id = :event_id
+    ORDER BY m.match_date, m.match_time, m.id
+"""
+
+@app.get("/events/{event_id}/full", response_model=EventFullResponse)
+def get_event_full(event_id: int, current_user: dict | None = Depends(get_optional_current_user), db: Session = Depends(get_db)):
+    # A fixed number of set-based queries, independent of the number of matches
+    event = db.execute(text("SELECT id, name, description, start_date, end_date, mode FROM events WHERE id = :id"), {"id": event_id}).fetchone()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
 
-    matches = db.execute(text("SELECT id, event_id, stage, match_date, match_time, user1_id, user2_id, venue, user1_screenshot_url, user1_tactics_url, user2_screenshot_url, user2_tactics_url FROM matches WHERE event_id = :event_id"), {"event_id": event_id}).fetchall()
-    return matches
+    participants = db.execute(text(EVENT_PARTICIPANTS_SQL), {"event_id": event_id}).fetchall()
+    matches = db.execute(text(EVENT_MATCH_DETAILS_SQL), {"event_id": event_id}).fetchall()
+
+    standings = None
+    if event.mode == 'league':
+        standings = get_cached_standings(db, event_id)[0]
+
+    is_registered = current_user is not None and any(participant.id == current_user['id'] for participant in participants)
+
+    return {
+        "event": event._mapping,
+        "participants": [participant._mapping for participant in participants],
+        "matches": [match._mapping for match in matches],
+        "standings": standings,
+        "is_registered": is_registered,
+    }
 
 # Get results for a specific match
+MATCH_RESULT_SQL = "SELECT id, match_id, user1_score, user2_score, winner_user_id FROM results WHERE match_id = :match_id"
+
 @app.get("/matches/{match_id}/results", response_model=ResultResponse | None)
-def get_match_results(match_id: int, db: Session = Depends(get_db)):
+async def get_match_results(match_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     # Check if match exists (optional)
-    match = db.execute(text("SELECT id FROM matches WHERE id = :match_id"), {"match_id": match_id}).fetchone()
+    match = (await db.execute(text("SELECT id, event_id FROM matches WHERE id = :match_id"), {"match_id": match_id})).fetchone()
     if not match:
         raise HTTPException(status_code=404, detail="Match not found")
 
-    result = db.execute(text("SELECT id, match_id, user1_score, user2_score, winner_user_id FROM results WHERE match_id = :match_id"), {"match_id": match_id}).fetchone()
+    headers, not_modified = await get_conditional_headers(request, db, event_id=match.event_id)
+    if not_modified:
+        return not_modified
+    response.headers.update(headers)
+
+    result = (await db.execute(text(MATCH_RESULT_SQL), {"match_id": match_id})).fetchone()
     return result # Returns None if no result found for the match
 
 # User registration for an event (individual)
@@ -571,7 +2177,7 @@ def read_users_me(current_user: dict = Depends(get_current_user), db: Session =
         raise HTTPException(status_code=404, detail="User not found")
 
     # Convert the SQLAlchemy Row to a dictionary for the Pydantic model
-    user_dict = dict(user)
+    user_dict = dict(user._mapping)
 
     return UserResponse(**user_dict)
 
@@ -604,6 +2210,9 @@ def update_users_me(user_update: UserProfileUpdate, current_user: dict = Depends
 
     db.execute(query, update_fields)
     db.commit()
+    invalidate_cached_user(current_user['username'])
+    if "username" in update_fields:
+        standings_cache.invalidate() # Usernames appear in every standings table the user is in
 
     # Fetch the updated user to return in the response
     updated_user = db.execute(text("SELECT id, username, email, registration_date, role FROM users WHERE id = :id"), {"id": user_id}).fetchone()
@@ -614,10 +2223,64 @@ def update_users_me(user_update: UserProfileUpdate, current_user: dict = Depends
 def read_root():
     return {"Hello": "World"}
 
+# In-process cache statistics (Organizer only)
+@app.get("/admin/cache-stats")
+def get_cache_stats(current_user: dict = Depends(is_organizer)):
+    return {"token_cache": token_cache.stats(), "user_cache": user_cache.stats(), "standings_cache": standings_cache.stats()}
+
+def close_database():
+    # Fold the WAL back into the database file and empty it, so the file alone is a
+    # complete copy once the app has stopped. Another worker still reading keeps its part
+    # of the WAL (the checkpoint reports busy), which is harmless: the last one to stop
+    # finishes it
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    engine.dispose()
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
-    init_db() 
+    # Match the threadpool running the sync handlers to the DB connection pool
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    init_db()
+    live_feed.start(asyncio.get_running_loop())
+    job_runner.start(JOB_WORKER_THREADS)
+    if METRICS_DIR:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        threading.Thread(target=run_metrics_flusher, name="metrics-flusher", daemon=True).start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    password_executor.shutdown(wait=False)
+    await run_in_threadpool(job_runner.stop)
+    await async_engine.dispose()
+    await run_in_threadpool(close_database)
+    if METRICS_DIR:
+        metrics_flush_stop.set()
+        write_metrics_snapshot(include_gauges=False)
+
+# Download a profile recorded with X-Profile: 1 (Organizer only)
+@app.get("/admin/profiles/{profile_id}")
+def get_profile(profile_id: str, current_user: dict = Depends(is_organizer)):
+    path = os.path.join(PROFILE_DIRECTORY, f"{profile_id}.speedscope.json")
+    if not PROFILE_ID_PATTERN.match(profile_id) or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=f"{profile_id}.speedscope.json")
+
+# Cache counters and pool occupancy are kept by their owners and read at collection time
+def collect_cache_counters(attribute: str):
+    caches = {"token": token_cache, "user": user_cache, "standings": standings_cache}
+    return {(name,): getattr(cache, attribute) for name, cache in caches.items()}
+
+metrics_registry.register(CallbackMetric("cup_cache_hits_total", "Cache hits by cache", ("cache",), "counter", lambda: collect_cache_counters("hits")))
+metrics_registry.register(CallbackMetric("cup_cache_misses_total", "Cache misses by cache", ("cache",), "counter", lambda: collect_cache_counters("misses")))
+metrics_registry.register(CallbackMetric("cup_db_pool_connections_checked_out", "DB connections currently checked out", ("pool",), "gauge",
+                                         lambda: {("sync",): engine.pool.checkedout(), ("async",): async_engine.pool.checkedout()}))
+
+# Prometheus scrape endpoint; async so that it answers even when the threadpool is saturated
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(content=collect_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 def create_access_token(
     data: dict, expires_delta: timedelta | None = None
@@ -631,18 +2294,17 @@ def create_access_token(
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(
+def decode_access_token(
     token: str,
     credentials_exception
 ):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+        if payload.get("sub") is None or payload.get("exp") is None:
             raise credentials_exception
-        return username
+        return payload
     except JWTError:
-        raise credentials_exception 
+        raise credentials_exception
 
 # Create a new user (Organizer only)
 @app.post("/users", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -667,11 +2329,66 @@ def create_user(user: UserCreate, current_user: dict = Depends(is_organizer), db
     created_user = db.execute(text("SELECT id, username, email, registration_date, role FROM users WHERE id = :id"), {"id": new_user_id}).fetchone()
     return created_user
 
+# Keyset pagination for the organizer list endpoints: each page continues after the
+# sort key of the previous page's last row, so a page costs the same at any depth.
+# The key is handed to the client as an opaque cursor in the X-Next-Cursor header,
+# which is omitted on the last page.
+PAGE_SIZE_DEFAULT = int(os.environ.get("PAGE_SIZE_DEFAULT", "100"))
+PAGE_SIZE_MAX = int(os.environ.get("PAGE_SIZE_MAX", "1000"))
+
+USER_PAGE_KEY = ["id"]
+# NULL dates and times sort first; IFNULL keeps the keys comparable and matches the indexes in 0003
+MATCH_PAGE_KEY = ["IFNULL(match_date, '')", "IFNULL(match_time, '')", "id"]
+RESULT_PAGE_KEY = ["r.id"]
+REGISTRATION_PAGE_KEY = ["user_id", "event_id"]
+
+def encode_cursor(key_values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key_values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, key_length: int) -> list:
+    try:
+        key_values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        key_values = None
+    if (not isinstance(key_values, list) or len(key_values) != key_length
+            or not all(isinstance(value, (int, str)) and not isinstance(value, bool) for value in key_values)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key_values
+
+def fetch_page(db: Session, select_sql: str, page_key: list[str], row_key, where_clauses: list[str], params: dict, limit: int, cursor: str | None, response: Response):
+    # row_key(row) returns the values of page_key for a fetched row
+    if cursor is not None:
+        cursor_params = {f"cursor_{i}": value for i, value in enumerate(decode_cursor(cursor, len(page_key)))}
+        placeholders = ", ".join(f":{name}" for name in cursor_params)
+        # SQLite only seeks on a row-value comparison through its leading column, so bound that separately
+        where_clauses = where_clauses + [f"{page_key[0]} >= :cursor_0", f"({', '.join(page_key)}) > ({placeholders})"]
+        params = {**params, **cursor_params}
+
+    query = select_sql
+    if where_clauses:
+        query += f" WHERE {' AND '.join(where_clauses)}"
+    query += f" ORDER BY {', '.join(page_key)} LIMIT :page_limit"
+
+    # One extra row tells whether there is a next page
+    rows = db.execute(text(query), {**params, "page_limit": limit + 1}).fetchall()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(row_key(rows[-1]))
+    return rows
+
 # Get all users (Organizer only)
 @app.get("/users", response_model=list[UserResponse])
-def get_all_users(current_user: dict = Depends(is_organizer), db: Session = Depends(get_db)):
-    users = db.execute(text("SELECT id, username, email, registration_date, role FROM users")).fetchall()
-    return users
+def get_all_users(response: Response, current_user: dict = Depends(is_organizer), role: str | None = None, limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX), cursor: str | None = None, db: Session = Depends(get_db)):
+    params = {}
+    where_clauses = []
+
+    if role is not None:
+        where_clauses.append("role = :role")
+        params["role"] = role
+
+    users = fetch_page(db, "SELECT id, username, email, registration_date, role FROM users", USER_PAGE_KEY,
+                       lambda row: [row.id], where_clauses, params, limit, cursor, response)
+    return user_list_encoder.response(users, headers=response.headers)
 
 # Get a specific user by ID (Organizer only)
 @app.get("/users/{user_id}", response_model=UserResponse)
@@ -685,7 +2402,7 @@ def get_user(user_id: int, current_user: dict = Depends(is_organizer), db: Sessi
 @app.put("/users/{user_id}", response_model=UserResponse)
 def update_user(user_id: int, user_update: UserUpdate, current_user: dict = Depends(is_organizer), db: Session = Depends(get_db)):
     # Check if user exists
-    existing_user = db.execute(text("SELECT id, password_hash FROM users WHERE id = :id"), {"id": user_id}).fetchone()
+    existing_user = db.execute(text("SELECT id, username, password_hash FROM users WHERE id = :id"), {"id": user_id}).fetchone()
     if not existing_user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -707,60 +2424,55 @@ def update_user(user_id: int, user_update: UserUpdate, current_user: dict = Depe
 
     db.execute(query, update_fields)
     db.commit()
+    invalidate_cached_user(existing_user.username)
+    if "username" in update_fields:
+        standings_cache.invalidate() # Usernames appear in every standings table the user is in
 
     # Fetch the updated user to return in the response
     updated_user = db.execute(text("SELECT id, username, email, registration_date, role FROM users WHERE id = :id"), {"id": user_id}).fetchone()
     return updated_user
 
 # Delete a user by ID (Organizer only)
+USER_MATCH_FILES_SQL = """
+    SELECT
+        user1_id,
+        user1_screenshot_url,
+        user1_tactics_url,
+        user2_id,
+        user2_screenshot_url,
+        user2_tactics_url
+    FROM matches
+    WHERE user1_id = :user_id OR user2_id = :user_id
+"""
+
 @app.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_user(user_id: int, current_user: dict = Depends(is_organizer), db: Session = Depends(get_db)):
     # Check if user exists
-    existing_user = db.execute(text("SELECT id FROM users WHERE id = :id"), {"id": user_id}).fetchone()
+    existing_user = db.execute(text("SELECT id, username FROM users WHERE id = :id"), {"id": user_id}).fetchone()
     if not existing_user:
         raise HTTPException(status_code=404, detail="User not found")
 
     # Find all matches where this user is a participant and get file URLs
-    user_matches_files = db.execute(text("""
-        SELECT
-            user1_id,
-            user1_screenshot_url,
-            user1_tactics_url,
-            user2_id,
-            user2_screenshot_url,
-            user2_tactics_url
-        FROM matches
-        WHERE user1_id = :user_id OR user2_id = :user_id
-    """), {"user_id": user_id}).fetchall()
+    user_matches_files = db.execute(text(USER_MATCH_FILES_SQL), {"user_id": user_id}).fetchall()
 
     # Collect all file URLs associated with this user
     file_urls_to_delete = []
     for match in user_matches_files:
+        match = match._mapping
         if match['user1_id'] == user_id:
-            if match['user1_screenshot_url']: file_urls_to_delete.append(match['user1_screenshot_url'])
-            if match['user1_tactics_url']: file_urls_to_delete.append(match['user1_tactics_url'])
+            file_urls_to_delete += [match['user1_screenshot_url'], match['user1_tactics_url']]
         if match['user2_id'] == user_id:
-            if match['user2_screenshot_url']: file_urls_to_delete.append(match['user2_screenshot_url'])
-            if match['user2_tactics_url']: file_urls_to_delete.append(match['user2_tactics_url'])
-
-    # Delete associated files
-    for file_url in file_urls_to_delete:
-        if file_url:
-            # Construct local file path from URL
-            filename = os.path.basename(file_url)
-            file_local_path = os.path.join(UPLOAD_DIRECTORY, filename)
-            try:
-                if os.path.exists(file_local_path):
-                    os.remove(file_local_path)
-                    print(f"Deleted file: {file_local_path}") # Optional: log deletion
-                else:
-                    print(f"File not found for deletion: {file_local_path}") # Optional: log file not found
-            except OSError as e:
-                print(f"Error deleting file {file_local_path}: {e}") # Optional: log error
+            file_urls_to_delete += [match['user2_screenshot_url'], match['user2_tactics_url']]
 
-    # Delete the user record from the database
+    # Detach the user's uploads from their matches, then delete the user record
+    db.execute(text("UPDATE matches SET user1_screenshot_url = NULL, user1_tactics_url = NULL WHERE user1_id = :user_id"), {"user_id": user_id})
+    db.execute(text("UPDATE matches SET user2_screenshot_url = NULL, user2_tactics_url = NULL WHERE user2_id = :user_id"), {"user_id": user_id})
     db.execute(text("DELETE FROM users WHERE id = :id"), {"id": user_id})
+    # The files are deleted by a background job that exists only if this commit succeeds
+    enqueue_upload_cleanup(db, file_urls_to_delete)
     db.commit()
+    standings_cache.invalidate()
+    invalidate_cached_user(existing_user.username)
 
     return # No content to return for 204
 
@@ -788,22 +2500,159 @@ def create_match(match: MatchCreate, current_user: dict = Depends(is_organizer),
     created_match = db.execute(text("SELECT id, event_id, stage, match_date, match_time, user1_id, user2_id, venue, user1_screenshot_url, user1_tactics_url, user2_screenshot_url, user2_tactics_url FROM matches WHERE id = :id"), {"id": new_match_id}).fetchone()
     return created_match
 
+# Pydantic models for fixture generation (Organizer)
+class FixtureSlotTemplate(BaseModel):
+    start_date: date
+    days_between_rounds: int = 7
+    times: list[time] = [] # Kick-off times available on a match day
+    venues: list[str] = [] # Venues available at each kick-off time
+
+class FixtureGenerate(BaseModel):
+    double_round_robin: bool = False # League only: everyone plays everyone twice, home and away
+    seeding: list[int] | None = None # Knockout only: user ids, best seed first; defaults to registration order
+    slots: FixtureSlotTemplate | None = None
+    replace: bool = False # Delete the event's existing matches first (refused once any has a result)
+
+def round_robin_rounds(players: list, double: bool):
+    # Circle method: the first player stays put while the others rotate one place per round
+    players = list(players)
+    if len(players) % 2:
+        players.append(None) # Whoever meets None sits the round out
+    rounds = []
+    for round_index in range(len(players) - 1):
+        pairs = []
+        for i in range(len(players) // 2):
+            home, away = players[i], players[-1 - i]
+            if i == 0 and round_index % 2:
+                home, away = away, home # Alternate the fixed player's home games
+            if home is not None and away is not None:
+                pairs.append((home, away))
+        rounds.append(pairs)
+        players = [players[0], players[-1], *players[1:-1]]
+    if double:
+        rounds += [[(away, home) for home, away in pairs] for pairs in rounds]
+    return rounds
+
+def bracket_seed_order(size: int):
+    # Seed numbers in bracket order, so that seeds 1 and 2 can only meet in the final: 8 -> 1 8 4 5 2 7 3 6
+    order = [1]
+    while len(order) < size:
+        order = [seed for top in order for seed in (top, 2 * len(order) + 1 - top)]
+    return order
+
+def knockout_stage_name(players_in_round: int):
+    return {2: "Final", 4: "Semi-final", 8: "Quarter-final"}.get(players_in_round, f"Round of {players_in_round}")
+
+def assign_fixture_slots(rounds, slots: FixtureSlotTemplate | None):
+    # Yields (round index, match index in round, date, time, venue); matches beyond the
+    # template's time x venue slots move to the following days
+    for round_index, pairs in enumerate(rounds):
+        for match_index in range(len(pairs)):
+            if slots is None:
+                yield round_index, match_index, None, None, None
+                continue
+            times = slots.times or [None]
+            venues = slots.venues or [None]
+            day, slot = divmod(match_index, len(times) * len(venues))
+            match_date = slots.start_date + timedelta(days=round_index * slots.days_between_rounds + day)
+            match_time = times[slot // len(venues)]
+            yield round_index, match_index, match_date.isoformat(), match_time.isoformat() if match_time else None, venues[slot % len(venues)]
+
+# Points every bracket match at the match its winner plays next: position p of round r
+# feeds slot p % 2 + 1 of position p / 2 in round r + 1
+LINK_BRACKET_SQL = """
+    UPDATE matches SET
+        next_match_id = (
+            SELECT n.id FROM matches n
+            WHERE n.event_id = matches.event_id AND n.bracket_round = matches.bracket_round + 1 AND n.bracket_position = matches.bracket_position / 2
+        ),
+        next_match_slot = bracket_position % 2 + 1
+    WHERE event_id = :event_id AND bracket_round < :rounds
+"""
+
+# Generate an event's whole schedule from its registrations in one transaction (Organizer only)
+@app.post("/events/{event_id}/fixtures", status_code=status.HTTP_201_CREATED)
+def generate_fixtures(event_id: int, fixtures: FixtureGenerate, current_user: dict = Depends(is_organizer), db: Session = Depends(get_db)):
+    event = db.execute(text("SELECT id, mode FROM events WHERE id = :event_id"), {"event_id": event_id}).fetchone()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    if event.mode not in ('league', 'knockout'):
+        raise HTTPException(status_code=400, detail="Fixtures can only be generated for league and knockout events")
+
+    players = [row.user_id for row in db.execute(text("SELECT user_id FROM event_registrations WHERE event_id = :event_id ORDER BY registration_date, user_id"), {"event_id": event_id})]
+    if len(players) < 2:
+        raise HTTPException(status_code=400, detail="At least two registered participants are needed")
+
+    existing = db.execute(text("SELECT COUNT(*) AS matches, COUNT(r.id) AS results FROM matches m LEFT JOIN results r ON r.match_id = m.id WHERE m.event_id = :event_id"), {"event_id": event_id}).fetchone()
+    if existing.matches and not fixtures.replace:
+        raise HTTPException(status_code=409, detail="Event already has matches; pass replace=true to regenerate them")
+    if existing.results:
+        raise HTTPException(status_code=409, detail="Event already has results; its matches can't be replaced")
+
+    byes = []
+    if event.mode == 'league':
+        rounds = [[(home, away, None) for home, away in pairs] for pairs in round_robin_rounds(players, fixtures.double_round_robin)]
+        stages = [f"Matchday {round_index + 1}" for round_index in range(len(rounds))]
+    else:
+        seeding = fixtures.seeding or players
+        if sorted(seeding) != sorted(players):
+            raise HTTPException(status_code=400, detail="Seeding must list every registered participant exactly once")
+        size = 1 << (len(seeding) - 1).bit_length()
+        # Seeds beyond the number of players are byes, which the top seeds receive
+        slots = [seeding[seed - 1] if seed <= len(seeding) else None for seed in bracket_seed_order(size)]
+        # The whole tree up front: later rounds start with both players unknown, and a
+        # bye puts its player straight into their second-round match
+        rounds = [[] for _ in range(size.bit_length() - 1)]
+        second_round = {}
+        for position, (home, away) in enumerate(zip(slots[0::2], slots[1::2])):
+            if home is not None and away is not None:
+                rounds[0].append((home, away, position))
+            else:
+                byes.append(home if home is not None else away)
+                second_round.setdefault(position // 2, [None, None])[position % 2] = byes[-1]
+        for round_index in range(1, len(rounds)):
+            for position in range(size >> (round_index + 1)):
+                players_in_slots = second_round.get(position, [None, None]) if round_index == 1 else [None, None]
+                rounds[round_index].append((*players_in_slots, position))
+        stages = [knockout_stage_name(size >> round_index) for round_index in range(len(rounds))]
+
+    replaced_file_urls = []
+    if existing.matches:
+        for row in db.execute(text(EVENT_MATCHES_SQL), {"event_id": event_id}):
+            replaced_file_urls += [row.user1_screenshot_url, row.user1_tactics_url, row.user2_screenshot_url, row.user2_tactics_url]
+        db.execute(text("DELETE FROM matches WHERE event_id = :event_id"), {"event_id": event_id})
+
+    new_matches = []
+    for round_index, match_index, match_date, match_time, venue in assign_fixture_slots(rounds, fixtures.slots):
+        user1_id, user2_id, bracket_position = rounds[round_index][match_index]
+        new_matches.append({"event_id": event_id, "stage": stages[round_index], "match_date": match_date, "match_time": match_time,
+                            "user1_id": user1_id, "user2_id": user2_id, "venue": venue,
+                            "bracket_round": round_index + 1 if bracket_position is not None else None, "bracket_position": bracket_position})
+    db.execute(text("INSERT INTO matches (event_id, stage, match_date, match_time, user1_id, user2_id, venue, bracket_round, bracket_position) VALUES (:event_id, :stage, :match_date, :match_time, :user1_id, :user2_id, :venue, :bracket_round, :bracket_position)"), new_matches)
+    if event.mode == 'knockout':
+        db.execute(text(LINK_BRACKET_SQL), {"event_id": event_id, "rounds": len(rounds)})
+    enqueue_upload_cleanup(db, replaced_file_urls)
+    db.commit()
+
+    return {"event_id": event_id, "mode": event.mode, "rounds": len(rounds), "matches_created": len(new_matches), "replaced": existing.matches, "byes": byes}
+
 # Get all matches (Organizer only - or public with event_id filter? Let's make it organizer only for now)
 @app.get("/matches", response_model=list[MatchResponse])
-def get_all_matches(current_user: dict = Depends(is_organizer), event_id: int | None = None, db: Session = Depends(get_db)):
-    query = text("SELECT id, event_id, stage, match_date, match_time, user1_id, user2_id, venue, user1_screenshot_url, user1_tactics_url, user2_screenshot_url, user2_tactics_url FROM matches")
+def get_all_matches(response: Response, current_user: dict = Depends(is_organizer), event_id: int | None = None, user_id: int | None = None, limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX), cursor: str | None = None, db: Session = Depends(get_db)):
+    # Ordered by schedule, then id
     params = {}
     where_clauses = []
 
     if event_id is not None:
         where_clauses.append("event_id = :event_id")
         params["event_id"] = event_id
+    if user_id is not None:
+        where_clauses.append("(user1_id = :user_id OR user2_id = :user_id)")
+        params["user_id"] = user_id
 
-    if where_clauses:
-        query = text(f"{query} WHERE {' AND '.join(where_clauses)}")
-
-    matches = db.execute(query, params).fetchall()
-    return matches
+    matches = fetch_page(db, "SELECT id, event_id, stage, match_date, match_time, user1_id, user2_id, venue, user1_screenshot_url, user1_tactics_url, user2_screenshot_url, user2_tactics_url FROM matches", MATCH_PAGE_KEY,
+                         lambda row: [row.match_date or "", row.match_time or "", row.id], where_clauses, params, limit, cursor, response)
+    return match_list_encoder.response(matches, headers=response.headers)
 
 # Get a specific match by ID (Organizer only)
 @app.get("/matches/{match_id}", response_model=MatchResponse)
@@ -817,7 +2666,7 @@ def get_match(match_id: int, current_user: dict = Depends(is_organizer), db: Ses
 @app.put("/matches/{match_id}", response_model=MatchResponse)
 def update_match(match_id: int, match_update: MatchUpdate, current_user: dict = Depends(is_organizer), db: Session = Depends(get_db)):
     # Check if match exists
-    existing_match = db.execute(text("SELECT id FROM matches WHERE id = :id"), {"id": match_id}).fetchone()
+    existing_match = db.execute(text("SELECT id, event_id, stage, match_date, match_time, user1_id, user2_id, venue, user1_screenshot_url, user1_tactics_url, user2_screenshot_url, user2_tactics_url FROM matches WHERE id = :id"), {"id": match_id}).fetchone()
     if not existing_match:
         raise HTTPException(status_code=404, detail="Match not found")
 
@@ -835,57 +2684,203 @@ def update_match(match_id: int, match_update: MatchUpdate, current_user: dict =
 
     # Fetch the updated match to return in the response
     updated_match = db.execute(text("SELECT id, event_id, stage, match_date, match_time, user1_id, user2_id, venue, user1_screenshot_url, user1_tactics_url, user2_screenshot_url, user2_tactics_url FROM matches WHERE id = :id"), {"id": match_id}).fetchone()
+    live_feed.publish(updated_match.event_id, "match", match_list_encoder.items([updated_match])[0])
     return updated_match
 
 # Delete a match by ID (Organizer only)
 @app.delete("/matches/{match_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_match(match_id: int, current_user: dict = Depends(is_organizer), db: Session = Depends(get_db)):
     # Check if match exists and get file URLs
-    match = db.execute(text("SELECT user1_screenshot_url, user1_tactics_url, user2_screenshot_url, user2_tactics_url FROM matches WHERE id = :id"), {"id": match_id}).fetchone()
+    match = db.execute(text("SELECT event_id, user1_screenshot_url, user1_tactics_url, user2_screenshot_url, user2_tactics_url FROM matches WHERE id = :id"), {"id": match_id}).fetchone()
     if not match:
         raise HTTPException(status_code=404, detail="Match not found")
 
     # List of file URLs associated with this match
-    file_urls_to_delete = [
-        match['user1_screenshot_url'],
-        match['user1_tactics_url'],
-        match['user2_screenshot_url'],
-        match['user2_tactics_url'],
-    ]
+    file_urls_to_delete = [match.user1_screenshot_url, match.user1_tactics_url, match.user2_screenshot_url, match.user2_tactics_url]
 
-    # Delete associated files
-    for file_url in file_urls_to_delete:
-        if file_url:
-            # Construct local file path from URL
-            # Assuming URL is like /static/uploads/filename.ext and UPLOAD_DIRECTORY is ./uploads
-            filename = os.path.basename(file_url)
-            file_local_path = os.path.join(UPLOAD_DIRECTORY, filename)
-            try:
-                if os.path.exists(file_local_path):
-                    os.remove(file_local_path)
-                    print(f"Deleted file: {file_local_path}") # Optional: log deletion
-                else:
-                    print(f"File not found for deletion: {file_local_path}") # Optional: log file not found
-            except OSError as e:
-                print(f"Error deleting file {file_local_path}: {e}") # Optional: log error
+    # Deleting the match cascades to its result, so take that out of the standings too
+    existing_result = db.execute(text(MATCH_RESULT_CONTEXT_SQL), {"match_id": match_id}).fetchone()
+    if existing_result:
+        existing_result = existing_result._mapping
+        if existing_result['mode'] == 'league':
+            apply_result_to_standings(db, existing_result['event_id'], existing_result['user1_id'], existing_result['user2_id'], existing_result['user1_score'], existing_result['user2_score'], sign=-1)
 
-    # Delete the match record from the database
+    # Delete the match record; any files no other match shares are removed in the background
     db.execute(text("DELETE FROM matches WHERE id = :id"), {"id": match_id})
+    enqueue_upload_cleanup(db, file_urls_to_delete)
     db.commit()
+    standings_cache.invalidate(match.event_id)
 
     return # No content to return for 204
 
+# League standings maintenance. Each result contributes one row per player to
+# league_standings; sign=1 applies a result and sign=-1 reverses it, so a correction
+# is two O(1) upserts inside the same transaction as the result change.
+STANDINGS_UPSERT_SQL = """
+    INSERT INTO league_standings (user_id, event_id, points, wins, draws, losses, goals_scored, goals_against, games_played)
+    VALUES (:user_id, :event_id, :points, :wins, :draws, :losses, :goals_scored, :goals_against, :games_played)
+    ON CONFLICT(user_id, event_id) DO UPDATE SET
+        points = league_standings.points + excluded.points,
+        wins = league_standings.wins + excluded.wins,
+        draws = league_standings.draws + excluded.draws,
+        losses = league_standings.losses + excluded.losses,
+        goals_scored = league_standings.goals_scored + excluded.goals_scored,
+        goals_against = league_standings.goals_against + excluded.goals_against,
+        games_played = league_standings.games_played + excluded.games_played
+"""
+
+def standings_deltas(event_id, user1_id, user2_id, user1_score, user2_score, sign: int = 1):
+    # Missing scores count as 0, as they always have for league standings
+    user1_score = user1_score if user1_score is not None else 0
+    user2_score = user2_score if user2_score is not None else 0
+    deltas = []
+    for user_id, scored, conceded in ((user1_id, user1_score, user2_score), (user2_id, user2_score, user1_score)):
+        if user_id is None: # Player was deleted
+            continue
+        won, drawn, lost = scored > conceded, scored == conceded, scored < conceded
+        deltas.append({
+            "user_id": user_id,
+            "event_id": event_id,
+            "points": sign * (3 if won else 1 if drawn else 0),
+            "wins": sign * int(won),
+            "draws": sign * int(drawn),
+            "losses": sign * int(lost),
+            "goals_scored": sign * scored,
+            "goals_against": sign * conceded,
+            "games_played": sign,
+        })
+    return deltas
+
+# A player whose only result was reversed has no standing left in the event
+STANDINGS_DELETE_EMPTY_SQL = "DELETE FROM league_standings WHERE user_id = :user_id AND event_id = :event_id AND games_played = 0"
+
+def apply_result_to_standings(db: Session, event_id, user1_id, user2_id, user1_score, user2_score, sign: int = 1):
+    deltas = standings_deltas(event_id, user1_id, user2_id, user1_score, user2_score, sign)
+    if deltas:
+        db.execute(text(STANDINGS_UPSERT_SQL), deltas)
+        if sign < 0:
+            db.execute(text(STANDINGS_DELETE_EMPTY_SQL), [{"user_id": delta["user_id"], "event_id": event_id} for delta in deltas])
+
+# A result together with the match and event fields needed to maintain standings
+RESULT_CONTEXT_SELECT = """
+    SELECT r.id, r.match_id, r.user1_score, r.user2_score, r.winner_user_id, m.event_id, m.user1_id, m.user2_id, e.mode,
+        m.bracket_round, m.next_match_id, m.next_match_slot
+    FROM results r
+    JOIN matches m ON r.match_id = m.id
+    JOIN events e ON m.event_id = e.id
+"""
+RESULT_CONTEXT_SQL = RESULT_CONTEXT_SELECT + "WHERE r.id = :id"
+MATCH_RESULT_CONTEXT_SQL = RESULT_CONTEXT_SELECT + "WHERE r.match_id = :match_id"
+
+# Knockout bracket maintenance. A bracket match's winner is written into their slot of
+# the next match in the same transaction as the result, so the bracket never shows a
+# result without its consequence.
+BRACKET_SLOT_COLUMNS = {1: "user1_id", 2: "user2_id"}
+
+def bracket_winner(user1_id, user2_id, user1_score, user2_score):
+    # Whoever scored more; a draw or a missing score leaves the tie undecided
+    if user1_score is None or user2_score is None or user1_score == user2_score:
+        return None
+    return user1_id if user1_score > user2_score else user2_id
+
+def advance_bracket_winner(db: Session, next_match_id, next_match_slot, previous_winner, winner):
+    if next_match_id is None or previous_winner == winner:
+        return
+    # Once the next match is played, its line-up can't change underneath it
+    downstream_result = db.execute(text("SELECT id FROM results WHERE match_id = :match_id"), {"match_id": next_match_id}).fetchone()
+    if downstream_result:
+        raise HTTPException(status_code=409, detail="The next bracket match already has a result; delete that result first")
+    db.execute(text(f"UPDATE matches SET {BRACKET_SLOT_COLUMNS[next_match_slot]} = :winner WHERE id = :id"), {"winner": winner, "id": next_match_id})
+
+# Standings recomputed from scratch: one row per (event, player) aggregated over every
+# league result, using the same scoring rules as standings_deltas. {match_filter} narrows
+# both halves to one event, so that rebuild reads the event's matches through an index.
+STANDINGS_AGGREGATE_SQL = """
+    WITH player_results AS (
+        SELECT m.event_id, m.user1_id AS user_id, COALESCE(r.user1_score, 0) AS scored, COALESCE(r.user2_score, 0) AS conceded
+        FROM results r
+        JOIN matches m ON r.match_id = m.id
+        JOIN events e ON m.event_id = e.id
+        WHERE e.mode = 'league' AND m.user1_id IS NOT NULL{match_filter}
+        UNION ALL
+        SELECT m.event_id, m.user2_id AS user_id, COALESCE(r.user2_score, 0) AS scored, COALESCE(r.user1_score, 0) AS conceded
+        FROM results r
+        JOIN matches m ON r.match_id = m.id
+        JOIN events e ON m.event_id = e.id
+        WHERE e.mode = 'league' AND m.user2_id IS NOT NULL{match_filter}
+    )
+    SELECT
+        user_id,
+        event_id,
+        SUM(CASE WHEN scored > conceded THEN 3 WHEN scored = conceded THEN 1 ELSE 0 END) AS points,
+        SUM(scored > conceded) AS wins,
+        SUM(scored = conceded) AS draws,
+        SUM(scored < conceded) AS losses,
+        SUM(scored) AS goals_scored,
+        SUM(conceded) AS goals_against,
+        COUNT(*) AS games_played
+    FROM player_results
+    GROUP BY event_id, user_id
+"""
+
+STANDINGS_COLUMNS = "user_id, event_id, points, wins, draws, losses, goals_scored, goals_against, games_played"
+
+def standings_aggregate_sql(event_id: int | None) -> str:
+    return STANDINGS_AGGREGATE_SQL.format(match_filter="" if event_id is None else " AND m.event_id = :event_id")
+
+def rebuild_league_standings(db: Session, event_id: int | None = None, dry_run: bool = False):
+    # Regenerate league_standings for one event (or all) and report which rows the
+    # incrementally maintained table had wrong. The caller commits.
+    params = {}
+    current_standings = f"SELECT {STANDINGS_COLUMNS} FROM league_standings"
+    if event_id is not None:
+        current_standings += " WHERE event_id = :event_id"
+        params["event_id"] = event_id
+
+    db.execute(text("DROP TABLE IF EXISTS temp.rebuilt_standings"))
+    db.execute(text(f"CREATE TEMP TABLE rebuilt_standings AS {standings_aggregate_sql(event_id)}"), params)
+    try:
+        mismatched = db.execute(text(f"""
+            SELECT DISTINCT event_id, user_id FROM (
+                SELECT {STANDINGS_COLUMNS} FROM temp.rebuilt_standings
+                EXCEPT
+                {current_standings}
+                UNION ALL
+                SELECT * FROM (
+                    {current_standings}
+                    EXCEPT
+                    SELECT {STANDINGS_COLUMNS} FROM temp.rebuilt_standings
+                )
+            )
+            ORDER BY event_id, user_id
+        """), params).fetchall()
+        rebuilt_rows = db.execute(text("SELECT COUNT(*) FROM temp.rebuilt_standings")).scalar()
+
+        if not dry_run:
+            db.execute(text("DELETE FROM league_standings" + ("" if event_id is None else " WHERE event_id = :event_id")), params)
+            db.execute(text(f"INSERT INTO league_standings ({STANDINGS_COLUMNS}) SELECT {STANDINGS_COLUMNS} FROM temp.rebuilt_standings"))
+            # league_standings isn't change-tracked, so log corrected events as updated to move their ETags on
+            for corrected_event_id in sorted({row.event_id for row in mismatched}):
+                db.execute(text("INSERT INTO change_log (table_name, row_id, event_id, operation) VALUES ('events', :event_id, :event_id, 'update')"), {"event_id": corrected_event_id})
+    finally:
+        db.execute(text("DROP TABLE IF EXISTS temp.rebuilt_standings"))
+
+    return {
+        "event_id": event_id,
+        "rows": rebuilt_rows,
+        "mismatches": len(mismatched),
+        "mismatched": [{"event_id": row.event_id, "user_id": row.user_id} for row in mismatched[:100]],
+        "applied": not dry_run,
+    }
+
 # Create a new result (Organizer only)
 @app.post("/results", response_model=ResultResponse, status_code=status.HTTP_201_CREATED)
 def create_result(result: ResultCreate, current_user: dict = Depends(is_organizer), db: Session = Depends(get_db)):
-    # Check if match exists and get event_id and participants
-    match = db.execute(text("SELECT id, event_id, user1_id, user2_id FROM matches WHERE id = :match_id"), {"match_id": result.match_id}).fetchone()
+    # Check if match exists and get event_id, event mode and participants
+    match = db.execute(text("SELECT m.id, m.event_id, m.user1_id, m.user2_id, e.mode, m.bracket_round, m.next_match_id, m.next_match_slot FROM matches m JOIN events e ON m.event_id = e.id WHERE m.id = :match_id"), {"match_id": result.match_id}).fetchone()
     if not match:
         raise HTTPException(status_code=404, detail="Match not found")
-
-    # Check if event is in league mode
-    event = db.execute(text("SELECT mode FROM events WHERE id = :event_id"), {"event_id": match['event_id']}).fetchone()
-    is_league_mode = event and event['mode'] == 'league'
+    match = match._mapping
 
     # Check if result already exists for this match
     existing_result = db.execute(text("SELECT id FROM results WHERE match_id = :match_id"), {"match_id": result.match_id}).fetchone()
@@ -900,101 +2895,32 @@ def create_result(result: ResultCreate, current_user: dict = Depends(is_organize
     result_dict = result.model_dump()
     result_dict["match_id"] = result.match_id # Ensure match_id is included
 
+    # A bracket match needs both players, and its winner defaults to the higher score
+    if match['bracket_round'] is not None:
+        if match['user1_id'] is None or match['user2_id'] is None:
+            raise HTTPException(status_code=400, detail="Both players of a bracket match must be known before recording its result")
+        if result.winner_user_id is None:
+            result_dict["winner_user_id"] = bracket_winner(match['user1_id'], match['user2_id'], result.user1_score, result.user2_score)
+        advance_bracket_winner(db, match['next_match_id'], match['next_match_slot'], None, result_dict["winner_user_id"])
+
     query = text("INSERT INTO results (match_id, user1_score, user2_score, winner_user_id) VALUES (:match_id, :user1_score, :user2_score, :winner_user_id) RETURNING id")
     result_row = db.execute(query, result_dict)
     new_result_id = result_row.fetchone()[0]
-    
-    # Update league standings if in league mode
-    if is_league_mode:
-        user1_id = match['user1_id']
-        user2_id = match['user2_id']
-        event_id = match['event_id']
-        user1_score = result.user1_score if result.user1_score is not None else 0
-        user2_score = result.user2_score if result.user2_score is not None else 0
-
-        # Determine points, wins, draws, losses
-        user1_points = 0
-        user2_points = 0
-        user1_wins = 0
-        user1_draws = 0
-        user1_losses = 0
-        user2_wins = 0
-        user2_draws = 0
-        user2_losses = 0
-
-        if user1_score > user2_score:
-            user1_points = 3
-            user1_wins = 1
-            user2_losses = 1
-        elif user1_score < user2_score:
-            user2_points = 3
-            user2_wins = 1
-            user1_losses = 1
-        else:
-            user1_points = 1
-            user2_points = 1
-            user1_draws = 1
-            user2_draws = 1
-        
-        # Update user1's standings
-        db.execute(text("""
-            INSERT INTO league_standings (user_id, event_id, points, wins, draws, losses, goals_scored, goals_against, games_played)
-            VALUES (:user_id, :event_id, :points, :wins, :draws, :losses, :goals_scored, :goals_against, :games_played)
-            ON CONFLICT(user_id, event_id) DO UPDATE SET
-                points = league_standings.points + :points,
-                wins = league_standings.wins + :wins,
-                draws = league_standings.draws + :draws,
-                losses = league_standings.losses + :losses,
-                goals_scored = league_standings.goals_scored + :goals_scored,
-                goals_against = league_standings.goals_against + :goals_against,
-                games_played = league_standings.games_played + 1
-        """),
-        {
-            "user_id": user1_id,
-            "event_id": event_id,
-            "points": user1_points,
-            "wins": user1_wins,
-            "draws": user1_draws,
-            "losses": user1_losses,
-            "goals_scored": user1_score,
-            "goals_against": user2_score,
-            "games_played": 1
-        })
 
-        # Update user2's standings
-        db.execute(text("""
-            INSERT INTO league_standings (user_id, event_id, points, wins, draws, losses, goals_scored, goals_against, games_played)
-            VALUES (:user_id, :event_id, :points, :wins, :draws, :losses, :goals_scored, :goals_against, :games_played)
-            ON CONFLICT(user_id, event_id) DO UPDATE SET
-                points = league_standings.points + :points,
-                wins = league_standings.wins + :wins,
-                draws = league_standings.draws + :draws,
-                losses = league_standings.losses + :losses,
-                goals_scored = league_standings.goals_scored + :goals_scored,
-                goals_against = league_standings.goals_against + :goals_against,
-                games_played = league_standings.games_played + 1
-        """),
-        {
-            "user_id": user2_id,
-            "event_id": event_id,
-            "points": user2_points,
-            "wins": user2_wins,
-            "draws": user2_draws,
-            "losses": user2_losses,
-            "goals_scored": user2_score,
-            "goals_against": user1_score, # Note the swap for goals against
-            "games_played": 1
-        })
+    # Update league standings if in league mode
+    if match['mode'] == 'league':
+        apply_result_to_standings(db, match['event_id'], match['user1_id'], match['user2_id'], result.user1_score, result.user2_score)
 
     db.commit()
+    standings_cache.invalidate(match['event_id'])
 
     created_result = db.execute(text("SELECT id, match_id, user1_score, user2_score, winner_user_id FROM results WHERE id = :id"), {"id": new_result_id}).fetchone()
+    publish_result(match['event_id'], created_result, match['next_match_id'] if result_dict["winner_user_id"] is not None else None)
     return created_result
 
 # Get all results (Organizer only - or public with filters? Let's make it organizer only for now)
 @app.get("/results", response_model=list[ResultResponse])
-def get_all_results(current_user: dict = Depends(is_organizer), match_id: int | None = None, event_id: int | None = None, db: Session = Depends(get_db)):
-    query = text("SELECT r.id, r.match_id, r.user1_score, r.user2_score, r.winner_user_id FROM results r JOIN matches m ON r.match_id = m.id")
+def get_all_results(response: Response, current_user: dict = Depends(is_organizer), match_id: int | None = None, event_id: int | None = None, limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX), cursor: str | None = None, db: Session = Depends(get_db)):
     params = {}
     where_clauses = []
 
@@ -1005,11 +2931,9 @@ def get_all_results(current_user: dict = Depends(is_organizer), match_id: int |
         where_clauses.append("m.event_id = :event_id")
         params["event_id"] = event_id
 
-    if where_clauses:
-        query = text(f"{query} WHERE {' AND '.join(where_clauses)}")
-
-    results = db.execute(query, params).fetchall()
-    return results
+    results = fetch_page(db, "SELECT r.id, r.match_id, r.user1_score, r.user2_score, r.winner_user_id FROM results r JOIN matches m ON r.match_id = m.id", RESULT_PAGE_KEY,
+                         lambda row: [row.id], where_clauses, params, limit, cursor, response)
+    return result_list_encoder.response(results, headers=response.headers)
 
 # Get a specific result by ID (Organizer only)
 @app.get("/results/{result_id}", response_model=ResultResponse)
@@ -1023,20 +2947,36 @@ def get_result(result_id: int, current_user: dict = Depends(is_organizer), db: S
 @app.put("/results/{result_id}", response_model=ResultResponse)
 def update_result(result_id: int, result_update: ResultUpdate, current_user: dict = Depends(is_organizer), db: Session = Depends(get_db)):
     # Check if result exists
-    existing_result = db.execute(text("SELECT id, match_id FROM results WHERE id = :id"), {"id": result_id}).fetchone()
+    existing_result = db.execute(text(RESULT_CONTEXT_SQL), {"id": result_id}).fetchone()
     if not existing_result:
         raise HTTPException(status_code=404, detail="Result not found")
+    existing_result = existing_result._mapping
 
     # Check if the updated winner_user_id is valid for the match
     if result_update.winner_user_id is not None:
-        match = db.execute(text("SELECT user1_id, user2_id FROM matches WHERE id = :match_id"), {"match_id": existing_result['match_id']}).fetchone()
-        if result_update.winner_user_id not in (match['user1_id'], match['user2_id']):
+        if result_update.winner_user_id not in (existing_result['user1_id'], existing_result['user2_id']):
             raise HTTPException(status_code=400, detail="Winner user is not a participant in the match")
 
     update_fields = result_update.model_dump(exclude_unset=True)
     if not update_fields:
         return existing_result # No fields to update
 
+    # New scores re-decide a bracket match unless the winner is given as well
+    if existing_result['bracket_round'] is not None:
+        if "winner_user_id" not in update_fields and ("user1_score" in update_fields or "user2_score" in update_fields):
+            update_fields["winner_user_id"] = bracket_winner(existing_result['user1_id'], existing_result['user2_id'],
+                                                             update_fields.get("user1_score", existing_result['user1_score']),
+                                                             update_fields.get("user2_score", existing_result['user2_score']))
+        advance_bracket_winner(db, existing_result['next_match_id'], existing_result['next_match_slot'],
+                               existing_result['winner_user_id'], update_fields.get("winner_user_id", existing_result['winner_user_id']))
+
+    # Swap the old result's contribution to the standings for the new one
+    if existing_result['mode'] == 'league':
+        new_user1_score = update_fields.get("user1_score", existing_result['user1_score'])
+        new_user2_score = update_fields.get("user2_score", existing_result['user2_score'])
+        apply_result_to_standings(db, existing_result['event_id'], existing_result['user1_id'], existing_result['user2_id'], existing_result['user1_score'], existing_result['user2_score'], sign=-1)
+        apply_result_to_standings(db, existing_result['event_id'], existing_result['user1_id'], existing_result['user2_id'], new_user1_score, new_user2_score)
+
     # Construct update query dynamically
     set_clauses = [f"{key} = :{key}" for key in update_fields]
     query = text(f"UPDATE results SET {', '.join(set_clauses)} WHERE id = :id")
@@ -1044,22 +2984,226 @@ def update_result(result_id: int, result_update: ResultUpdate, current_user: dic
 
     db.execute(query, update_fields)
     db.commit()
+    standings_cache.invalidate(existing_result['event_id'])
 
     # Fetch the updated result to return in the response
     updated_result = db.execute(text("SELECT id, match_id, user1_score, user2_score, winner_user_id FROM results WHERE id = :id"), {"id": result_id}).fetchone()
+    publish_result(existing_result['event_id'], updated_result, existing_result['next_match_id'] if updated_result.winner_user_id != existing_result['winner_user_id'] else None)
     return updated_result
 
 # Delete a result by ID (Organizer only)
 @app.delete("/results/{result_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_result(result_id: int, current_user: dict = Depends(is_organizer), db: Session = Depends(get_db)):
     # Check if result exists
-    existing_result = db.execute(text("SELECT id FROM results WHERE id = :id"), {"id": result_id}).fetchone()
+    existing_result = db.execute(text(RESULT_CONTEXT_SQL), {"id": result_id}).fetchone()
     if not existing_result:
         raise HTTPException(status_code=404, detail="Result not found")
+    existing_result = existing_result._mapping
+
+    # Take the result back out of the standings
+    if existing_result['mode'] == 'league':
+        apply_result_to_standings(db, existing_result['event_id'], existing_result['user1_id'], existing_result['user2_id'], existing_result['user1_score'], existing_result['user2_score'], sign=-1)
+
+    # Without a result the tie is undecided again, so the winner leaves the next match
+    advance_bracket_winner(db, existing_result['next_match_id'], existing_result['next_match_slot'], existing_result['winner_user_id'], None)
 
     db.execute(text("DELETE FROM results WHERE id = :id"), {"id": result_id})
     db.commit()
-    return # No content to return for 204 
+    standings_cache.invalidate(existing_result['event_id'])
+    live_feed.publish(existing_result['event_id'], "result_deleted", {"id": result_id, "match_id": existing_result['match_id'],
+                                                                       "next_match_id": existing_result['next_match_id'] if existing_result['winner_user_id'] is not None else None})
+    return # No content to return for 204
+
+# Bulk result import (Organizer). The body is read line by line and handled in batches of
+# BULK_RESULT_BATCH_SIZE rows, one transaction each, so memory stays flat however long the
+# file is. A row that fails only costs itself and goes into the report; a batch that fails
+# to write is rolled back on its own and its rows are reported, and the import goes on.
+BULK_RESULT_BATCH_SIZE = int(os.environ.get("BULK_RESULT_BATCH_SIZE", "500"))
+BULK_RESULT_MAX_LINE_BYTES = 4096 # A result row is a few integers
+BULK_RESULT_MAX_ERRORS = 1000 # Failures beyond this are only counted
+BULK_RESULT_COLUMNS = ("match_id", "user1_score", "user2_score", "winner_user_id")
+BULK_RESULT_FORMATS = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}
+STANDINGS_DELTA_FIELDS = ("points", "wins", "draws", "losses", "goals_scored", "goals_against", "games_played")
+
+# Every match of a batch in one query; the ids are bound as one JSON array so the
+# statement text is the same for every batch
+BULK_RESULT_MATCHES_SQL = """
+    SELECT m.id, m.event_id, m.user1_id, m.user2_id, e.mode, m.bracket_round, m.next_match_id, m.next_match_slot, r.id AS result_id
+    FROM matches m
+    JOIN events e ON m.event_id = e.id
+    LEFT JOIN results r ON r.match_id = m.id
+    WHERE m.id IN (SELECT value FROM json_each(:match_ids))
+"""
+
+async def iter_body_lines(request: Request, max_line_bytes: int):
+    # Yields each line of the body, or None for a line longer than max_line_bytes,
+    # whose remainder is dropped as it arrives instead of being buffered
+    buffer = b""
+    skipping = False
+    async for chunk in request.stream():
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            if skipping:
+                skipping = False
+                continue
+            yield line if len(line) <= max_line_bytes else None
+        if len(buffer) > max_line_bytes:
+            if not skipping:
+                yield None
+            skipping = True
+            buffer = b""
+    if buffer and not skipping:
+        yield buffer
+
+def validation_error_detail(error: ValueError):
+    if isinstance(error, ValidationError):
+        first = error.errors()[0]
+        return f"{'.'.join(str(part) for part in first['loc'])}: {first['msg']}"
+    return str(error)
+
+def parse_bulk_result_row(row_format: str, line: str, columns):
+    if row_format == "csv":
+        values = next(csv.reader([line]))
+        if len(values) != len(columns):
+            raise ValueError(f"Expected {len(columns)} columns, got {len(values)}")
+        data = {column: value.strip() or None for column, value in zip(columns, values)}
+    else:
+        data = orjson.loads(line)
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object")
+    return ResultCreate.model_validate(data)
+
+def ingest_result_batch(db: Session, batch):
+    # batch is [(line number, ResultCreate)]. Checks every row against one preload of its
+    # matches, then writes the batch with one executemany per table and commits.
+    # Returns (results created, [(line number, match id, error)], event ids touched).
+    match_ids = json.dumps(sorted({result.match_id for _, result in batch}))
+    matches = {row.id: dict(row._mapping) for row in db.execute(text(BULK_RESULT_MATCHES_SQL), {"match_ids": match_ids})}
+    recorded = {} # match id -> line number, for matches this batch has a result for
+    new_results = []
+    standings = {} # (user id, event id) -> summed standings delta
+    errors = []
+    event_ids = set()
+
+    for line_number, result in batch:
+        match = matches.get(result.match_id)
+        if match is None:
+            errors.append((line_number, result.match_id, "Match not found"))
+            continue
+        if match['result_id'] is not None:
+            errors.append((line_number, result.match_id, "Result already exists for this match"))
+            continue
+        if result.match_id in recorded:
+            errors.append((line_number, result.match_id, f"Duplicate of line {recorded[result.match_id]}"))
+            continue
+        if result.winner_user_id is not None and result.winner_user_id not in (match['user1_id'], match['user2_id']):
+            errors.append((line_number, result.match_id, "Winner user is not a participant in the match"))
+            continue
+
+        winner_user_id = result.winner_user_id
+        if match['bracket_round'] is not None:
+            # Same rules as create_result, plus the batch's own changes to later rounds
+            if match['user1_id'] is None or match['user2_id'] is None:
+                errors.append((line_number, result.match_id, "Both players of a bracket match must be known before recording its result"))
+                continue
+            if match['next_match_id'] in recorded:
+                errors.append((line_number, result.match_id, "The next bracket match already has a result; delete that result first"))
+                continue
+            if winner_user_id is None:
+                winner_user_id = bracket_winner(match['user1_id'], match['user2_id'], result.user1_score, result.user2_score)
+            try:
+                advance_bracket_winner(db, match['next_match_id'], match['next_match_slot'], None, winner_user_id)
+            except HTTPException as e:
+                errors.append((line_number, result.match_id, e.detail))
+                continue
+            if match['next_match_id'] in matches:
+                matches[match['next_match_id']][BRACKET_SLOT_COLUMNS[match['next_match_slot']]] = winner_user_id
+
+        recorded[result.match_id] = line_number
+        new_results.append({"match_id": result.match_id, "user1_score": result.user1_score, "user2_score": result.user2_score, "winner_user_id": winner_user_id})
+        event_ids.add(match['event_id'])
+        if match['mode'] == 'league':
+            for delta in standings_deltas(match['event_id'], match['user1_id'], match['user2_id'], result.user1_score, result.user2_score):
+                total = standings.setdefault((delta["user_id"], delta["event_id"]), dict.fromkeys(STANDINGS_DELTA_FIELDS, 0) | {"user_id": delta["user_id"], "event_id": delta["event_id"]})
+                for field in STANDINGS_DELTA_FIELDS:
+                    total[field] += delta[field]
+
+    if new_results:
+        db.execute(text("INSERT INTO results (match_id, user1_score, user2_score, winner_user_id) VALUES (:match_id, :user1_score, :user2_score, :winner_user_id)"), new_results)
+    if standings:
+        db.execute(text(STANDINGS_UPSERT_SQL), list(standings.values()))
+    db.commit()
+    return len(new_results), errors, event_ids
+
+# Import many results from a CSV (header row, then one result per line) or NDJSON body (Organizer only)
+@app.post("/results/bulk")
+async def create_results_bulk(request: Request, current_user: dict = Depends(is_organizer), db: Session = Depends(get_db)):
+    row_format = BULK_RESULT_FORMATS.get(request.headers.get("content-type", "").split(";")[0].strip().lower())
+    if row_format is None:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=f"Send the results as {' or '.join(BULK_RESULT_FORMATS)}")
+
+    report = {"rows": 0, "created": 0, "failed": 0, "errors": []}
+
+    def record_error(line_number, match_id, detail):
+        # A batch's rows are checked after later lines already failed to parse, so keep the
+        # list in line order and hold on to the earliest failures
+        report["failed"] += 1
+        bisect.insort(report["errors"], {"line": line_number, "match_id": match_id, "detail": detail}, key=lambda error: error["line"])
+        del report["errors"][BULK_RESULT_MAX_ERRORS:]
+
+    async def flush(batch):
+        try:
+            created, errors, event_ids = await run_in_threadpool(ingest_result_batch, db, batch)
+        except Exception as e:
+            # Only this batch is rolled back; the ones before it stay committed and counted in "created"
+            db.rollback()
+            logger.exception("bulk result batch failed", extra={"fields": {"first_line": batch[0][0], "last_line": batch[-1][0]}})
+            for line_number, result in batch:
+                record_error(line_number, result.match_id, f"Batch of lines {batch[0][0]}-{batch[-1][0]} was not written: {e}")
+            return
+        report["created"] += created
+        for error in errors:
+            record_error(*error)
+        for event_id in event_ids:
+            standings_cache.invalidate(event_id)
+            live_feed.publish(event_id, "resync", {}) # Too many changes to send one by one
+
+    columns = None if row_format == "csv" else BULK_RESULT_COLUMNS
+    batch = []
+    line_number = 0
+    async for line in iter_body_lines(request, BULK_RESULT_MAX_LINE_BYTES):
+        line_number += 1
+        if line is None:
+            report["rows"] += 1
+            record_error(line_number, None, f"Line is longer than {BULK_RESULT_MAX_LINE_BYTES} bytes")
+            continue
+        try:
+            line = line.decode("utf-8-sig" if line_number == 1 else "utf-8").strip()
+        except UnicodeDecodeError:
+            report["rows"] += 1
+            record_error(line_number, None, "Line is not valid UTF-8")
+            continue
+        if not line:
+            continue
+        if columns is None:
+            # The CSV header names the columns; nothing has been written yet, so a bad one fails the request
+            columns = [column.strip() for column in next(csv.reader([line]))]
+            if "match_id" not in columns or not set(columns) <= set(BULK_RESULT_COLUMNS) or len(set(columns)) != len(columns):
+                raise HTTPException(status_code=400, detail=f"CSV header must name match_id and optionally {', '.join(BULK_RESULT_COLUMNS[1:])}")
+            continue
+
+        report["rows"] += 1
+        try:
+            batch.append((line_number, parse_bulk_result_row(row_format, line, columns)))
+        except ValueError as e:
+            record_error(line_number, None, validation_error_detail(e))
+        if len(batch) >= BULK_RESULT_BATCH_SIZE:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+
+    return report
 
 # Pydantic model for organizer to create event registration
 class OrganizerEventRegistrationCreate(BaseModel):
@@ -1075,6 +3219,15 @@ class EventRegistrationResponse(BaseModel):
     class Config:
         orm_mode = True
 
+registration_list_encoder = ListEncoder(EventRegistrationResponse)
+
+# What non-organizers see of a registration: who is in which event, not when they joined
+class RegistrationKeyResponse(BaseModel):
+    user_id: int
+    event_id: int
+
+registration_key_list_encoder = ListEncoder(RegistrationKeyResponse)
+
 # Create a new event registration (Organizer only)
 @app.post("/event-registrations", response_model=EventRegistrationResponse, status_code=status.HTTP_201_CREATED)
 def create_event_registration(reg: OrganizerEventRegistrationCreate, current_user: dict = Depends(is_organizer), db: Session = Depends(get_db)):
@@ -1112,8 +3265,7 @@ def create_event_registration(reg: OrganizerEventRegistrationCreate, current_use
 
 # Get all event registrations (Organizer only - with optional filters)
 @app.get("/event-registrations", response_model=list[EventRegistrationResponse])
-def get_all_event_registrations(current_user: dict = Depends(is_organizer), user_id: int | None = None, event_id: int | None = None, db: Session = Depends(get_db)):
-    query = text("SELECT user_id, event_id, registration_date FROM event_registrations")
+def get_all_event_registrations(response: Response, current_user: dict = Depends(is_organizer), user_id: int | None = None, event_id: int | None = None, limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX), cursor: str | None = None, db: Session = Depends(get_db)):
     params = {}
     where_clauses = []
 
@@ -1124,11 +3276,9 @@ def get_all_event_registrations(current_user: dict = Depends(is_organizer), user
         where_clauses.append("event_id = :event_id")
         params["event_id"] = event_id
 
-    if where_clauses:
-        query = text(f"{query} WHERE {' AND '.join(where_clauses)}")
-
-    registrations = db.execute(query, params).fetchall()
-    return registrations
+    registrations = fetch_page(db, "SELECT user_id, event_id, registration_date FROM event_registrations", REGISTRATION_PAGE_KEY,
+                               lambda row: [row.user_id, row.event_id], where_clauses, params, limit, cursor, response)
+    return registration_list_encoder.response(registrations, headers=response.headers)
 
 # Get registrations for a specific user (Organizer only)
 @app.get("/users/{user_id}/registrations", response_model=list[EventRegistrationResponse])
@@ -1139,9 +3289,11 @@ def get_user_registrations(user_id: int, current_user: dict = Depends(is_organiz
         raise HTTPException(status_code=404, detail="User not found")
 
     registrations = db.execute(text("SELECT user_id, event_id, registration_date FROM event_registrations WHERE user_id = :user_id"), {"user_id": user_id}).fetchall()
-    return registrations
+    return registration_list_encoder.response(registrations)
 
 # Get registrations for a specific event (Organizer only)
+EVENT_REGISTRATIONS_SQL = "SELECT user_id, event_id, registration_date FROM event_registrations WHERE event_id = :event_id"
+
 @app.get("/events/{event_id}/registrations", response_model=list[EventRegistrationResponse])
 def get_event_registrations(event_id: int, current_user: dict = Depends(is_organizer), db: Session = Depends(get_db)):
     # Check if event exists
@@ -1149,8 +3301,8 @@ def get_event_registrations(event_id: int, current_user: dict = Depends(is_organ
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
 
-    registrations = db.execute(text("SELECT user_id, event_id, registration_date FROM event_registrations WHERE event_id = :event_id"), {"event_id": event_id}).fetchall()
-    return registrations
+    registrations = db.execute(text(EVENT_REGISTRATIONS_SQL), {"event_id": event_id}).fetchall()
+    return registration_list_encoder.response(registrations)
 
 # Delete an event registration (Organizer only) - requires both user_id and event_id
 @app.delete("/event-registrations/{user_id}/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -1171,51 +3323,224 @@ def delete_event_registration(user_id: int, event_id: int, current_user: dict =
     return # No content to return for 204 
 
 # Get league standings for a specific event (Can be public)
-@app.get("/events/{event_id}/standings", response_model=list[dict]) # Using dict for simplicity, can create a Pydantic model
-def get_league_standings(event_id: int, db: Session = Depends(get_db)):
-    # Check if event exists and is in league mode
-    event = db.execute(text("SELECT id, mode FROM events WHERE id = :event_id"), {"event_id": event_id}).fetchone()
+LEAGUE_STANDINGS_SQL = """
+    SELECT
+        ls.user_id,
+        u.username,
+        ls.points,
+        ls.wins,
+        ls.draws,
+        ls.losses,
+        ls.goals_scored,
+        ls.goals_against,
+        ls.games_played,
+        (ls.goals_scored - ls.goals_against) AS goal_difference
+    FROM league_standings ls
+    JOIN users u ON ls.user_id = u.id
+    WHERE ls.event_id = :event_id
+    ORDER BY ls.points DESC, goal_difference DESC, ls.goals_scored DESC
+"""
+
+# Per-event standings, kept both as the ranked rows and as the serialized JSON body.
+# Entries are built once and dropped by the write paths that change the inputs
+# (results, matches, usernames, events); concurrent misses for the same event wait
+# on a single build. STANDINGS_CACHE_TTL_SECONDS bounds staleness across worker
+# processes, since invalidation only reaches the process that made the write.
+STANDINGS_CACHE_TTL_SECONDS = float(os.environ.get("STANDINGS_CACHE_TTL_SECONDS", "10"))
+
+class StandingsCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self._entries = {} # event_id -> (expires_at, standings, body)
+        self._building = {} # event_id -> Future shared by concurrent misses
+        self._generations = {} # event_id -> bumped on every invalidation
+        self._global_generation = 0
+        self._lock = threading.Lock()
+
+    def _claim(self, event_id: int):
+        # Returns (cached value, None, None) on a hit. On a miss, returns the Future shared
+        # by all concurrent misses and, for the one caller that has to build, the generation
+        with self._lock:
+            entry = self._entries.get(event_id)
+            if entry is not None and entry[0] > time_module.monotonic():
+                self.hits += 1
+                return (entry[1], entry[2]), None, None
+            self.misses += 1
+            future = self._building.get(event_id)
+            if future is not None:
+                return None, future, None
+            future = Future()
+            self._building[event_id] = future
+            return None, future, (self._global_generation, self._generations.get(event_id, 0))
+
+    def _finish(self, event_id: int, future: Future, generation, standings=None, error: BaseException | None = None):
+        value = None
+        if error is None:
+            try:
+                value = (standings, orjson.dumps(standings))
+            except Exception as e:
+                error = e
+        with self._lock:
+            self._building.pop(event_id, None)
+            if error is None:
+                self.builds += 1
+                # Don't store a result that an invalidation overtook while it was being built
+                if generation == (self._global_generation, self._generations.get(event_id, 0)):
+                    self._entries[event_id] = (time_module.monotonic() + self.ttl, *value)
+        if error is not None:
+            future.set_exception(error)
+            raise error
+        future.set_result(value)
+        return value
+
+    def get(self, event_id: int, build):
+        # build() returns the ranked standings list; raises HTTPException for bad events
+        value, future, generation = self._claim(event_id)
+        if value is not None:
+            return value
+        if generation is None:
+            return future.result()
+        try:
+            standings = build()
+        except BaseException as e:
+            return self._finish(event_id, future, generation, error=e)
+        return self._finish(event_id, future, generation, standings)
+
+    async def get_async(self, event_id: int, build):
+        # Like get(), but build is a coroutine function and waiting never blocks the event loop
+        value, future, generation = self._claim(event_id)
+        if value is not None:
+            return value
+        if generation is None:
+            # shield: a disconnecting waiter must not cancel the build shared with the others
+            return await asyncio.shield(asyncio.wrap_future(future))
+        build_task = asyncio.ensure_future(self._build_async(event_id, future, generation, build))
+        return await asyncio.shield(build_task)
+
+    async def _build_async(self, event_id: int, future: Future, generation, build):
+        try:
+            standings = await build()
+        except BaseException as e:
+            return self._finish(event_id, future, generation, error=e)
+        return self._finish(event_id, future, generation, standings)
+
+    def invalidate(self, event_id: int | None = None):
+        # Without an event_id, drop every event (e.g. a username or user deletion)
+        with self._lock:
+            if event_id is None:
+                self._entries.clear()
+                self._global_generation += 1
+            else:
+                self._entries.pop(event_id, None)
+                self._generations[event_id] = self._generations.get(event_id, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "builds": self.builds, "size": len(self._entries), "ttl_seconds": self.ttl}
+
+standings_cache = StandingsCache(ttl=STANDINGS_CACHE_TTL_SECONDS)
+
+def check_league_event(event):
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
-    if event['mode'] != 'league':
+    if event.mode != 'league':
         raise HTTPException(status_code=400, detail="Event is not in league mode")
 
+def load_league_standings(db: Session, event_id: int):
+    # Check if event exists and is in league mode
+    check_league_event(db.execute(text("SELECT id, mode FROM events WHERE id = :event_id"), {"event_id": event_id}).fetchone())
+
     # Get standings, ordered by points, then goal difference (goals_scored - goals_against), then goals_scored
-    standings = db.execute(text("""
-        SELECT
-            ls.user_id,
-            u.username,
-            ls.points,
-            ls.wins,
-            ls.draws,
-            ls.losses,
-            ls.goals_scored,
-            ls.goals_against,
-            ls.games_played,
-            (ls.goals_scored - ls.goals_against) AS goal_difference
-        FROM league_standings ls
-        JOIN users u ON ls.user_id = u.id
-        WHERE ls.event_id = :event_id
-        ORDER BY ls.points DESC, goal_difference DESC, ls.goals_scored DESC
-    """), {"event_id": event_id}).fetchall()
+    standings = db.execute(text(LEAGUE_STANDINGS_SQL), {"event_id": event_id}).fetchall()
+
+    return rank_standings(standings)
+
+async def load_league_standings_async(event_id: int):
+    # Uses its own session: the build is shared with other requests and may outlive the one that started it
+    async with AsyncSessionLocal() as db:
+        check_league_event((await db.execute(text("SELECT id, mode FROM events WHERE id = :event_id"), {"event_id": event_id})).fetchone())
+        standings = (await db.execute(text(LEAGUE_STANDINGS_SQL), {"event_id": event_id})).fetchall()
+    return rank_standings(standings)
 
+def get_cached_standings(db: Session, event_id: int):
+    # Returns (ranked standings, serialized JSON body)
+    return standings_cache.get(event_id, lambda: load_league_standings(db, event_id))
+
+@app.get("/events/{event_id}/standings", response_model=list[dict]) # Using dict for simplicity, can create a Pydantic model
+async def get_league_standings(event_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    headers, not_modified = await get_conditional_headers(request, db, event_id=event_id, tables=("users",))
+    if not_modified:
+        return not_modified
+
+    # Serve the pre-serialized body directly; response_model still documents the shape
+    standings_body = (await standings_cache.get_async(event_id, lambda: load_league_standings_async(event_id)))[1]
+    return Response(content=standings_body, media_type="application/json", headers=headers)
+
+def rank_standings(standings):
     # Add position to the results
     ranked_standings = []
     for i, row in enumerate(standings):
-        standing_dict = dict(row)
+        standing_dict = dict(row._mapping)
         standing_dict['position'] = i + 1
         ranked_standings.append(standing_dict)
 
     return ranked_standings
 
+# Rebuild league standings from the recorded results (Organizer only)
+@app.post("/events/{event_id}/standings/rebuild")
+def rebuild_event_standings(event_id: int, dry_run: bool = False, current_user: dict = Depends(is_organizer), db: Session = Depends(get_db)):
+    event = db.execute(text("SELECT id, mode FROM events WHERE id = :event_id"), {"event_id": event_id}).fetchone()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    if event.mode != 'league':
+        raise HTTPException(status_code=400, detail="Event is not in league mode")
+
+    report = rebuild_league_standings(db, event_id=event_id, dry_run=dry_run)
+    db.commit()
+    standings_cache.invalidate(event_id)
+    return report
+
+# Rebuild league standings for every event (Organizer only)
+@app.post("/standings/rebuild")
+def rebuild_all_standings(dry_run: bool = False, current_user: dict = Depends(is_organizer), db: Session = Depends(get_db)):
+    report = rebuild_league_standings(db, dry_run=dry_run)
+    db.commit()
+    standings_cache.invalidate()
+    return report
+
 # Get user's knockout progress for a specific event (Can be public)
+KNOCKOUT_PROGRESS_SQL = """
+    SELECT
+        m.id AS match_id,
+        m.stage,
+        m.match_date,
+        m.match_time,
+        m.user1_id,
+        u1.username AS user1_username,
+        m.user2_id,
+        u2.username AS user2_username,
+        m.venue,
+        r.user1_score,
+        r.user2_score,
+        r.winner_user_id
+    FROM matches m
+    LEFT JOIN users u1 ON m.user1_id = u1.id
+    LEFT JOIN users u2 ON m.user2_id = u2.id
+    LEFT JOIN results r ON m.id = r.match_id
+    WHERE m.event_id = :event_id AND (m.user1_id = :user_id OR m.user2_id = :user_id)
+    ORDER BY m.match_date, m.match_time
+"""
+
 @app.get("/events/{event_id}/users/{user_id}/knockout-progress", response_model=list[dict])
 def get_user_knockout_progress(event_id: int, user_id: int, db: Session = Depends(get_db)):
     # Check if event exists and is in knockout mode
     event = db.execute(text("SELECT id, mode FROM events WHERE id = :event_id"), {"event_id": event_id}).fetchone()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
-    if event['mode'] != 'knockout':
+    if event.mode != 'knockout':
         raise HTTPException(status_code=400, detail="Event is not in knockout mode")
 
     # Check if user exists and is registered for the event
@@ -1227,70 +3552,479 @@ def get_user_knockout_progress(event_id: int, user_id: int, db: Session = Depend
          raise HTTPException(status_code=400, detail="User is not registered for this event")
 
     # Get all matches for this event involving the user, with results
-    matches_with_results = db.execute(text("""
-        SELECT
-            m.id AS match_id,
-            m.stage,
-            m.match_date,
-            m.match_time,
-            m.user1_id,
-            u1.username AS user1_username,
-            m.user2_id,
-            u2.username AS user2_username,
-            m.venue,
-            r.user1_score,
-            r.user2_score,
-            r.winner_user_id
-        FROM matches m
-        JOIN users u1 ON m.user1_id = u1.id
-        JOIN users u2 ON m.user2_id = u2.id
-        LEFT JOIN results r ON m.id = r.match_id
-        WHERE m.event_id = :event_id AND (m.user1_id = :user_id OR m.user2_id = :user_id)
-        ORDER BY m.match_date, m.match_time
-    """), {"event_id": event_id, "user_id": user_id}).fetchall()
+    matches_with_results = db.execute(text(KNOCKOUT_PROGRESS_SQL), {"event_id": event_id, "user_id": user_id}).fetchall()
 
     # Process matches to determine progress (basic)
     progress = []
     for match in matches_with_results:
-        match_dict = dict(match)
-        is_winner = match['winner_user_id'] == user_id if match['winner_user_id'] is not None else None
+        match_dict = dict(match._mapping)
+        is_winner = match.winner_user_id == user_id if match.winner_user_id is not None else None
         match_dict['user_is_winner'] = is_winner
         progress.append(match_dict)
 
     return progress
 
+# Export an event's matches with their results and players (Can be public; registration
+# dates are for organizers only). The rows are streamed from one query in batches of
+# EXPORT_BATCH_ROWS, so an export never holds more than one batch in memory;
+# CompressionMiddleware compresses each batch as it goes out.
+EXPORT_BATCH_ROWS = int(os.environ.get("EXPORT_BATCH_ROWS", "500"))
+
+class EventExportRow(BaseModel):
+    match_id: int
+    stage: str | None = None
+    match_date: date | None = None
+    match_time: time | None = None
+    venue: str | None = None
+    user1_id: int | None = None
+    user1_username: str | None = None
+    user1_registration_date: datetime | None = None
+    user2_id: int | None = None
+    user2_username: str | None = None
+    user2_registration_date: datetime | None = None
+    user1_score: int | None = None
+    user2_score: int | None = None
+    winner_user_id: int | None = None
+
+# Registration dates are organizer-only elsewhere (/events/{id}/registrations), so
+# everyone else gets the export without them
+class PublicEventExportRow(BaseModel):
+    match_id: int
+    stage: str | None = None
+    match_date: date | None = None
+    match_time: time | None = None
+    venue: str | None = None
+    user1_id: int | None = None
+    user1_username: str | None = None
+    user2_id: int | None = None
+    user2_username: str | None = None
+    user1_score: int | None = None
+    user2_score: int | None = None
+    winner_user_id: int | None = None
+
+event_export_encoder = ListEncoder(EventExportRow)
+public_event_export_encoder = ListEncoder(PublicEventExportRow)
+
+# Walks idx_matches_event_schedule_page in order, so SQLite hands out rows as it finds
+# them instead of sorting the whole event first
+EVENT_EXPORT_SQL = """
+    SELECT
+        m.id AS match_id,
+        m.stage,
+        m.match_date,
+        m.match_time,
+        m.venue,
+        m.user1_id,
+        u1.username AS user1_username,
+        g1.registration_date AS user1_registration_date,
+        m.user2_id,
+        u2.username AS user2_username,
+        g2.registration_date AS user2_registration_date,
+        r.user1_score,
+        r.user2_score,
+        r.winner_user_id
+    FROM matches m
+    LEFT JOIN users u1 ON m.user1_id = u1.id
+    LEFT JOIN users u2 ON m.user2_id = u2.id
+    LEFT JOIN event_registrations g1 ON g1.user_id = m.user1_id AND g1.event_id = m.event_id
+    LEFT JOIN event_registrations g2 ON g2.user_id = m.user2_id AND g2.event_id = m.event_id
+    LEFT JOIN results r ON m.id = r.match_id
+    WHERE m.event_id = :event_id
+    ORDER BY IFNULL(m.match_date, ''), IFNULL(m.match_time, ''), m.id
+"""
+
+def encode_export_rows(rows, export_format: str, encoder: ListEncoder = event_export_encoder) -> bytes:
+    items = encoder.items(rows)
+    if export_format == "ndjson":
+        return b"".join(orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE) for item in items)
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows([item[name] for name, _, _ in encoder.fields] for item in items)
+    return buffer.getvalue().encode()
+
+def stream_event_export(event_id: int, export_format: str, encoder: ListEncoder):
+    # Runs in the threadpool one chunk at a time; holds its own connection until the
+    # last row is sent or the client goes away
+    if export_format == "csv":
+        yield ",".join(name for name, _, _ in encoder.fields).encode() + b"\n"
+    with engine.connect() as connection:
+        # pysqlite steps the cursor lazily, so each batch is read from SQLite as it is needed
+        result = connection.execute(text(EVENT_EXPORT_SQL), {"event_id": event_id})
+        for rows in result.partitions(EXPORT_BATCH_ROWS):
+            yield encode_export_rows(rows, export_format, encoder)
+
+@app.get("/events/{event_id}/export")
+def export_event(event_id: int, format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+                 current_user: dict | None = Depends(get_optional_current_user), db: Session = Depends(get_db)):
+    event = db.execute(text("SELECT id FROM events WHERE id = :event_id"), {"event_id": event_id}).fetchone()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    is_organizer_user = current_user is not None and current_user['role'] == 'organizer'
+    encoder = event_export_encoder if is_organizer_user else public_event_export_encoder
+    headers = {"Content-Disposition": f'attachment; filename="event-{event_id}.{format}"'}
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv; charset=utf-8"
+    return StreamingResponse(stream_event_export(event_id, format, encoder), media_type=media_type, headers=headers)
+
+# Live feed: an in-process pub/sub per event. Writers publish after their commit with the
+# data they already hold; the message is serialized once and handed to every subscriber's
+# bounded queue on the event loop, so fan-out never touches the DB. A subscriber that falls
+# LIVE_QUEUE_SIZE messages behind loses its backlog and gets a "resync" message telling it
+# to reload instead. Each worker process only sees the writes it handles itself.
+LIVE_QUEUE_SIZE = int(os.environ.get("LIVE_QUEUE_SIZE", "64"))
+LIVE_KEEPALIVE_SECONDS = float(os.environ.get("LIVE_KEEPALIVE_SECONDS", "15"))
+LIVE_MAX_CONNECTION_SECONDS = float(os.environ.get("LIVE_MAX_CONNECTION_SECONDS", "300")) # SSE clients reconnect and resume with Last-Event-ID
+
+class LiveMessage:
+    __slots__ = ("id", "sse_frame", "ws_frame")
+
+    def __init__(self, message_id: int | None, message_type: str, payload: bytes):
+        self.id = message_id
+        sse_id = b"" if message_id is None else b"id: %d\n" % message_id
+        self.sse_frame = b"%sevent: %s\ndata: %s\n\n" % (sse_id, message_type.encode(), payload)
+        self.ws_frame = f'{{"id":{"null" if message_id is None else message_id},"type":"{message_type}","data":{payload.decode()}}}'
+
+# Has no id, so a client's Last-Event-ID keeps pointing at the last real message
+LIVE_RESYNC = LiveMessage(None, "resync", b"{}")
+
+class LiveSubscription:
+    # Lives on the event loop; push and get are never called from other threads
+    def __init__(self, event_id: int, max_queued: int):
+        self.event_id = event_id
+        self.max_queued = max_queued
+        self.queue = deque()
+        self.resync = False
+        self.wakeup = asyncio.Event()
+
+    def push(self, message: LiveMessage):
+        if len(self.queue) >= self.max_queued:
+            # Too slow to keep up: drop the backlog, the reload replaces it
+            self.queue.clear()
+            if not self.resync:
+                self.resync = True
+                live_resyncs_total.inc()
+        self.queue.append(message)
+        self.wakeup.set()
+
+    async def get(self):
+        # Waits for and returns everything queued, led by LIVE_RESYNC after an overflow
+        while not self.queue and not self.resync:
+            self.wakeup.clear()
+            await self.wakeup.wait()
+        messages = [LIVE_RESYNC] if self.resync else []
+        messages += self.queue
+        self.queue.clear()
+        self.resync = False
+        return messages
+
+class LiveFeed:
+    def __init__(self, max_queued: int):
+        self.max_queued = max_queued
+        self.loop = None
+        self._subscriptions = {} # event id -> set of LiveSubscription
+        self._recent = {} # event id -> last max_queued messages, replayed to reconnecting clients
+        self._evicted_through = {} # event id -> id of the newest message no longer in _recent
+        # Ids grow across restarts, so an id from an earlier process is recognisably too old
+        self._first_id = time_module.time_ns() // 1000
+        self._ids = itertools.count(self._first_id)
+
+    def start(self, loop):
+        self.loop = loop
+
+    def publish(self, event_id: int, message_type: str, data: dict):
+        # Safe to call from any thread, after the change is committed
+        if self.loop is None:
+            return
+        payload = orjson.dumps(data)
+        try:
+            self.loop.call_soon_threadsafe(self._fan_out, event_id, message_type, payload)
+        except RuntimeError: # Loop already closed during shutdown
+            pass
+
+    def _fan_out(self, event_id: int, message_type: str, payload: bytes):
+        message = LiveMessage(next(self._ids), message_type, payload)
+        recent = self._recent.setdefault(event_id, deque(maxlen=self.max_queued))
+        if len(recent) == recent.maxlen:
+            self._evicted_through[event_id] = recent[0].id
+        recent.append(message)
+        for subscription in self._subscriptions.get(event_id, ()):
+            subscription.push(message)
+
+    def subscribe(self, event_id: int, last_event_id: int | None = None):
+        subscription = LiveSubscription(event_id, self.max_queued)
+        if last_event_id is not None:
+            if last_event_id < self._first_id - 1 or last_event_id < self._evicted_through.get(event_id, 0):
+                subscription.resync = True # Missed messages that are no longer kept
+            for message in self._recent.get(event_id, ()):
+                if message.id > last_event_id:
+                    subscription.push(message)
+        self._subscriptions.setdefault(event_id, set()).add(subscription)
+        live_subscribers.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: LiveSubscription):
+        subscriptions = self._subscriptions.get(subscription.event_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.event_id]
+        live_subscribers.dec()
+
+live_feed = LiveFeed(max_queued=LIVE_QUEUE_SIZE)
+
+def publish_result(event_id: int, result, next_match_id=None):
+    # next_match_id is set when the result moved a bracket winner on
+    live_feed.publish(event_id, "result", {**result_list_encoder.items([result])[0], "next_match_id": next_match_id})
+
+def parse_last_event_id(value):
+    return int(value) if value and value.isdigit() else None
+
+async def stream_live_feed(event_id: int, last_event_id: int | None):
+    subscription = live_feed.subscribe(event_id, last_event_id)
+    try:
+        yield b"retry: 3000\n\n"
+        deadline = time_module.monotonic() + LIVE_MAX_CONNECTION_SECONDS
+        while time_module.monotonic() < deadline:
+            try:
+                messages = await asyncio.wait_for(subscription.get(), LIVE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            yield b"".join(message.sse_frame for message in messages)
+    finally:
+        live_feed.unsubscribe(subscription)
+
+async def check_event_exists(event_id: int):
+    async with AsyncSessionLocal() as db:
+        event = (await db.execute(text("SELECT id FROM events WHERE id = :event_id"), {"event_id": event_id})).fetchone()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+# Server-Sent Events feed of an event's results and match changes (Can be public)
+@app.get("/events/{event_id}/live")
+async def live_event_feed(event_id: int, request: Request):
+    await check_event_exists(event_id)
+    last_event_id = parse_last_event_id(request.headers.get("last-event-id"))
+    return StreamingResponse(stream_live_feed(event_id, last_event_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# The same feed over a WebSocket; pass last_event_id to resume
+@app.websocket("/events/{event_id}/live/ws")
+async def live_event_socket(websocket: WebSocket, event_id: int, last_event_id: str | None = None):
+    try:
+        await check_event_exists(event_id)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+
+    async def wait_for_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    subscription = live_feed.subscribe(event_id, parse_last_event_id(last_event_id))
+    disconnected = asyncio.ensure_future(wait_for_disconnect())
+    try:
+        while not disconnected.done():
+            getter = asyncio.ensure_future(subscription.get())
+            await asyncio.wait({getter, disconnected}, timeout=LIVE_KEEPALIVE_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                if not disconnected.done():
+                    await websocket.send_text('{"type":"keepalive"}')
+                continue
+            for message in getter.result():
+                await websocket.send_text(message.ws_frame)
+    finally:
+        disconnected.cancel()
+        live_feed.unsubscribe(subscription)
+
+# Incremental sync. Triggers (migration 0005) append a change_log row for every write to
+# the synced tables. GET /changes pages through the log by seq and returns each changed row
+# as it is now, or null once deleted, so a client's refresh costs O(changes), not O(table).
+CHANGES_SQL = "SELECT seq, table_name, row_id, event_id FROM change_log WHERE seq > :since"
+CHANGES_HORIZON_SQL = "SELECT pruned_through, (SELECT COALESCE(MAX(seq), 0) FROM change_log) AS latest FROM change_log_retention WHERE id = 1"
+CHANGE_TABLES = {
+    # table: (current rows whose keys are in the JSON array :keys, encoder, key columns)
+    "events": ("SELECT id, name, description, start_date, end_date, mode FROM events WHERE id IN (SELECT value FROM json_each(:keys))",
+               event_list_encoder, ("id",)),
+    "matches": ("SELECT id, event_id, stage, match_date, match_time, user1_id, user2_id, venue, user1_screenshot_url, user1_tactics_url, user2_screenshot_url, user2_tactics_url FROM matches WHERE id IN (SELECT value FROM json_each(:keys))",
+                match_list_encoder, ("id",)),
+    "results": ("SELECT id, match_id, user1_score, user2_score, winner_user_id FROM results WHERE id IN (SELECT value FROM json_each(:keys))",
+                result_list_encoder, ("id",)),
+    "event_registrations": ("SELECT user_id, event_id, registration_date FROM event_registrations WHERE (user_id, event_id) IN (SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(:keys))",
+                            registration_list_encoder, ("user_id", "event_id")),
+    "users": ("SELECT id, username, email, registration_date, role FROM users WHERE id IN (SELECT value FROM json_each(:keys))",
+              user_list_encoder, ("id",)),
+}
+# Encoders for callers who are not organizers: no emails, roles or registration dates
+PUBLIC_CHANGE_ENCODERS = {
+    "users": participant_list_encoder,
+    "event_registrations": registration_key_list_encoder,
+}
+
+@app.get("/changes")
+def get_changes(since: int = Query(0, ge=0), event_id: int | None = None, limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+                current_user: dict | None = Depends(get_optional_current_user), db: Session = Depends(get_db)):
+    # Changes after `since` may have been pruned (prune_change_log): the client has to reload
+    # what it follows, and can carry on from the seq it is given here, read before that reload
+    horizon = db.execute(text(CHANGES_HORIZON_SQL)).fetchone()
+    if since < horizon.pruned_through:
+        raise HTTPException(status_code=status.HTTP_410_GONE,
+                            detail={"message": "Changes after this seq are no longer kept; reload and continue from resync_since", "resync_since": horizon.latest})
+
+    # Users have no event, so they are left out when following a single event
+    query = CHANGES_SQL
+    params = {"since": since, "page_limit": limit + 1}
+    if event_id is not None:
+        query += " AND event_id = :event_id"
+        params["event_id"] = event_id
+    entries = db.execute(text(query + " ORDER BY seq LIMIT :page_limit"), params).fetchall()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # A row changed several times in this page is sent once, at its latest seq
+    latest = {}
+    for entry in entries:
+        key = (entry.row_id, entry.event_id) if entry.table_name == "event_registrations" else (entry.row_id,)
+        latest[(entry.table_name, key)] = entry.seq
+
+    # One query per table for the rows' current state
+    is_organizer_user = current_user is not None and current_user['role'] == 'organizer'
+    current = {}
+    for table, (sql, encoder, key_columns) in CHANGE_TABLES.items():
+        keys = [key if len(key_columns) > 1 else key[0] for changed_table, key in latest if changed_table == table]
+        if not keys:
+            continue
+        if not is_organizer_user:
+            encoder = PUBLIC_CHANGE_ENCODERS.get(table, encoder)
+        rows = db.execute(text(sql), {"keys": json.dumps(keys)}).fetchall()
+        for row, item in zip(rows, encoder.items(rows)):
+            current[(table, tuple(getattr(row, column) for column in key_columns))] = item
+
+    changes = [
+        {"seq": seq, "table": table, "key": dict(zip(CHANGE_TABLES[table][2], key)), "row": current.get((table, key))}
+        for (table, key), seq in sorted(latest.items(), key=lambda change: change[1])
+    ]
+    body = {"changes": changes, "next_since": entries[-1].seq if entries else since, "has_more": has_more}
+    return Response(content=orjson.dumps(body), media_type="application/json")
+
+# Get an event's knockout bracket as a tree (Can be public). One recursive query walks
+# from the final down through next_match_id, so the cost doesn't grow with the rounds.
+EVENT_BRACKET_SQL = """
+    WITH RECURSIVE bracket(id) AS (
+        SELECT id FROM matches
+        WHERE event_id = :event_id AND bracket_round IS NOT NULL AND next_match_id IS NULL
+        UNION ALL
+        SELECT m.id FROM matches m JOIN bracket b ON m.next_match_id = b.id
+    )
+    SELECT
+        m.id AS match_id,
+        m.stage,
+        m.bracket_round,
+        m.bracket_position,
+        m.match_date,
+        m.match_time,
+        m.venue,
+        m.user1_id,
+        u1.username AS user1_username,
+        m.user2_id,
+        u2.username AS user2_username,
+        m.next_match_id,
+        m.next_match_slot,
+        r.id AS result_id,
+        r.user1_score,
+        r.user2_score,
+        r.winner_user_id
+    FROM bracket b
+    JOIN matches m ON m.id = b.id
+    LEFT JOIN users u1 ON m.user1_id = u1.id
+    LEFT JOIN users u2 ON m.user2_id = u2.id
+    LEFT JOIN results r ON m.id = r.match_id
+    ORDER BY m.bracket_round, m.bracket_position
+"""
+
+@app.get("/events/{event_id}/bracket", response_model=dict)
+def get_event_bracket(event_id: int, db: Session = Depends(get_db)):
+    event = db.execute(text("SELECT id, mode FROM events WHERE id = :event_id"), {"event_id": event_id}).fetchone()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    if event.mode != 'knockout':
+        raise HTTPException(status_code=400, detail="Event is not in knockout mode")
+
+    rows = db.execute(text(EVENT_BRACKET_SQL), {"event_id": event_id}).fetchall()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Event has no bracket; generate its fixtures first")
+
+    # A feeder left as None means a bye filled that slot
+    nodes = {}
+    for row in rows:
+        node = {key: row._mapping[key] for key in ("match_id", "stage", "bracket_round", "bracket_position", "match_date", "match_time", "venue")}
+        node["user1"] = {"id": row.user1_id, "username": row.user1_username} if row.user1_id is not None else None
+        node["user2"] = {"id": row.user2_id, "username": row.user2_username} if row.user2_id is not None else None
+        node["result"] = {"user1_score": row.user1_score, "user2_score": row.user2_score, "winner_user_id": row.winner_user_id} if row.result_id is not None else None
+        node["feeders"] = [None, None]
+        nodes[row.match_id] = node
+    for row in rows:
+        if row.next_match_id is not None:
+            nodes[row.next_match_id]["feeders"][row.next_match_slot - 1] = nodes[row.match_id]
+    # Rows are in round order, so the last one is the final
+    final = nodes[rows[-1].match_id]
+
+    return {"event_id": event_id, "rounds": rows[-1].bracket_round, "matches": len(rows), "final": final}
+
 # Get current user's match history
+USER_MATCH_HISTORY_SQL = """
+    SELECT
+        m.id AS match_id,
+        m.event_id,
+        e.name AS event_name,
+        m.stage,
+        m.match_date,
+        m.match_time,
+        m.user1_id,
+        u1.username AS user1_username,
+        m.user2_id,
+        u2.username AS user2_username,
+        m.venue,
+        r.user1_score,
+        r.user2_score,
+        r.winner_user_id
+    FROM matches m
+    JOIN events e ON m.event_id = e.id
+    JOIN users u1 ON m.user1_id = u1.id
+    JOIN users u2 ON m.user2_id = u2.id
+    LEFT JOIN results r ON m.id = r.match_id
+    WHERE m.user1_id = :user_id OR m.user2_id = :user_id
+    ORDER BY m.match_date DESC, m.match_time DESC
+"""
+
 @app.get("/users/me/matches", response_model=list[UserMatchHistory])
 def get_my_match_history(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
     user_id = current_user['id']
 
     # Get all matches involving the current user, with event name, other user's username, and results
-    matches_history = db.execute(text("""
-        SELECT
-            m.id AS match_id,
-            m.event_id,
-            e.name AS event_name,
-            m.stage,
-            m.match_date,
-            m.match_time,
-            m.user1_id,
-            u1.username AS user1_username,
-            m.user2_id,
-            u2.username AS user2_username,
-            m.venue,
-            r.user1_score,
-            r.user2_score,
-            r.winner_user_id
-        FROM matches m
-        JOIN events e ON m.event_id = e.id
-        JOIN users u1 ON m.user1_id = u1.id
-        JOIN users u2 ON m.user2_id = u2.id
-        LEFT JOIN results r ON m.id = r.match_id
-        WHERE m.user1_id = :user_id OR m.user2_id = :user_id
-        ORDER BY m.match_date DESC, m.match_time DESC
-    """), {"user_id": user_id}).fetchall()
+    matches_history = db.execute(text(USER_MATCH_HISTORY_SQL), {"user_id": user_id}).fetchall()
+
+    return match_history_encoder.response(matches_history)
+
+def store_match_upload(db: Session, match_id: int, column_to_update: str, previous_file_url, file_url: str, temp_path: str, file_local_path: str):
+    # Point the match at the file before putting the file in place: the UPDATE takes
+    # SQLite's write lock, which the upload cleanup job also needs before it removes a
+    # file, so the file cannot be removed between this check and the commit
+    db.execute(
+        text(f"UPDATE matches SET {column_to_update} = :file_url WHERE id = :match_id"),
+        {"file_url": file_url, "match_id": match_id}
+    )
+    os.makedirs(os.path.dirname(file_local_path), exist_ok=True)
+    if os.path.exists(file_local_path):
+        os.remove(temp_path)
+    else:
+        os.replace(temp_path, file_local_path)
 
-    return matches_history 
+    # The file this slot pointed to before may now be unused
+    if previous_file_url != file_url:
+        enqueue_upload_cleanup(db, [previous_file_url])
+    db.commit()
 
 # Upload endpoint for screenshot or tactics image
 @app.post("/matches/{match_id}/upload/{user_id}")
@@ -1299,46 +4033,16 @@ async def upload_match_image(match_id: int, user_id: int, file: UploadFile = Fil
     if file_type not in ["screenshot", "tactics"]:
         raise HTTPException(status_code=400, detail="Invalid file_type. Must be 'screenshot' or 'tactics'")
 
-    # Validate file type based on extension
-    file_extension = os.path.splitext(file.filename)[1].lower()
-    if file_extension not in ALLOWED_FILE_TYPES:
-        raise HTTPException(status_code=400, detail=f"Invalid file type. Only {', '.join(ALLOWED_FILE_TYPES)} are allowed.")
-
-    # Validate file size
-    # Read the file content to check size and then save
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=413, detail=f"File size exceeds the maximum limit of {MAX_FILE_SIZE // 1024 // 1024}MB")
-
-    # Reset file pointer to the beginning after reading for size check
-    await file.seek(0)
-
     # Check if match exists and involves the user
-    match = db.execute(text("SELECT id, user1_id, user2_id FROM matches WHERE id = :match_id AND (user1_id = :user_id OR user2_id = :user_id)"), {"match_id": match_id, "user_id": user_id}).fetchone()
+    match = db.execute(text("SELECT id, event_id, user1_id, user2_id, user1_screenshot_url, user1_tactics_url, user2_screenshot_url, user2_tactics_url FROM matches WHERE id = :match_id AND (user1_id = :user_id OR user2_id = :user_id)"), {"match_id": match_id, "user_id": user_id}).fetchone()
     if not match:
         raise HTTPException(status_code=404, detail="Match not found or user not a participant in this match")
+    match = match._mapping
 
     # Check if the uploading user is the participant user_id
     if current_user['id'] != user_id:
          raise HTTPException(status_code=403, detail="You can only upload files for yourself in this match")
 
-    # Generate a unique filename
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_local_path = os.path.join(UPLOAD_DIRECTORY, unique_filename) # Local path
-    file_url = f"{STATIC_URL_PATH}/{unique_filename}" # Public URL
-
-    # Save the file asynchronously
-    try:
-        async with aiofiles.open(file_local_path, 'wb') as out_file:
-            # Use the content already read for size check
-            await out_file.write(content)
-        # await file.seek(0) # No longer needed after writing content
-        # async with aiofiles.open(file_local_path, 'wb') as out_file:
-        #     while content := await file.read(1024):
-        #         await out_file.write(content)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error saving file: {e}")
-
     # Determine which column to update
     column_to_update = None
     if user_id == match['user1_id']:
@@ -1351,34 +4055,219 @@ async def upload_match_image(match_id: int, user_id: int, file: UploadFile = Fil
             column_to_update = "user2_screenshot_url"
         elif file_type == "tactics":
             column_to_update = "user2_tactics_url"
-
-    if column_to_update:
-        # Update the database with the file URL
-        db.execute(
-            text(f"UPDATE matches SET {column_to_update} = :file_url WHERE id = :match_id"),
-            {"file_url": file_url, "match_id": match_id}
-        )
-        db.commit()
-    else:
+    if not column_to_update:
          # This case should ideally not be reached if logic is correct
          raise HTTPException(status_code=500, detail="Internal server error: Could not determine column to update")
 
-    return {"filename": unique_filename, "file_url": file_url} 
+    # Stream the upload to a temporary file in fixed-size chunks, hashing as we go and
+    # stopping as soon as the size limit is crossed, so memory use does not grow with the file
+    digest = hashlib.sha256()
+    file_size = 0
+    file_extension = None
+    temp_fd, temp_path = tempfile.mkstemp(dir=UPLOAD_TEMP_DIRECTORY)
+    os.close(temp_fd)
+    try:
+        async with aiofiles.open(temp_path, 'wb') as out_file:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                if file_extension is None:
+                    # Identify the image type from its magic bytes, not the client's filename
+                    file_extension = sniff_image_extension(chunk)
+                    if file_extension is None:
+                        raise HTTPException(status_code=400, detail="Invalid file type. Only JPEG, PNG, GIF, BMP and WebP images are allowed.")
+                file_size += len(chunk)
+                if file_size > MAX_FILE_SIZE:
+                    raise HTTPException(status_code=413, detail=f"File size exceeds the maximum limit of {MAX_FILE_SIZE // 1024 // 1024}MB")
+                digest.update(chunk)
+                await out_file.write(chunk)
+        if file_extension is None:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+        # Store by content hash in a sharded layout (ab/cd/abcd....png); identical
+        # uploads map to the same file and are kept only once
+        content_hash = digest.hexdigest()
+        unique_filename = f"{content_hash}{file_extension}"
+        relative_directory = os.path.join(content_hash[:2], content_hash[2:4])
+        file_local_path = os.path.join(UPLOAD_DIRECTORY, relative_directory, unique_filename) # Local path
+        file_url = f"{STATIC_URL_PATH}/{content_hash[:2]}/{content_hash[2:4]}/{unique_filename}" # Public URL
+
+        # The UPDATE, the file move and the commit block on SQLite and the filesystem, and
+        # the write lock is held from the UPDATE to the commit, so they run together off the
+        # event loop
+        await run_in_threadpool(store_match_upload, db, match_id, column_to_update, match[column_to_update], file_url, temp_path, file_local_path)
+        upload_bytes_total.inc(amount=file_size)
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error saving file: {e}")
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    live_feed.publish(match['event_id'], "upload", {"match_id": match_id, "field": column_to_update, "file_url": file_url})
+
+    return {"filename": unique_filename, "file_url": file_url}
 
 # Get participants for a specific event (Public)
+EVENT_PARTICIPANTS_SQL = """
+    SELECT u.id, u.username
+    FROM users u
+    JOIN event_registrations er ON u.id = er.user_id
+    WHERE er.event_id = :event_id
+"""
+
 @app.get("/events/{event_id}/participants", response_model=list[ParticipantResponse])
-def get_event_participants(event_id: int, db: Session = Depends(get_db)):
+async def get_event_participants(event_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    # Usernames come from users, so renames count as changes too
+    headers, not_modified = await get_conditional_headers(request, db, event_id=event_id, tables=("users",))
+    if not_modified:
+        return not_modified
+
     # Check if event exists
-    event = db.execute(text("SELECT id FROM events WHERE id = :event_id"), {"event_id": event_id}).fetchone()
+    event = (await db.execute(text("SELECT id FROM events WHERE id = :event_id"), {"event_id": event_id})).fetchone()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
 
     # Get participants by joining event_registrations and users table
-    participants = db.execute(text("""
-        SELECT u.id, u.username
-        FROM users u
-        JOIN event_registrations er ON u.id = er.user_id
-        WHERE er.event_id = :event_id
-    """), {"event_id": event_id}).fetchall()
-
-    return participants 
\ No newline at end of file
+    participants = (await db.execute(text(EVENT_PARTICIPANTS_SQL), {"event_id": event_id})).fetchall()
+
+    return participant_list_encoder.response(participants, headers=headers)
+
+# Hot queries that must be answered through an index rather than a table scan
+QUERY_PLAN_CHECKS = {
+    "get_event_matches": (EVENT_MATCHES_SQL, {"event_id": 1}),
+    "get_match_results": (MATCH_RESULT_SQL, {"match_id": 1}),
+    "get_event_participants": (EVENT_PARTICIPANTS_SQL, {"event_id": 1}),
+    "get_event_full": (EVENT_MATCH_DETAILS_SQL, {"event_id": 1}),
+    "get_event_registrations": (EVENT_REGISTRATIONS_SQL, {"event_id": 1}),
+    "get_league_standings": (LEAGUE_STANDINGS_SQL, {"event_id": 1}),
+    "get_user_knockout_progress": (KNOCKOUT_PROGRESS_SQL, {"event_id": 1, "user_id": 1}),
+    "get_my_match_history": (USER_MATCH_HISTORY_SQL, {"user_id": 1}),
+    "reverse_result_standings": (STANDINGS_DELETE_EMPTY_SQL, {"user_id": 1, "event_id": 1}),
+    "delete_user": (USER_MATCH_FILES_SQL, {"user_id": 1}),
+    "delete_unreferenced_uploads": (UPLOAD_REFERENCE_SQL, {"file_url": "/static/uploads/ab/cd/abcd.png"}),
+    "delete_event_files": (EVENT_MATCH_FILES_SQL, {"event_id": 1}),
+    "claim_jobs": (JOB_CLAIM_SQL, {"now": 0, "lease_until": 0, "batch_size": 50}),
+    "export_event": (EVENT_EXPORT_SQL, {"event_id": 1}),
+    "rebuild_event_standings": (standings_aggregate_sql(1), {"event_id": 1}),
+    "rebuild_event_standings_current": (f"SELECT {STANDINGS_COLUMNS} FROM league_standings WHERE event_id = :event_id", {"event_id": 1}),
+    "get_conditional_headers": (EVENT_VERSION_SQL, {"event_id": 1}),
+    "get_conditional_headers_by_table": (TABLE_VERSION_SQL, {"table_name": "users"}),
+    "get_changes": (CHANGES_SQL + " ORDER BY seq LIMIT 100", {"since": 1}),
+    "get_changes_by_event": (CHANGES_SQL + " AND event_id = :event_id ORDER BY seq LIMIT 100", {"since": 1, "event_id": 1}),
+}
+
+# Later pages of the paginated lists: (endpoint, filters, cursor key). The endpoints are
+# called as a request would call them, and the statements fetch_page builds for them are
+# what gets checked. The first unfiltered page walks an index in order and stops at the limit.
+PAGE_QUERY_PLAN_CALLS = {
+    "get_all_users": (get_all_users, {"role": "player"}, [1]),
+    "get_all_matches": (get_all_matches, {}, ["2024-01-01", "", 1]),
+    "get_all_matches_by_event": (get_all_matches, {"event_id": 1}, ["2024-01-01", "", 1]),
+    "get_all_matches_by_user": (get_all_matches, {"user_id": 1}, ["2024-01-01", "", 1]),
+    "get_all_results": (get_all_results, {}, [1]),
+    "get_all_results_by_match": (get_all_results, {"match_id": 1}, [1]),
+    "get_all_results_by_event": (get_all_results, {"event_id": 1}, [1]),
+    "get_all_event_registrations_by_event": (get_all_event_registrations, {"event_id": 1}, [1, 1]),
+    "get_all_event_registrations_by_user": (get_all_event_registrations, {"user_id": 1}, [1, 1]),
+}
+
+def record_page_statements(connection, endpoint, filters: dict, cursor_values: list) -> list:
+    # Returns the (statement, parameters) a list endpoint executes for one page
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    sa_event.listen(connection, "before_cursor_execute", record)
+    db = Session(bind=connection)
+    try:
+        endpoint(response=Response(), current_user=None, limit=PAGE_SIZE_DEFAULT, cursor=encode_cursor(cursor_values), db=db, **filters)
+    finally:
+        db.close()
+        sa_event.remove(connection, "before_cursor_execute", record)
+    return statements
+
+def find_table_scans(connection):
+    # Returns (query name, plan step) for every step that walks a whole table or index
+    plans = []
+    for name, (sql, params) in QUERY_PLAN_CHECKS.items():
+        plans.append((name, connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).fetchall()))
+    for name, (endpoint, filters, cursor_values) in PAGE_QUERY_PLAN_CALLS.items():
+        for statement, parameters in record_page_statements(connection, endpoint, filters, cursor_values):
+            plans.append((name, connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()))
+
+    table_scans = []
+    for name, plan in plans:
+        # Scanning a CTE or subquery walks rows an earlier step already narrowed down
+        subqueries = {detail.split(" ", 1)[1] for detail in (row._mapping["detail"] for row in plan) if detail.startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+        for row in plan:
+            detail = row._mapping["detail"]
+            if detail.startswith("SCAN ") and not detail.startswith("SCAN CONSTANT ROW") and detail[5:] not in subqueries:
+                table_scans.append((name, detail))
+    return table_scans
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cup backend")
+    subparsers = parser.add_subparsers(dest="command")
+    serve_parser = subparsers.add_parser("serve", help="Run the API server (default)")
+    serve_parser.add_argument("--host", default="0.0.0.0")
+    serve_parser.add_argument("--port", type=int, default=5000)
+    subparsers.add_parser("migrate", help="Apply pending schema migrations")
+    subparsers.add_parser("check-query-plans", help="Fail if a hot query falls back to a table scan")
+    rebuild_parser = subparsers.add_parser("rebuild-standings", help="Recompute league standings from results")
+    rebuild_parser.add_argument("--event-id", type=int, default=None, help="Only rebuild this event (default: all events)")
+    rebuild_parser.add_argument("--dry-run", action="store_true", help="Only report rows that differ, don't rewrite the table")
+    jobs_parser = subparsers.add_parser("jobs", help="Show background job counts by kind and status")
+    jobs_parser.add_argument("--retry-failed", action="store_true", help="Queue failed jobs again")
+    jobs_parser.add_argument("--run", action="store_true", help="Run due jobs until none are left (e.g. with JOB_WORKER_THREADS=0)")
+    args = parser.parse_args(argv)
+
+    if args.command == "migrate":
+        init_db()
+        return 0
+
+    if args.command == "check-query-plans":
+        init_db()
+        with engine.connect() as connection:
+            table_scans = find_table_scans(connection)
+        for name, detail in table_scans:
+            print(f"{name}: {detail}")
+        if table_scans:
+            return 1
+        print(f"All {len(QUERY_PLAN_CHECKS) + len(PAGE_QUERY_PLAN_CALLS)} hot queries use an index.")
+        return 0
+
+    if args.command == "rebuild-standings":
+        init_db()
+        db = SessionLocal()
+        try:
+            report = rebuild_league_standings(db, event_id=args.event_id, dry_run=args.dry_run)
+            db.commit()
+        finally:
+            db.close()
+        print(json.dumps(report, indent=2))
+        return 0
+
+    if args.command == "jobs":
+        init_db()
+        if args.retry_failed:
+            with engine.begin() as connection:
+                requeued = connection.execute(text("UPDATE jobs SET status = 'pending', attempts = 0, run_after = :now, finished_at = NULL WHERE status = 'failed'"), {"now": time_module.time()}).rowcount
+            print(f"Queued {requeued} failed jobs again.")
+        if args.run:
+            processed = 0
+            while claimed := run_due_jobs():
+                processed += claimed
+            print(f"Ran {processed} jobs.")
+        with engine.connect() as connection:
+            for row in connection.execute(text("SELECT kind, status, COUNT(*) AS jobs, MAX(last_error) AS last_error FROM jobs GROUP BY kind, status ORDER BY kind, status")):
+                print(f"{row.kind:<20} {row.status:<8} {row.jobs:>8}" + (f"  {row.last_error}" if row.status == "failed" and row.last_error else ""))
+        return 0
+
+    import uvicorn
+    # AccessLogMiddleware replaces uvicorn's own access log
+    uvicorn.run(app, host=getattr(args, "host", "0.0.0.0"), port=getattr(args, "port", 5000), access_log=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
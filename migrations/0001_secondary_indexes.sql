@@ -0,0 +1,17 @@
+-- Secondary indexes for the per-event, per-user and standings lookups
+
+-- Matches of an event, in schedule order (get_event_matches, knockout progress)
+CREATE INDEX IF NOT EXISTS idx_matches_event_schedule ON matches (event_id, match_date, match_time);
+
+-- Matches of a user (match history, delete_user, ON DELETE SET NULL)
+CREATE INDEX IF NOT EXISTS idx_matches_user1 ON matches (user1_id);
+CREATE INDEX IF NOT EXISTS idx_matches_user2 ON matches (user2_id);
+
+-- Winner lookups for ON DELETE SET NULL when a user is removed
+CREATE INDEX IF NOT EXISTS idx_results_winner ON results (winner_user_id);
+
+-- Participants of an event (the primary key only covers lookups by user_id)
+CREATE INDEX IF NOT EXISTS idx_event_registrations_event ON event_registrations (event_id, user_id);
+
+-- League table of an event, highest points first
+CREATE INDEX IF NOT EXISTS idx_league_standings_event_points ON league_standings (event_id, points DESC);
@@ -0,0 +1,7 @@
+-- Uploads are content-addressed and shared between match slots, so a file may only be
+-- removed once no match references it; these partial indexes keep that check cheap
+
+CREATE INDEX IF NOT EXISTS idx_matches_user1_screenshot_url ON matches (user1_screenshot_url) WHERE user1_screenshot_url IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_matches_user1_tactics_url ON matches (user1_tactics_url) WHERE user1_tactics_url IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_matches_user2_screenshot_url ON matches (user2_screenshot_url) WHERE user2_screenshot_url IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_matches_user2_tactics_url ON matches (user2_tactics_url) WHERE user2_tactics_url IS NOT NULL;
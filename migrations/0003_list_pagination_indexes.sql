@@ -0,0 +1,10 @@
+-- Keyset pagination of the organizer list endpoints (GET /users, GET /matches)
+
+-- Users filtered by role, in id order
+CREATE INDEX IF NOT EXISTS idx_users_role ON users (role);
+
+-- All matches in schedule order; the expressions must match MATCH_PAGE_KEY in main.py
+CREATE INDEX IF NOT EXISTS idx_matches_schedule_page ON matches (IFNULL(match_date, ''), IFNULL(match_time, ''));
+
+-- Matches of an event in schedule order
+CREATE INDEX IF NOT EXISTS idx_matches_event_schedule_page ON matches (event_id, IFNULL(match_date, ''), IFNULL(match_time, ''));
@@ -0,0 +1,13 @@
+-- Knockout brackets: each generated match knows its round, its position in that round and
+-- which slot of which match its winner moves on to. A match's feeders are the matches whose
+-- next_match_id points at it.
+ALTER TABLE matches ADD COLUMN bracket_round INTEGER; -- 1 for the first round, NULL outside a bracket
+ALTER TABLE matches ADD COLUMN bracket_position INTEGER; -- 0-based, top of the bracket first
+ALTER TABLE matches ADD COLUMN next_match_id INTEGER REFERENCES matches(id) ON DELETE SET NULL;
+ALTER TABLE matches ADD COLUMN next_match_slot INTEGER; -- 1 or 2: which player the winner becomes
+
+-- Walking the bracket from the final down to the first round
+CREATE INDEX IF NOT EXISTS idx_matches_next_match_id ON matches (next_match_id);
+
+-- Finding a match by its place in an event's bracket
+CREATE INDEX IF NOT EXISTS idx_matches_event_bracket ON matches (event_id, bracket_round, bracket_position);
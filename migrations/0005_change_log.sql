@@ -0,0 +1,91 @@
+-- Change tracking for incremental sync (GET /changes). Every insert, update and delete on
+-- the synced tables appends a row to change_log; seq only ever grows, so a client that
+-- remembers the last seq it saw can ask for what changed since.
+CREATE TABLE IF NOT EXISTS change_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, -- AUTOINCREMENT: a seq value is never handed out twice
+    table_name TEXT NOT NULL,
+    row_id INTEGER NOT NULL, -- user_id for event_registrations
+    event_id INTEGER, -- Event the row belongs to, NULL for users
+    operation TEXT NOT NULL CHECK (operation IN ('insert', 'update', 'delete')),
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Changes of one event, for clients that follow a single event
+CREATE INDEX IF NOT EXISTS idx_change_log_event_seq ON change_log (event_id, seq);
+
+-- events
+CREATE TRIGGER IF NOT EXISTS trg_events_insert_log AFTER INSERT ON events
+BEGIN
+    INSERT INTO change_log (table_name, row_id, event_id, operation) VALUES ('events', NEW.id, NEW.id, 'insert');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_events_update_log AFTER UPDATE ON events
+BEGIN
+    INSERT INTO change_log (table_name, row_id, event_id, operation) VALUES ('events', NEW.id, NEW.id, 'update');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_events_delete_log AFTER DELETE ON events
+BEGIN
+    INSERT INTO change_log (table_name, row_id, event_id, operation) VALUES ('events', OLD.id, OLD.id, 'delete');
+END;
+
+-- matches
+CREATE TRIGGER IF NOT EXISTS trg_matches_insert_log AFTER INSERT ON matches
+BEGIN
+    INSERT INTO change_log (table_name, row_id, event_id, operation) VALUES ('matches', NEW.id, NEW.event_id, 'insert');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_matches_update_log AFTER UPDATE ON matches
+BEGIN
+    INSERT INTO change_log (table_name, row_id, event_id, operation) VALUES ('matches', NEW.id, NEW.event_id, 'update');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_matches_delete_log AFTER DELETE ON matches
+BEGIN
+    INSERT INTO change_log (table_name, row_id, event_id, operation) VALUES ('matches', OLD.id, OLD.event_id, 'delete');
+END;
+
+-- results
+CREATE TRIGGER IF NOT EXISTS trg_results_insert_log AFTER INSERT ON results
+BEGIN
+    INSERT INTO change_log (table_name, row_id, event_id, operation) VALUES ('results', NEW.id, (SELECT event_id FROM matches WHERE id = NEW.match_id), 'insert');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_results_update_log AFTER UPDATE ON results
+BEGIN
+    INSERT INTO change_log (table_name, row_id, event_id, operation) VALUES ('results', NEW.id, (SELECT event_id FROM matches WHERE id = NEW.match_id), 'update');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_results_delete_log AFTER DELETE ON results
+BEGIN
+    INSERT INTO change_log (table_name, row_id, event_id, operation) VALUES ('results', OLD.id, (SELECT event_id FROM matches WHERE id = OLD.match_id), 'delete');
+END;
+
+-- event_registrations
+CREATE TRIGGER IF NOT EXISTS trg_event_registrations_insert_log AFTER INSERT ON event_registrations
+BEGIN
+    INSERT INTO change_log (table_name, row_id, event_id, operation) VALUES ('event_registrations', NEW.user_id, NEW.event_id, 'insert');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_event_registrations_update_log AFTER UPDATE ON event_registrations
+BEGIN
+    INSERT INTO change_log (table_name, row_id, event_id, operation) VALUES ('event_registrations', NEW.user_id, NEW.event_id, 'update');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_event_registrations_delete_log AFTER DELETE ON event_registrations
+BEGIN
+    INSERT INTO change_log (table_name, row_id, event_id, operation) VALUES ('event_registrations', OLD.user_id, OLD.event_id, 'delete');
+END;
+
+-- users
+CREATE TRIGGER IF NOT EXISTS trg_users_insert_log AFTER INSERT ON users
+BEGIN
+    INSERT INTO change_log (table_name, row_id, event_id, operation) VALUES ('users', NEW.id, NULL, 'insert');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_users_update_log AFTER UPDATE OF username, email, role ON users
+BEGIN
+    INSERT INTO change_log (table_name, row_id, event_id, operation) VALUES ('users', NEW.id, NULL, 'update');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_users_delete_log AFTER DELETE ON users
+BEGIN
+    INSERT INTO change_log (table_name, row_id, event_id, operation) VALUES ('users', OLD.id, NULL, 'delete');
+END;
+
+-- Existing rows count as inserted, so that syncing from seq 0 sees everything
+INSERT INTO change_log (table_name, row_id, event_id, operation) SELECT 'events', events.id, events.id, 'insert' FROM events;
+INSERT INTO change_log (table_name, row_id, event_id, operation) SELECT 'matches', matches.id, matches.event_id, 'insert' FROM matches;
+INSERT INTO change_log (table_name, row_id, event_id, operation) SELECT 'results', results.id, (SELECT event_id FROM matches WHERE id = results.match_id), 'insert' FROM results;
+INSERT INTO change_log (table_name, row_id, event_id, operation) SELECT 'event_registrations', event_registrations.user_id, event_registrations.event_id, 'insert' FROM event_registrations;
+INSERT INTO change_log (table_name, row_id, event_id, operation) SELECT 'users', users.id, NULL, 'insert' FROM users;
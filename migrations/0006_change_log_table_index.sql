@@ -0,0 +1,3 @@
+-- Newest change of a table, for the ETag of lists that aren't tied to one event (GET /events)
+-- and of usernames shown in event lists
+CREATE INDEX IF NOT EXISTS idx_change_log_table_seq ON change_log (table_name, seq);
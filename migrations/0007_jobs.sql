@@ -0,0 +1,18 @@
+-- Durable background jobs (see JobRunner in main.py). A job is inserted in the same
+-- transaction as the change that needs it, so it exists exactly when that change commits.
+-- run_after is a Unix timestamp: when a pending job is due, or when a running job's lease
+-- runs out and another worker may take it over.
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL, -- Key into JOB_HANDLERS
+    payload TEXT NOT NULL, -- JSON
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_after REAL NOT NULL,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at REAL
+);
+
+-- Due jobs only; finished ones never enter the index
+CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (run_after) WHERE status IN ('pending', 'running');
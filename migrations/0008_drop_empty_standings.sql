@@ -0,0 +1,4 @@
+-- Reversing a player's only result in an event used to leave a league_standings row at
+-- zero games, which GET /events/{event_id}/standings listed. Reversals now delete it;
+-- this removes the ones left behind.
+DELETE FROM league_standings WHERE games_played = 0;
@@ -0,0 +1,8 @@
+-- change_log is pruned by the job runner (prune_change_log in main.py). pruned_through is
+-- the highest seq whose entry may have been removed: a client whose `since` is below it
+-- can no longer be told everything it missed, so GET /changes answers 410 instead.
+CREATE TABLE IF NOT EXISTS change_log_retention (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    pruned_through INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO change_log_retention (id, pruned_through) VALUES (1, 0);
@@ -17,8 +17,11 @@ const AdminUserManagement: React.FC = () => {
   const [createError, setCreateError] = useState<string | null>(null);
   const [deleting, setDeleting] = useState<number | null>(null); // To track which user is being deleted
   const [deleteError, setDeleteError] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null); // Set while more pages are available
+  const [loadingMore, setLoadingMore] = useState(false);
 
-  const fetchUsers = async () => {
+  // Fetches the first page, or the page after `cursor` and appends it
+  const fetchUsers = async (cursor: string | null = null) => {
     try {
       const token = localStorage.getItem('adminToken');
       if (!token) {
@@ -27,7 +30,10 @@ const AdminUserManagement: React.FC = () => {
         return;
       }
 
-      const response = await fetch('http://localhost:8000/users', {
+      const url = cursor
+        ? `http://localhost:8000/users?cursor=${encodeURIComponent(cursor)}`
+        : 'http://localhost:8000/users';
+      const response = await fetch(url, {
         headers: {
           'Authorization': `Bearer ${token}`,
         },
@@ -39,7 +45,8 @@ const AdminUserManagement: React.FC = () => {
       }
 
       const data: User[] = await response.json();
-      setUsers(data);
+      setUsers((previous) => (cursor ? [...previous, ...data] : data));
+      setNextCursor(response.headers.get('X-Next-Cursor'));
     } catch (err: any) {
       setError(err.message);
     } finally {
@@ -47,6 +54,13 @@ const AdminUserManagement: React.FC = () => {
     }
   };
 
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    await fetchUsers(nextCursor);
+    setLoadingMore(false);
+  };
+
   useEffect(() => {
     fetchUsers();
   }, []); // Empty dependency array means this effect runs once after initial render
@@ -217,6 +231,11 @@ const AdminUserManagement: React.FC = () => {
           </tbody>
         </table>
       )}
+      {nextCursor && (
+        <button onClick={handleLoadMore} disabled={loadingMore}>
+          {loadingMore ? 'Loading...' : 'Load more'}
+        </button>
+      )}
     </div>
   );
 };
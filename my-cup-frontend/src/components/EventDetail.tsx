@@ -1,8 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useParams } from 'react-router-dom';
 import { Link } from 'react-router-dom';
-// Assuming you have a function to get current user ID from token
-// import { getCurrentUserId } from '../utils/auth'; // You might need a utility for this
 
 interface EventDetailData {
   id: number;
@@ -28,12 +26,11 @@ interface Match {
     user2_id: number | null;
     user2_username: string | null; // Now available from backend
     venue: string | null;
-    // Add result info if needed, e.g., scores, winner
-    score1: number | null;
-    score2: number | null;
-    winner_id: number | null;
-    // Potentially add a 'status' field like 'scheduled', 'completed', 'cancelled'
-    status: string | null;
+    // Result info, null until a result has been recorded
+    result_id: number | null;
+    user1_score: number | null;
+    user2_score: number | null;
+    winner_user_id: number | null;
 }
 
 interface Standing {
@@ -50,6 +47,14 @@ interface Standing {
     position?: number;
 }
 
+interface EventFullData {
+    event: EventDetailData;
+    participants: Participant[];
+    matches: Match[];
+    standings: Standing[] | null;
+    is_registered: boolean;
+}
+
 const EventDetail: React.FC = () => {
   const { eventId } = useParams<{ eventId: string }>();
   const [event, setEvent] = useState<EventDetailData | null>(null);
@@ -62,172 +67,33 @@ const EventDetail: React.FC = () => {
   const [joiningLeaving, setJoiningLeaving] = useState(false);
   const [joinLeaveError, setJoinLeaveError] = useState<string | null>(null);
 
-  // Helper function to check if current user is in the participants list
-  const checkRegistrationStatus = (participantsList: Participant[]) => {
-    const userToken = localStorage.getItem('userToken');
-    if (!userToken) return false; // Not logged in, not registered
-
-    // Assuming token contains user info or you can decode it to get user ID
-    // For now, let's assume we can get the current user's username from somewhere,
-    // or ideally, the backend /events/{event_id}/participants should indicate if the current user is registered.
-    // A simpler approach for now: fetch current user profile and check ID against participant list.
-    // Or, modify backend /events/{event_id}/participants to include registration status for current user.
-    // Let's use a basic check against username from a hypothetical source for now.
-
-    // TODO: Replace with actual way to get current user ID/username
-    // const currentUserId = getCurrentUserId();
-    // return participantsList.some(p => p.id === currentUserId);
-    // For now, a placeholder check:
-    // return participantsList.some(p => p.username === 'loggedInUsername');
-
-    // A more reliable approach: fetch current user profile
-    const fetchCurrentUserAndCheckRegistration = async () => {
-        try {
-            const currentUserToken = localStorage.getItem('userToken');
-            if (!currentUserToken) return false; // Not logged in
-
-            const response = await fetch('http://localhost:8000/users/me', {
-                headers: { 'Authorization': `Bearer ${currentUserToken}` },
-            });
-            if (!response.ok) {
-                 console.error('Failed to fetch current user for registration check', await response.json());
-                 return false;
-            }
-            const currentUser = await response.json();
-            return participantsList.some(p => p.id === currentUser.id);
-
-        } catch (err) {
-            console.error('Error fetching current user for registration check', err);
-            return false;
-        }
-    };
-
-    // This needs to be called and its result used to set isRegistered.
-    // This makes the useEffect more complex, maybe better to fetch user first,
-    // or have backend indicate registration status.
-
-    // For simplicity in this step, let's assume participants list is enough and we can check against username.
-    // This is a temporary simplification.
-     const loggedInUsername = '...'; // TODO: Get actual logged in username
-     return participantsList.some(p => p.username === loggedInUsername);
-
-
-  };
-
   const fetchEventDetails = async () => {
     try {
       setLoading(true);
       setError(null);
 
-      // Fetch Event Basic Details
+      // Event, participants, matches with results, standings and our registration
+      // status all come from one aggregate request
       const token = localStorage.getItem('userToken'); // Get token
-      
-      const eventResponse = await fetch(`http://localhost:8000/events/${eventId}`, {
+
+      const response = await fetch(`http://localhost:8000/events/${eventId}/full`, {
            headers: token ? { 'Authorization': `Bearer ${token}` } : {}, // Include token if available
       });
 
-      if (!eventResponse.ok) {
-           if (eventResponse.status === 404) {
+      if (!response.ok) {
+           if (response.status === 404) {
                throw new Error('Event not found.');
-           } else {
-               // For other errors, check if it's a 401 and if a token was expected but missing.
-               // If no token was sent, a 401 here might mean the endpoint requires auth,
-               // but we want basic info to be public.
-               // Let's assume the backend allows GET /events/{eventId} without auth for basic info
-               // and only restricts certain details or actions.
-               // If the backend *does* require auth for *any* info, we'd need a public endpoint.
-               const errorData = await eventResponse.json();
-               // If the error is NOT 401 or if a token was present and still failed, throw the error.
-               if (eventResponse.status !== 401 || token) {
-                   throw new Error(errorData.detail || 'Failed to fetch event details');
-               } else {
-                   // If it's a 401 and no token was sent, it means auth is required for something,
-                   // but we can proceed to fetch public data.
-                   console.warn('Could not fetch event details with token, attempting public access.');
-                   // Continue without throwing, assuming subsequent fetches are public or handle auth.
-               }
-           }
-      }
-      
-      // Only parse and set event data if the response was OK (meaning we got basic data)
-      let eventData: EventDetailData | null = null;
-      if (eventResponse.ok) {
-           eventData = await eventResponse.json();
-           setEvent(eventData);
-      } else {
-          setEvent(null); // Set event to null if basic fetch failed
-      }
-
-      // Fetch Participants (Public)
-      const participantsResponse = await fetch(`http://localhost:8000/events/${eventId}/participants`);
-      if (!participantsResponse.ok) {
-           const errorData = await participantsResponse.json();
-           throw new Error(errorData.detail || 'Failed to fetch participants');
-      }
-      const participantsData: Participant[] = await participantsResponse.json();
-      setParticipants(participantsData);
-
-      // Check registration status after fetching participants (requires token)
-      if (token) { // Only attempt to fetch current user if token exists
-          const currentUserResponse = await fetch('http://localhost:8000/users/me', {
-              headers: { 'Authorization': `Bearer ${token}` }, // Use the same token
-          });
-          if (currentUserResponse.ok) {
-              const currentUser = await currentUserResponse.json();
-              setIsRegistered(participantsData.some(p => p.id === currentUser.id));
-          } else {
-               console.error('Failed to fetch current user for registration check', await currentUserResponse.json());
-               setIsRegistered(false); // Assume not registered if cannot get user info or fetch fails
-          }
-      } else {
-          setIsRegistered(false); // Not logged in, so not registered
-      }
-
-      // Fetch Matches (Public, now includes usernames)
-      const matchesResponse = await fetch(`http://localhost:8000/events/${eventId}/matches`);
-      if (!matchesResponse.ok) {
-           const errorData = await matchesResponse.json();
-           throw new Error(errorData.detail || 'Failed to fetch matches');
-      }
-      const matchesData: Match[] = await matchesResponse.json();
-      // setMatches(matchesData); // Will set matches after fetching results
-
-      // Fetch results for each match
-      const matchesWithResults = await Promise.all(matchesData.map(async (match) => {
-          if (match.status === 'completed') { // Only fetch results for completed matches
-              try {
-                  const resultResponse = await fetch(`http://localhost:8000/matches/${match.id}/results`);
-                  if (!resultResponse.ok) {
-                       // Log error but don't block the whole process
-                       console.error(`Failed to fetch results for match ${match.id}:`, await resultResponse.json());
-                       return match; // Return original match data if fetching results fails
-                  }
-                  const resultData = await resultResponse.json();
-                  return { ...match, ...resultData }; // Merge match data with result data
-              } catch (err) {
-                   console.error(`Error fetching results for match ${match.id}:`, err);
-                   return match; // Return original match data on error
-              }
-          } else {
-              return match; // Return original match data for non-completed matches
-          }
-      }));
-
-      setMatches(matchesWithResults); // Set matches state with results
-
-      // Fetch Standings if mode is 'league' (Public)
-      if (eventData?.mode === 'league') { // Check eventData is not null
-           const standingsResponse = await fetch(`http://localhost:8000/events/${eventId}/standings`);
-           if (!standingsResponse.ok) {
-              const errorData = await standingsResponse.json();
-              throw new Error(errorData.detail || 'Failed to fetch standings');
            }
-           const standingsData: Standing[] = await standingsResponse.json();
-           setStandings(standingsData);
-      } else {
-          setStandings([]); // Clear standings if not league mode or event data is null
+           const errorData = await response.json();
+           throw new Error(errorData.detail || 'Failed to fetch event details');
       }
 
+      const data: EventFullData = await response.json();
+      setEvent(data.event);
+      setParticipants(data.participants);
+      setMatches(data.matches);
+      setStandings(data.standings ?? []); // Standings are only present for league events
+      setIsRegistered(data.is_registered);
 
     } catch (err: any) {
       setError(err.message);
@@ -242,6 +108,53 @@ const EventDetail: React.FC = () => {
     }
   }, [eventId]); // Rerun effect if eventId changes
 
+  // Standings are cached server-side, so re-reading them after a result is cheap
+  const fetchStandings = async () => {
+    const response = await fetch(`http://localhost:8000/events/${eventId}/standings`);
+    if (response.ok) {
+      setStandings(await response.json());
+    }
+  };
+
+  // Live updates pushed by the server: results and schedule changes are patched in place
+  // instead of re-running the whole fetch; "resync" means we missed some and must reload
+  useEffect(() => {
+    if (!eventId) return;
+    const source = new EventSource(`http://localhost:8000/events/${eventId}/live`);
+
+    const applyResult = (matchId: number, result: Partial<Match>, nextMatchId: number | null) => {
+      if (nextMatchId !== null) {
+        fetchEventDetails(); // A bracket winner moved into the next match
+        return;
+      }
+      setMatches((previous) => previous.map((match) => (match.id === matchId ? { ...match, ...result } : match)));
+      fetchStandings();
+    };
+
+    source.addEventListener('result', (e) => {
+      const result = JSON.parse((e as MessageEvent).data);
+      applyResult(result.match_id, {
+        result_id: result.id,
+        user1_score: result.user1_score,
+        user2_score: result.user2_score,
+        winner_user_id: result.winner_user_id,
+      }, result.next_match_id);
+    });
+    source.addEventListener('result_deleted', (e) => {
+      const result = JSON.parse((e as MessageEvent).data);
+      applyResult(result.match_id, { result_id: null, user1_score: null, user2_score: null, winner_user_id: null }, result.next_match_id);
+    });
+    source.addEventListener('match', (e) => {
+      const changed = JSON.parse((e as MessageEvent).data);
+      setMatches((previous) => previous.map((match) => (match.id === changed.id
+        ? { ...match, stage: changed.stage, match_date: changed.match_date, match_time: changed.match_time, venue: changed.venue }
+        : match)));
+    });
+    source.addEventListener('resync', () => fetchEventDetails());
+
+    return () => source.close();
+  }, [eventId]);
+
   const handleJoinEvent = async () => {
     setJoiningLeaving(true);
     setJoinLeaveError(null);
@@ -383,17 +296,15 @@ const EventDetail: React.FC = () => {
                           <td>{match.user1_username || 'N/A'} vs {match.user2_username || 'N/A'}</td>
                           {/* Add result data here if available */}
                           <td>
-                              {match.status === 'completed' && match.score1 !== null && match.score2 !== null ? (
-                                  `${match.score1} - ${match.score2}`
-                              ) : match.status === 'cancelled' ? (
-                                  'Cancelled'
+                              {match.result_id !== null && match.user1_score !== null && match.user2_score !== null ? (
+                                  `${match.user1_score} - ${match.user2_score}`
                               ) : (
                                   'Upcoming' // Or any other suitable indicator
                               )}
                           </td>
                           <td>
-                              {match.status === 'completed' && match.winner_id !== null ? (
-                                  match.winner_id === match.user1_id ? match.user1_username : match.user2_username
+                              {match.result_id !== null && match.winner_user_id !== null ? (
+                                  match.winner_user_id === match.user1_id ? match.user1_username : match.user2_username
                               ) : (
                                   '-'
                               )}
@@ -0,0 +1,61 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+os.environ.setdefault("ACCESS_LOG_ENABLED", "0")
+os.environ.setdefault("JOB_WORKER_THREADS", "0") # Tests run jobs themselves with run_due_jobs()
+
+def link_schema_files(directory):
+    for name in ("schema.sql", "migrations"):
+        os.symlink(os.path.join(REPO_ROOT, name), os.path.join(directory, name))
+
+@pytest.fixture(scope="session")
+def main(tmp_path_factory):
+    # main.py resolves cup.db, schema.sql, migrations/ and uploads/ against the working
+    # directory, so every test shares one database built by init_db() in a temporary one
+    directory = tmp_path_factory.mktemp("cup")
+    link_schema_files(directory)
+    previous_directory = os.getcwd()
+    os.chdir(directory)
+    try:
+        module = importlib.import_module("main")
+        module.init_db()
+        yield module
+    finally:
+        os.chdir(previous_directory)
+
+@pytest.fixture(scope="session")
+def client(main):
+    # Not entered as a context manager: startup (live feed, job workers) stays off
+    from fastapi.testclient import TestClient
+    return TestClient(main.app)
+
+def login(client, username, password):
+    response = client.post("/login", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture(scope="session")
+def organizer(client):
+    return login(client, "admin", "changeme")
+
+def create_user(client, organizer, username, password="secret"):
+    response = client.post("/users", json={"username": username, "password": password}, headers=organizer)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+def create_event(main, client, organizer, name, mode="league"):
+    response = client.post("/events", json={"name": name, "mode": mode}, headers=organizer)
+    assert response.status_code == 201, response.text
+    with main.engine.connect() as connection:
+        return connection.execute(main.text("SELECT id FROM events WHERE name = :name"), {"name": name}).scalar_one()
+
+def create_match(client, organizer, event_id, user1_id, user2_id, **fields):
+    response = client.post("/matches", json={"event_id": event_id, "user1_id": user1_id, "user2_id": user2_id, **fields}, headers=organizer)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
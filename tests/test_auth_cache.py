@@ -0,0 +1,22 @@
+"""The authenticated-user cache must not outlive a change made by another worker process."""
+from conftest import create_user, login
+
+def test_role_change_from_another_process_applies_to_the_next_request(main, client, organizer):
+    create_user(client, organizer, "cache_promoted")
+    headers = login(client, "cache_promoted", "secret")
+    # Organizer-only: the check uses the cached role
+    assert client.get("/admin/cache-stats", headers=headers).status_code == 403
+
+    # Written around this process's cache, as another worker would
+    with main.engine.begin() as connection:
+        connection.execute(main.text("UPDATE users SET role = 'organizer' WHERE username = 'cache_promoted'"))
+
+    assert client.get("/admin/cache-stats", headers=headers).status_code == 200
+
+def test_unchanged_user_is_served_from_the_cache(main, client, organizer):
+    create_user(client, organizer, "cache_unchanged")
+    headers = login(client, "cache_unchanged", "secret")
+    client.get("/users/me", headers=headers)
+    hits = main.user_cache.hits
+    client.get("/users/me", headers=headers)
+    assert main.user_cache.hits == hits + 1
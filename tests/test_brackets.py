@@ -0,0 +1,48 @@
+"""Knockout brackets: byes for the top seeds and winners advancing through the rounds."""
+from conftest import create_event, create_user
+
+def post_result(client, organizer, match_id, user1_score, user2_score):
+    response = client.post("/results", json={"match_id": match_id, "user1_score": user1_score, "user2_score": user2_score}, headers=organizer)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+def semifinals(client, event_id):
+    bracket = client.get(f"/events/{event_id}/bracket").json()
+    return bracket, bracket["final"]["feeders"]
+
+def players(node):
+    return [player and player["id"] for player in (node["user1"], node["user2"])]
+
+def test_byes_and_winners_advance(main, client, organizer):
+    seeds = [create_user(client, organizer, f"bracket_seed_{seed}") for seed in range(1, 6)]
+    event_id = create_event(main, client, organizer, "Bracket with byes", mode="knockout")
+    for user_id in seeds:
+        response = client.post("/event-registrations", json={"user_id": user_id, "event_id": event_id}, headers=organizer)
+        assert response.status_code == 201, response.text
+
+    response = client.post(f"/events/{event_id}/fixtures", json={"seeding": seeds}, headers=organizer)
+    assert response.status_code == 201, response.text
+    fixtures = response.json()
+    # Five players fill a bracket of eight: the top three seeds skip the first round
+    assert (fixtures["rounds"], fixtures["matches_created"]) == (3, 4)
+    assert sorted(fixtures["byes"]) == sorted(seeds[:3])
+
+    bracket, (top_half, bottom_half) = semifinals(client, event_id)
+    assert bracket["matches"] == 4
+    opening = top_half["feeders"][1]
+    assert players(top_half) == [seeds[0], None] and top_half["feeders"][0] is None
+    assert sorted(players(opening)) == sorted(seeds[3:])
+    assert sorted(players(bottom_half)) == sorted(seeds[1:3]) and bottom_half["feeders"] == [None, None]
+
+    # The opening match's winner takes the empty semifinal slot, and a correction moves it
+    result_id = post_result(client, organizer, opening["match_id"], 2, 0)
+    assert players(semifinals(client, event_id)[1][0]) == [seeds[0], opening["user1"]["id"]]
+    response = client.put(f"/results/{result_id}", json={"user1_score": 0, "user2_score": 1}, headers=organizer)
+    assert response.status_code == 200, response.text
+    assert players(semifinals(client, event_id)[1][0]) == [seeds[0], opening["user2"]["id"]]
+
+    # Once the semifinal is played, the result that filled it can't change
+    post_result(client, organizer, top_half["match_id"], 1, 0)
+    response = client.put(f"/results/{result_id}", json={"user1_score": 3, "user2_score": 0}, headers=organizer)
+    assert response.status_code == 409
+    assert players(semifinals(client, event_id)[0]["final"]) == [seeds[0], None]
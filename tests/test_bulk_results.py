@@ -0,0 +1,34 @@
+"""POST /results/bulk: the error report and batches that fail to write."""
+from conftest import create_event, create_match, create_user
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+def test_errors_are_listed_in_line_order(main, client, organizer, monkeypatch):
+    monkeypatch.setattr(main, "BULK_RESULT_BATCH_SIZE", 2)
+    # Line 1 fails when its batch is checked, after line 2 has already failed to parse
+    body = '{"match_id": 999999999}\nnot json\n'
+    report = client.post("/results/bulk", content=body, headers={**organizer, **NDJSON}).json()
+    assert [error["line"] for error in report["errors"]] == [1, 2]
+
+def test_a_failed_batch_is_reported_and_earlier_batches_stay_written(main, client, organizer, monkeypatch):
+    first, second = (create_user(client, organizer, f"bulk_{name}") for name in ("first", "second"))
+    event_id = create_event(main, client, organizer, "Bulk batches")
+    written = create_match(client, organizer, event_id, first, second)
+    lost = create_match(client, organizer, event_id, second, first)
+
+    ingest_result_batch = main.ingest_result_batch
+    def fail_second_batch(db, batch):
+        if batch[0][1].match_id == lost:
+            raise main.OperationalError("INSERT", {}, Exception("database is locked"))
+        return ingest_result_batch(db, batch)
+    monkeypatch.setattr(main, "BULK_RESULT_BATCH_SIZE", 1)
+    monkeypatch.setattr(main, "ingest_result_batch", fail_second_batch)
+
+    body = f'{{"match_id": {written}, "user1_score": 1, "user2_score": 0}}\n{{"match_id": {lost}, "user1_score": 2, "user2_score": 2}}\n'
+    response = client.post("/results/bulk", content=body, headers={**organizer, **NDJSON})
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert (report["rows"], report["created"], report["failed"]) == (2, 1, 1)
+    assert report["errors"][0]["line"] == 2 and report["errors"][0]["match_id"] == lost
+    assert client.get(f"/matches/{written}/results").json()["user1_score"] == 1
+    assert client.get(f"/matches/{lost}/results").json() is None
@@ -0,0 +1,20 @@
+"""GET /changes once old change_log entries have been pruned."""
+from conftest import create_event
+
+def test_pruned_history_answers_gone_with_a_seq_to_resume_from(main, client, organizer, monkeypatch):
+    event_id = create_event(main, client, organizer, "Pruned history")
+    etag = client.get(f"/events/{event_id}/participants").headers["etag"]
+    with main.engine.begin() as connection:
+        connection.execute(main.text("UPDATE change_log SET changed_at = '2000-01-01 00:00:00'"))
+        total = connection.execute(main.text("SELECT COUNT(*) FROM change_log")).scalar()
+    monkeypatch.setattr(main, "CHANGE_LOG_PRUNE_BATCH_SIZE", 2)
+
+    assert 0 < main.prune_change_log() < total
+
+    response = client.get("/changes", params={"since": 0})
+    assert response.status_code == 410
+    resync_since = response.json()["detail"]["resync_since"]
+    response = client.get("/changes", params={"since": resync_since})
+    assert response.status_code == 200 and response.json()["changes"] == []
+    # The event's newest entry was kept, so its validator did not change
+    assert client.get(f"/events/{event_id}/participants", headers={"If-None-Match": etag}).status_code == 304
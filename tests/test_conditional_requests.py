@@ -0,0 +1,33 @@
+"""ETag and Last-Modified on the public reads, before and after a write."""
+from conftest import create_event, create_match, create_user
+
+def test_write_moves_the_etag_on(main, client, organizer):
+    before = client.get("/events")
+    assert client.get("/events", headers={"If-None-Match": before.headers["etag"]}).status_code == 304
+
+    create_event(main, client, organizer, "Conditional write")
+
+    after = client.get("/events", headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200 and after.headers["etag"] != before.headers["etag"]
+    assert client.get("/events", headers={"If-None-Match": after.headers["etag"]}).status_code == 304
+
+def test_stale_etag_wins_over_a_current_last_modified(main, client, organizer):
+    before = client.get("/events")
+    create_event(main, client, organizer, "Conditional same second")
+    after = client.get("/events")
+    # Last-Modified only has whole seconds, so on its own it would call the old copy current
+    response = client.get("/events", headers={"If-None-Match": before.headers["etag"], "If-Modified-Since": after.headers["last-modified"]})
+    assert response.status_code == 200
+    assert client.get("/events", headers={"If-Modified-Since": after.headers["last-modified"]}).status_code == 304
+
+def test_result_moves_the_standings_etag_on(main, client, organizer):
+    home, away = (create_user(client, organizer, f"conditional_{name}") for name in ("home", "away"))
+    event_id = create_event(main, client, organizer, "Conditional standings")
+    match_id = create_match(client, organizer, event_id, home, away)
+    etag = client.get(f"/events/{event_id}/standings").headers["etag"]
+
+    response = client.post("/results", json={"match_id": match_id, "user1_score": 1, "user2_score": 0}, headers=organizer)
+    assert response.status_code == 201, response.text
+
+    response = client.get(f"/events/{event_id}/standings", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and [row["user_id"] for row in response.json()] == [home, away]
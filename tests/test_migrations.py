@@ -0,0 +1,30 @@
+"""Every worker process migrates at startup; concurrent workers must apply each step once."""
+import os
+import sqlite3
+import subprocess
+import sys
+
+from conftest import REPO_ROOT, link_schema_files
+
+WORKERS = 4
+
+def test_concurrent_workers_migrate_a_new_database_once(tmp_path):
+    link_schema_files(tmp_path)
+    environment = {**os.environ, "PYTHONPATH": REPO_ROOT, "ACCESS_LOG_ENABLED": "0"}
+    workers = [subprocess.Popen([sys.executable, "-c", "import main; main.init_db()"], cwd=tmp_path, env=environment,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+               for _ in range(WORKERS)]
+    outputs = [worker.communicate(timeout=120)[0] for worker in workers]
+    assert [worker.returncode for worker in workers] == [0] * WORKERS, outputs
+
+    latest_version = max(int(name.split("_", 1)[0]) for name in os.listdir(os.path.join(REPO_ROOT, "migrations")) if name.endswith(".sql"))
+    connection = sqlite3.connect(tmp_path / "cup.db")
+    assert connection.execute("PRAGMA user_version").fetchone()[0] == latest_version
+    # One admin, logged once: neither the schema, the change_log backfill nor the admin was applied twice
+    assert connection.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 1
+    assert connection.execute("SELECT COUNT(*) FROM change_log WHERE table_name = 'users'").fetchone()[0] == 1
+    assert sum("Database initialized successfully." in output for output in outputs) == 1
+    assert sum("Applied migration 0004_knockout_bracket.sql" in output for output in outputs) == 1
+
+def test_migrating_an_up_to_date_database_does_nothing(main):
+    assert main.run_migrations() == main.get_pending_migrations(0)[-1][0]
@@ -0,0 +1,32 @@
+"""The hot queries must be answered through an index, not a table scan.
+
+Runs the same checks as `python main.py check-query-plans` against a database built by
+init_db() from schema.sql and the migrations.
+"""
+import inspect
+
+from fastapi.routing import APIRoute
+
+def test_hot_queries_use_an_index(main):
+    with main.engine.connect() as connection:
+        assert main.find_table_scans(connection) == []
+
+def test_every_paginated_endpoint_is_checked(main):
+    # Routes hold the profiler's wrapper around each endpoint
+    endpoints = {inspect.unwrap(route.endpoint) for route in main.app.routes if isinstance(route, APIRoute)}
+    paginated = {endpoint for endpoint in endpoints if "fetch_page(" in inspect.getsource(endpoint)}
+    checked = {endpoint for endpoint, _, _ in main.PAGE_QUERY_PLAN_CALLS.values()}
+    assert paginated == checked
+
+def test_checked_page_statements_are_the_ones_fetch_page_runs(main):
+    with main.engine.connect() as connection:
+        for name, (endpoint, filters, cursor_values) in main.PAGE_QUERY_PLAN_CALLS.items():
+            statements = main.record_page_statements(connection, endpoint, filters, cursor_values)
+            assert len(statements) == 1, name
+            statement, _ = statements[0]
+            # Continues after the cursor, in page order
+            assert ") > (" in statement and "ORDER BY" in statement and "LIMIT ?" in statement, name
+
+def test_results_by_event_is_checked(main):
+    endpoint, filters, _ = main.PAGE_QUERY_PLAN_CALLS["get_all_results_by_event"]
+    assert endpoint is main.get_all_results and filters == {"event_id": 1}
@@ -0,0 +1,51 @@
+"""League standings: the incrementally maintained table against a rebuild from the results."""
+from conftest import create_event, create_match, create_user
+
+def standings_match_rebuild(main, event_id):
+    with main.SessionLocal() as db:
+        return main.rebuild_league_standings(db, event_id=event_id, dry_run=True)["mismatches"] == 0
+
+def post_result(client, organizer, match_id, user1_score, user2_score):
+    response = client.post("/results", json={"match_id": match_id, "user1_score": user1_score, "user2_score": user2_score}, headers=organizer)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+def test_incremental_standings_match_a_rebuild_after_every_change(main, client, organizer):
+    home, away, visitor = (create_user(client, organizer, f"standings_{name}") for name in ("home", "away", "visitor"))
+    event_id = create_event(main, client, organizer, "Standings consistency")
+    first = create_match(client, organizer, event_id, home, away)
+    second = create_match(client, organizer, event_id, home, visitor)
+
+    first_result = post_result(client, organizer, first, 2, 1)
+    second_result = post_result(client, organizer, second, 0, 0)
+    assert standings_match_rebuild(main, event_id)
+
+    response = client.put(f"/results/{first_result}", json={"user1_score": 1, "user2_score": 3}, headers=organizer)
+    assert response.status_code == 200, response.text
+    assert standings_match_rebuild(main, event_id)
+
+    # The visitor's only result goes away, and with it their row
+    assert client.delete(f"/results/{second_result}", headers=organizer).status_code == 204
+    assert standings_match_rebuild(main, event_id)
+    standings = client.get(f"/events/{event_id}/standings").json()
+    assert sorted(row["user_id"] for row in standings) == sorted([home, away])
+
+def test_cached_standings_are_dropped_by_the_writes_they_depend_on(main, client, organizer):
+    home, away = (create_user(client, organizer, f"cached_{name}") for name in ("home", "away"))
+    event_id = create_event(main, client, organizer, "Standings cache")
+    match_id = create_match(client, organizer, event_id, home, away)
+    assert client.get(f"/events/{event_id}/standings").json() == []
+
+    post_result(client, organizer, match_id, 3, 1)
+    standings = client.get(f"/events/{event_id}/standings").json()
+    assert [(row["user_id"], row["points"]) for row in standings] == [(home, 3), (away, 0)]
+    hits = main.standings_cache.hits
+    assert client.get(f"/events/{event_id}/standings").json() == standings
+    assert main.standings_cache.hits == hits + 1
+
+    # Standings show usernames
+    assert client.put(f"/users/{away}", json={"username": "cached_renamed"}, headers=organizer).status_code == 200
+    assert client.get(f"/events/{event_id}/standings").json()[1]["username"] == "cached_renamed"
+
+    assert client.delete(f"/matches/{match_id}", headers=organizer).status_code == 204
+    assert client.get(f"/events/{event_id}/standings").json() == []
@@ -0,0 +1,49 @@
+"""Uploads: the request size limit and the cleanup job that removes unused files."""
+import io
+import os
+
+from conftest import create_event, create_match, create_user, login
+
+def png(marker: bytes):
+    return b"\x89PNG\r\n\x1a\n" + marker
+
+def upload(client, headers, match_id, user_id, content):
+    response = client.post(f"/matches/{match_id}/upload/{user_id}", files={"file": ("image.png", io.BytesIO(content), "image/png")}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["file_url"]
+
+def test_oversized_upload_is_rejected_inside_cors(main, client):
+    # The size limit runs inside the CORS middleware, so a browser can read its 413
+    response = client.post(
+        "/matches/1/upload/1",
+        content=b"--x--",
+        headers={
+            "content-type": "multipart/form-data; boundary=x",
+            "content-length": str(main.MAX_UPLOAD_REQUEST_SIZE + 1),
+            "origin": "http://localhost:5173",
+        },
+    )
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] == "http://localhost:5173"
+
+def test_cleanup_keeps_a_file_that_was_referenced_again_before_it_ran(main, client, organizer):
+    home, away = (create_user(client, organizer, f"uploads_{name}") for name in ("home", "away"))
+    event_id = create_event(main, client, organizer, "Upload cleanup")
+    first = create_match(client, organizer, event_id, home, away)
+    second = create_match(client, organizer, event_id, home, away)
+    headers = login(client, "uploads_home", "secret")
+
+    shared_url = upload(client, headers, first, home, png(b"shared"))
+    # Replacing it queues the old file for deletion ...
+    upload(client, headers, first, home, png(b"replacement"))
+    # ... but the same content is uploaded for another match before the job runs
+    assert upload(client, headers, second, home, png(b"shared")) == shared_url
+    while main.run_due_jobs():
+        pass
+    assert os.path.exists(main.upload_path_from_url(shared_url))
+
+    # Once nothing points at it any more, it goes
+    upload(client, headers, second, home, png(b"other"))
+    while main.run_due_jobs():
+        pass
+    assert not os.path.exists(main.upload_path_from_url(shared_url))